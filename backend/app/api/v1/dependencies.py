@@ -1,46 +1,144 @@
 # backend/app/api/v1/dependencies.py
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session, joinedload
 from typing import Optional
 
+from app.core.config import settings
 from app.core.security import SECRET_KEY, ALGORITHM
-from app.db.session import SessionLocal
+from app.core import auth_cache
+from app.core.permissions import Permission, token_claims_for_user
+from app.db.session import SessionLocal, AsyncSessionLocal, REPLICA_READS
 from app.models.user import User
+from app.schemas.user import TokenData
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-def get_db():
-    db = SessionLocal()
+# Métodos cuyas sesiones pueden leer de la réplica (las escrituras siempre van al primario)
+_READ_ONLY_METHODS = {"GET", "HEAD"}
+
+def _session_info(request: Optional[Request]) -> dict:
+    if request is not None and request.method in _READ_ONLY_METHODS:
+        return REPLICA_READS
+    return {}
+
+def get_db(request: Request = None):
+    db = SessionLocal(info=_session_info(request))
     try:
         yield db
     finally:
         db.close()
 
-def get_user_from_token(db: Session, token: str) -> Optional[User]:
+async def get_async_db(request: Request = None):
+    """Sesión asíncrona para los endpoints `async def` (no ocupa un hilo del threadpool)."""
+    if AsyncSessionLocal is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="El motor asíncrono de base de datos no está disponible.",
+        )
+    async with AsyncSessionLocal(info=_session_info(request)) as db:
+        yield db
+
+def get_client_ip(request: Request) -> Optional[str]:
+    """
+    IP del cliente. Con TRUST_PROXY_HEADERS se toma de X-Forwarded-For la entrada que
+    agregó el proxy de confianza más externo (TRUSTED_PROXY_HOPS desde la derecha): las
+    entradas de la izquierda las puede escribir el propio cliente. Sin X-Forwarded-For se
+    usa X-Real-IP, que el proxy sobrescribe.
+    """
+    if settings.TRUST_PROXY_HEADERS:
+        forwarded = [hop.strip() for hop in request.headers.get("X-Forwarded-For", "").split(",") if hop.strip()]
+        if forwarded:
+            return forwarded[-min(max(settings.TRUSTED_PROXY_HOPS, 1), len(forwarded))]
+        real_ip = request.headers.get("X-Real-IP")
+        if real_ip:
+            return real_ip.strip()
+    return request.client.host if request.client else None
+
+def _decode_token(token: str) -> Optional[dict]:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
     except JWTError:
         return None
-    user = db.query(User).options(joinedload(User.role), joinedload(User.branch)).filter(User.username == username).first()
+    if payload.get("sub") is None:
+        return None
+    return payload
+
+def get_user_from_token(db: Session, token: str) -> Optional[User]:
+    payload = _decode_token(token)
+    if payload is None:
+        return None
+    username: str = payload["sub"]
+    exp = payload.get("exp")
+    user = auth_cache.get_cached_user(db, username, exp)
+    if user is None:
+        user = db.query(User).options(joinedload(User.role), joinedload(User.branch)).filter(User.username == username).first()
+        if user is None:
+            return None
+        user = auth_cache.cache_user(db, user, exp)
+    # Tokens con versión: quedan revocados si la versión del usuario cambió
+    if "ver" in payload and payload["ver"] != (user.token_version or 0):
+        return None
     return user
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudieron validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
     user = get_user_from_token(db=db, token=token)
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
 
+# --- CAPA 1b: CLAIMS DEL TOKEN (SIN CONSULTAR LA FILA DEL USUARIO) ---
+def get_current_claims(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> TokenData:
+    """
+    Valida el token y retorna sus claims de autorización (rol, sucursal y permisos).
+    Solo verifica la versión del token contra la caché de revocación, que también rechaza
+    a los usuarios inactivos; los tokens
+    emitidos antes de incorporar claims se resuelven cargando el usuario.
+    """
+    payload = _decode_token(token)
+    if payload is None:
+        raise _credentials_exception()
+    if "perms" not in payload or "ver" not in payload or "uid" not in payload:
+        user = get_current_active_user(get_current_user(token=token, db=db))
+        claims = token_claims_for_user(user)
+    else:
+        current_version = auth_cache.get_token_version(db, payload["uid"])
+        if current_version is None or current_version != payload["ver"]:
+            raise _credentials_exception()
+        claims = payload
+    return TokenData(
+        username=claims["sub"],
+        user_id=claims["uid"],
+        role=claims.get("role"),
+        branch_id=claims.get("branch"),
+        permissions=claims["perms"],
+        token_version=claims["ver"],
+    )
+
+def _require_permission(permission: Permission, detail: str):
+    def guard(claims: TokenData = Depends(get_current_claims)) -> TokenData:
+        if not claims.permissions & permission:
+            raise HTTPException(status_code=403, detail=detail)
+        return claims
+    return guard
+
+_DEFAULT_FORBIDDEN = "No tiene los permisos suficientes para realizar esta acción."
+
+# Guardias basados solo en claims, para endpoints que no necesitan la fila del usuario
+require_admin = _require_permission(Permission.ADMIN, _DEFAULT_FORBIDDEN)
+require_admin_or_receptionist = _require_permission(Permission.FRONT_DESK, _DEFAULT_FORBIDDEN)
+require_technician_or_admin = _require_permission(Permission.WORKSHOP, "Solo un técnico o administrador puede realizar esta acción.")
+require_all_roles = _require_permission(Permission.OPERATOR, _DEFAULT_FORBIDDEN)
+
 # --- CAPA 2: EL GUARDIA ESTÁNDAR ---
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """
@@ -52,42 +150,43 @@ def get_current_active_user(current_user: User = Depends(get_current_user)) -> U
     return current_user
 
 # --- CAPA 3: GUARDIAS ESPECIALIZADOS (POR ROL) ---
-def get_current_active_admin(current_user: User = Depends(get_current_active_user)) -> User:
+# Cada guardia evalúa primero los claims del token; el usuario solo se carga si la autorización pasa.
+def get_current_active_admin(
+    claims: TokenData = Depends(require_admin),
+    current_user: User = Depends(get_current_active_user),
+) -> User:
     """
     Verifica que el usuario actual sea un administrador activo.
     """
-    if not current_user.role or current_user.role.role_name != "Administrator":
-        raise HTTPException(status_code=403, detail="No tiene los permisos suficientes para realizar esta acción.")
     return current_user
 
-def get_current_active_admin_or_receptionist(current_user: User = Depends(get_current_active_user)) -> User:
+def get_current_active_admin_or_receptionist(
+    claims: TokenData = Depends(require_admin_or_receptionist),
+    current_user: User = Depends(get_current_active_user),
+) -> User:
     """
     Verifica que el usuario actual sea un administrador o recepcionista activo.
     Acepta variantes comunes del nombre del rol para robustez.
     """
-    role_name = (current_user.role.role_name if current_user.role else "").lower()
-    allowed = {"administrator", "receptionist", "recepcionist", "recepcionista"}
-    if role_name not in allowed:
-        raise HTTPException(status_code=403, detail="No tiene los permisos suficientes para realizar esta acción.")
     return current_user
 
 # --- INICIO DE LA CORRECCIÓN ---
-def get_current_active_technician_or_admin(current_user: User = Depends(get_current_active_user)) -> User:
+def get_current_active_technician_or_admin(
+    claims: TokenData = Depends(require_technician_or_admin),
+    current_user: User = Depends(get_current_active_user),
+) -> User:
     """
     Verifica que el usuario actual sea un técnico o administrador activo.
     """
-    if not current_user.role or current_user.role.role_name not in ["Administrator", "Technical"]:
-        raise HTTPException(status_code=403, detail="Solo un técnico o administrador puede realizar esta acción.")
     return current_user
 # --- FIN DE LA CORRECCIÓN ---
 
-def get_current_active_user_all_roles(current_user: User = Depends(get_current_active_user)) -> User:
+def get_current_active_user_all_roles(
+    claims: TokenData = Depends(require_all_roles),
+    current_user: User = Depends(get_current_active_user),
+) -> User:
     """
     Verifica que el usuario actual sea un administrador, recepcionista o técnico activo.
     Permite acceso a todos los roles operativos del sistema.
     """
-    role_name = (current_user.role.role_name if current_user.role else "").lower()
-    allowed = {"administrator", "receptionist", "recepcionist", "recepcionista", "technical", "technician", "tecnico"}
-    if role_name not in allowed:
-        raise HTTPException(status_code=403, detail="No tiene los permisos suficientes para realizar esta acción.")
     return current_user
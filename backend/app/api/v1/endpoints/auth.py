@@ -1,49 +1,85 @@
 # backend/app/api/v1/endpoints/auth.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
-import traceback
+import math
 
 from app.crud import crud_user
 from app.schemas.user import Token, UserCreate, UserInDB
-from app.core.security import create_access_token, verify_password, ACCESS_TOKEN_EXPIRE_MINUTES
-from app.api.v1.dependencies import get_db
+from app.core.security import (
+    create_access_token, verify_password_async, get_password_hash_async, needs_rehash,
+    PasswordHashingBusy, ACCESS_TOKEN_EXPIRE_MINUTES,
+)
+from app.core.login_throttle import login_throttle
+from app.core.permissions import token_claims_for_user
+from app.core.logger import structured_logger, ErrorCategory, ErrorSeverity
+from app.api.v1.dependencies import get_db, get_client_ip
 
 router = APIRouter()
 
 @router.post("/login", response_model=Token)
-def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_for_access_token(request: Request, db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Endpoint de inicio de sesión para obtener un token de acceso.
+    La verificación de la contraseña corre en un pool dedicado y los intentos
+    fallidos se limitan por usuario y por IP.
     """
+    throttle_keys = login_throttle.keys_for(form_data.username, get_client_ip(request))
+    retry_after = login_throttle.retry_after(*throttle_keys)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiados intentos fallidos. Intente nuevamente más tarde.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+    user = await run_in_threadpool(crud_user.get_by_username, db, username=form_data.username)
+
     try:
-        user = crud_user.get_by_username(db, username=form_data.username)
-
-        if not user or not verify_password(form_data.password, user.password):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Usuario o contraseña incorrectos",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-
-        # --- INICIO DE LA CORRECCIÓN DE SEGURIDAD ---
-        if not user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="El usuario está inactivo y no puede iniciar sesión.",
-            )
-        # --- FIN DE LA CORRECCIÓN DE SEGURIDAD ---
-
-        access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={"sub": user.username}, expires_delta=access_token_expires
+        password_ok = user is not None and await verify_password_async(form_data.password, user.password)
+    except PasswordHashingBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="El servidor está procesando demasiados inicios de sesión. Intente nuevamente.",
+            headers={"Retry-After": "1"},
+        )
+
+    if not password_ok:
+        login_throttle.register_failure(*throttle_keys)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Usuario o contraseña incorrectos",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    # Solo se reinicia el contador del usuario: una cuenta válida no debe limpiar el de la IP
+    login_throttle.reset(throttle_keys[0])
+
+    # --- INICIO DE LA CORRECCIÓN DE SEGURIDAD ---
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El usuario está inactivo y no puede iniciar sesión.",
         )
-        return {"access_token": access_token, "token_type": "bearer"}
+    # --- FIN DE LA CORRECCIÓN DE SEGURIDAD ---
+
+    # Migración transparente de hashes heredados (bcrypt) al esquema actual
+    if needs_rehash(user.password):
+        try:
+            new_hash = await get_password_hash_async(form_data.password)
+            await run_in_threadpool(crud_user.set_password_hash, db, db_obj=user, hashed_password=new_hash)
+        except Exception as e:
+            structured_logger.log_error(e, ErrorCategory.AUTH, ErrorSeverity.LOW, {"event": "password_rehash", "user_id": user.id})
 
-    except Exception as e:
-        raise e
+    # Rol, sucursal, permisos y versión firmados en el token: los guardias no necesitan la BD
+    token_claims = await run_in_threadpool(token_claims_for_user, user)
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data=token_claims, expires_delta=access_token_expires
+    )
+    return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/register", response_model=UserInDB)
 def register_new_user(user: UserCreate, db: Session = Depends(get_db)):
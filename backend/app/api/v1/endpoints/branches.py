@@ -3,11 +3,11 @@
 from typing import List, Any
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app import models
 from app.crud import crud_branch
 from app.schemas.branch import Branch, BranchCreate, BranchUpdate
 from pydantic import BaseModel
 from app.api.v1 import dependencies as deps
+from app.schemas.user import TokenData
 
 router = APIRouter()
 
@@ -25,7 +25,7 @@ def read_branches(
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: models.user.User = Depends(deps.get_current_active_user), # <-- Guardia actualizado
+    claims: TokenData = Depends(deps.get_current_claims), # <-- Guardia actualizado
 ):
     """
     Recupera una lista de sucursales. Solo para usuarios activos.
@@ -38,7 +38,7 @@ def create_branch(
     *,
     db: Session = Depends(deps.get_db),
     branch_in: BranchCreate,
-    current_user: models.user.User = Depends(deps.get_current_active_admin),
+    claims: TokenData = Depends(deps.require_admin),
 ):
     """
     Crea una nueva sucursal (solo para administradores).
@@ -52,7 +52,7 @@ def update_branch(
     db: Session = Depends(deps.get_db),
     branch_id: int,
     branch_in: BranchUpdate,
-    current_user: models.user.User = Depends(deps.get_current_active_admin),
+    claims: TokenData = Depends(deps.require_admin),
 ):
     """
     Actualiza una sucursal (solo para administradores).
@@ -72,10 +72,12 @@ def update_branch_ticket_config(
     db: Session = Depends(deps.get_db),
     branch_id: int,
     config_in: TicketConfigUpdate,
-    current_user: models.user.User = Depends(deps.get_current_active_admin),
+    claims: TokenData = Depends(deps.require_admin),
 ):
     """
     Actualiza la configuración de tickets de una sucursal (solo para administradores).
+    Al guardar se invalida la caché de sucursales y, con ella, las plantillas compiladas de
+    /repair-orders/{id}/ticket.
     """
     branch = crud_branch.get(db, id=branch_id)
     if not branch:
@@ -98,7 +100,7 @@ def get_branch_ticket_config(
     *,
     db: Session = Depends(deps.get_db),
     branch_id: int,
-    current_user: models.user.User = Depends(deps.get_current_active_user),
+    claims: TokenData = Depends(deps.get_current_claims),
 ):
     """
     Obtiene la configuración de tickets de una sucursal específica.
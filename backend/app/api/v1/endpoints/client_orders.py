@@ -1,20 +1,29 @@
 # backend/app/api/v1/endpoints/client_orders.py
 
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+import json
+from typing import List, Literal, Optional, Tuple
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse, StreamingResponse
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 
-from app.api.v1.dependencies import get_db
+from app.api.v1.dependencies import get_db, get_async_db
+from app.core import reference_cache
+from app.core.config import settings
 from app.models.repair_order import RepairOrder
 from app.models.customer import Customer
 from app.models.branch import Branch
 from app.models.user import User
 from app.models.status_order import StatusOrder
 from app.models.device_type import DeviceType
+from app.models.repair_order_photo import RepairOrderPhoto
 from app.schemas.repair_order import RepairOrderPublic
+from app.schemas.repair_order_photo import RepairOrderPhotoPublic
+from app.services import order_stream, photo_previews, public_order_cache
 from app.services.email_transaccional import EmailTransactionalService
-from app.crud import crud_email_subscription
+from app.crud import crud_email_subscription, crud_repair_order_photo
 
 router = APIRouter()
 
@@ -31,14 +40,78 @@ def _ensure_balance(order: RepairOrder):
         order.balance = max(float(order.total_cost or 0.0) - float(order.deposit or 0.0), 0.0)
     return order
 
+def _public_order_query():
+    """
+    Consulta base de la vista pública: carga todo lo que serializa RepairOrderPublic.
+    Estado, tipo de dispositivo y sucursal se adjuntan desde la caché de referencia.
+    """
+    return select(RepairOrder).options(
+        joinedload(RepairOrder.customer),
+        joinedload(RepairOrder.technician),
+        # Solo metadatos de las fotos: la imagen en base64 no se lee
+        selectinload(RepairOrder.photos).defer(RepairOrderPhoto.photo)
+    )
+
+async def _load_public_order(db: AsyncSession, order_id: int) -> Optional[Tuple[str, bytes]]:
+    """(ETag, JSON) de la vista pública de la orden, desde la caché o la base; None si no existe."""
+    cached = public_order_cache.get_order(order_id)
+    if cached is not None:
+        return cached
+    started = public_order_cache.generation()
+    result = await db.execute(_public_order_query().filter(RepairOrder.id == order_id))
+    order = result.unique().scalars().first()
+    if not order:
+        return None
+    await db.run_sync(reference_cache.attach_order_references, [order])
+    body = RepairOrderPublic.model_validate(_ensure_balance(order)).model_dump_json().encode()
+    return public_order_cache.set_order(order_id, body, started)
+
+def _with_stream_token(entry: Tuple[str, bytes], order_id: int) -> Tuple[str, bytes]:
+    """
+    Vista pública con stream_token. Solo se entrega a quien demostró algo más que el número
+    de orden (secuencial): el DNI del cliente o el token del enlace del ticket.
+    """
+    public_order = json.loads(entry[1])
+    public_order["stream_token"] = order_stream.make_token(order_id)
+    body = json.dumps(public_order, separators=(",", ":")).encode()
+    return public_order_cache.make_etag(body), body
+
+def _public_response(request: Request, entry: Tuple[str, bytes]) -> Response:
+    """Respuesta con ETag; 304 sin cuerpo si el cliente ya tiene esa versión."""
+    etag, body = entry
+    # no-cache: el navegador puede guardarla pero revalida siempre con If-None-Match
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+async def _find_order_id(db: AsyncSession, query_param: str) -> Optional[int]:
+    """Número de orden exacto o, si no, la orden más reciente del cliente con ese DNI."""
+    if query_param.isdigit():
+        order_id = await db.scalar(select(RepairOrder.id).where(RepairOrder.id == int(query_param)))
+        if order_id:
+            return order_id
+    return await db.scalar(
+        select(RepairOrder.id)
+        .join(Customer)
+        .where(Customer.dni == query_param)
+        .order_by(RepairOrder.id.desc())
+        .limit(1)
+    )
+
 @router.get("/client-search", response_model=RepairOrderPublic)
-def search_order_by_client_query(
+async def search_order_by_client_query(
+    request: Request,
     q: str = Query(..., description="DNI del cliente o número de orden"),
-    db: Session = Depends(get_db)
+    token: Optional[str] = Query(None, description="Token del enlace del ticket (QR)"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Endpoint público para buscar órdenes por DNI del cliente o número de orden.
     No requiere autenticación para permitir consultas de clientes.
+    El stream_token (eventos en vivo) solo se incluye si la orden se encontró por DNI o si
+    `token` es el del enlace de la orden.
     """
     if not q or len(q.strip()) < 3:
         raise HTTPException(
@@ -47,57 +120,81 @@ def search_order_by_client_query(
         )
     
     query_param = q.strip()
-    
-    # Buscar por ID de orden o DNI del cliente
-    from sqlalchemy.orm import joinedload
-    
-    order = db.query(RepairOrder).options(
-        joinedload(RepairOrder.customer),
-        joinedload(RepairOrder.status),
-        joinedload(RepairOrder.technician),
-        joinedload(RepairOrder.device_type),
-        joinedload(RepairOrder.branch)
-    ).join(Customer).filter(
-        or_(
-            RepairOrder.id == int(query_param) if query_param.isdigit() else False,
-            Customer.dni == query_param
-        )
-    ).first()
-    
-    if not order:
+
+    entry = None
+    order_id = public_order_cache.get_order_id_by_dni(query_param)
+    if order_id is not None:
+        entry = await _load_public_order(db, order_id)
+    if entry is None:
+        started = public_order_cache.generation()
+        order_id = await _find_order_id(db, query_param)
+        if order_id:
+            public_order_cache.set_order_id_by_dni(query_param, order_id, started)
+            entry = await _load_public_order(db, order_id)
+
+    if entry is None:
         raise HTTPException(
             status_code=404,
             detail="No se encontró ninguna orden con ese DNI o número de orden"
         )
-    
-    return _ensure_balance(order)
+
+    # El número de orden tiene prioridad en _find_order_id: si no coincide, se encontró por DNI
+    found_by_dni = not (query_param.isdigit() and int(query_param) == order_id)
+    if found_by_dni or (token and order_stream.verify_token(order_id, token)):
+        entry = _with_stream_token(entry, order_id)
+    return _public_response(request, entry)
 
 @router.get("/client/{order_id}", response_model=RepairOrderPublic)
-def get_client_order_details(
+async def get_client_order_details(
     order_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Endpoint público para obtener detalles completos de una orden.
     No requiere autenticación para permitir consultas de clientes.
+    Mientras la orden no cambie se sirve desde la caché, con ETag (304 si no cambió).
     """
-    from sqlalchemy.orm import joinedload
-    
-    order = db.query(RepairOrder).options(
-        joinedload(RepairOrder.customer),
-        joinedload(RepairOrder.status),
-        joinedload(RepairOrder.technician),
-        joinedload(RepairOrder.device_type),
-        joinedload(RepairOrder.branch)
-    ).filter(RepairOrder.id == order_id).first()
+    entry = await _load_public_order(db, order_id)
     
-    if not order:
+    if entry is None:
         raise HTTPException(
             status_code=404,
             detail="Orden no encontrada"
         )
     
-    return _ensure_balance(order)
+    return _public_response(request, entry)
+
+@router.get("/{order_id}/events")
+async def stream_order_events(
+    order_id: int,
+    token: str = Query(..., description="stream_token (búsqueda por DNI o enlace del ticket)"),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Endpoint público (Server-Sent Events): estado, diagnóstico y fotos nuevas de la orden
+    en vivo. Al reconectar, EventSource envía Last-Event-ID y se reponen los eventos
+    perdidos. Una conexión abierta no consulta la base de datos.
+    """
+    if not order_stream.verify_token(order_id, token):
+        raise HTTPException(status_code=403, detail="Token inválido para esta orden")
+    if order_stream.connection_count() >= settings.ORDER_STREAM_MAX_CONNECTIONS:
+        raise HTTPException(
+            status_code=503,
+            detail="Demasiadas conexiones abiertas, intente más tarde",
+            headers={"Retry-After": str(order_stream.RETRY_MILLISECONDS // 1000)},
+        )
+    try:
+        resume_from = int(last_event_id) if last_event_id else None
+    except ValueError:
+        # Id desconocido (anterior a todo lo guardado): se pide al portal que recargue
+        resume_from = -1
+    return StreamingResponse(
+        order_stream.stream(order_id, resume_from),
+        media_type="text/event-stream",
+        # Sin buffering en proxies (nginx) para que cada evento salga enseguida
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.post("/{order_id}/subscribe")
 def subscribe_to_order_notifications(
@@ -193,24 +290,64 @@ def unsubscribe_via_link(
         raise HTTPException(status_code=404, detail="No se encontró suscripción activa para esa orden y email")
     return {"message": "Has sido desuscrito de las notificaciones de esta orden.", "order_id": order_id, "email": email}
 
-@router.get("/{order_id}/photos")
-def get_order_photos(
+@router.get("/{order_id}/photos", response_model=List[RepairOrderPhotoPublic])
+async def get_order_photos(
     order_id: int,
-    db: Session = Depends(get_db)
+    response: Response,
+    limit: int = Query(None, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Endpoint público para obtener fotos de una orden.
+    Endpoint público para obtener las fotos de una orden, de la más nueva a la más vieja.
+    Devuelve solo metadatos con thumbnail_url y preview_url; si la página está completa,
+    el header X-Next-Cursor trae el cursor de la siguiente.
     """
-    from app.crud import crud_repair_order_photo
-    
-    order = db.query(RepairOrder).filter(RepairOrder.id == order_id).first()
-    
-    if not order:
-        raise HTTPException(
-            status_code=404,
-            detail="Orden no encontrada"
-        )
-    
-    # Obtener fotos reales de la base de datos
-    photos = crud_repair_order_photo.get_repair_order_photos(db=db, order_id=order_id)
+    limit = limit or settings.PHOTO_PAGE_SIZE
+    try:
+        photos = await crud_repair_order_photo.get_public_photo_page_async(db, order_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not photos and not cursor:
+        order_exists = await db.scalar(select(RepairOrder.id).where(RepairOrder.id == order_id))
+        if not order_exists:
+            raise HTTPException(
+                status_code=404,
+                detail="Orden no encontrada"
+            )
+    if len(photos) == limit:
+        response.headers["X-Next-Cursor"] = crud_repair_order_photo.encode_cursor(photos[-1])
     return photos
+
+@router.get("/{order_id}/photos/{photo_id}/{variant}")
+async def get_order_photo_image(
+    order_id: int,
+    photo_id: int,
+    variant: Literal["thumbnail", "preview"],
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Endpoint público: miniatura o vista previa JPEG de una foto. La imagen de una foto no
+    cambia, así que se sirve con caché de larga duración (immutable).
+    """
+    entry = photo_previews.get_cached(order_id, photo_id, variant)
+    if entry is None:
+        stored = await crud_repair_order_photo.get_photo_data_async(db, order_id=order_id, photo_id=photo_id)
+        if stored is None:
+            raise HTTPException(status_code=404, detail="Foto no encontrada")
+        url = photo_previews.external_url(stored)
+        if url:
+            return RedirectResponse(url)
+        try:
+            # Pillow es CPU intensivo: se ejecuta fuera del event loop
+            entry = await run_in_threadpool(photo_previews.build, order_id, photo_id, variant, stored)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    etag, content = entry
+    headers = {"ETag": etag, "Cache-Control": photo_previews.IMMUTABLE_CACHE_CONTROL}
+    if etag in (tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type="image/jpeg", headers=headers)
@@ -1,42 +1,64 @@
 # backend/app/api/v1/endpoints/customers.py
 
-from typing import List
-from fastapi import APIRouter, Depends, Query, HTTPException
+import io
+from typing import List, Optional
+from fastapi import APIRouter, Depends, File, Query, HTTPException, Response, UploadFile
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
+from app.core.config import settings
 from app.crud import crud_customer, crud_repair_order
+from app.services import customer_duplicates, customer_import
 from app.schemas import customer as schemas_customer
 from app.schemas import repair_order as schemas_repair_order
 # --- INICIO DE LA CORRECCIÓN DE SEGURIDAD ---
 from app.api.v1 import dependencies as deps
+from app.schemas.user import TokenData
 # --- FIN DE LA CORRECCIÓN DE SEGURIDAD ---
 
 router = APIRouter()
 
 @router.get("/", response_model=List[schemas_customer.Customer])
 def read_customers(
+    response: Response,
     db: Session = Depends(deps.get_db),
-    current_user: deps.User = Depends(deps.get_current_active_admin_or_receptionist),
+    claims: TokenData = Depends(deps.require_admin_or_receptionist),
     skip: int = 0,
-    limit: int = 100
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    branch_id: Optional[int] = None,
+    has_open_orders: Optional[bool] = None,
 ):
     """
-    Endpoint para obtener un listado de todos los clientes con su conteo de órdenes.
+    Endpoint para obtener un listado de clientes (por apellido) con su conteo de órdenes.
+    Si la página está completa, el header X-Next-Cursor trae el cursor de la siguiente
+    (paginación por clave).
     """
-    customers_with_count = crud_customer.get_customers(db, skip=skip, limit=limit)
-    response = []
+    try:
+        customers_with_count = crud_customer.get_customers(
+            db,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            branch_id=branch_id,
+            has_open_orders=has_open_orders,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response_items = []
     for customer_model, count in customers_with_count:
         customer_schema = schemas_customer.Customer.from_orm(customer_model)
         customer_schema.repair_orders_count = count
-        response.append(customer_schema)
-    return response
+        response_items.append(customer_schema)
+    if len(customers_with_count) == limit:
+        response.headers["X-Next-Cursor"] = crud_customer.encode_cursor(customers_with_count[-1][0])
+    return response_items
 
 @router.post("/", response_model=schemas_customer.Customer)
 def create_new_customer(
     customer: schemas_customer.CustomerCreate,
     db: Session = Depends(deps.get_db),
-    current_user: deps.User = Depends(deps.get_current_active_admin_or_receptionist)
+    claims: TokenData = Depends(deps.require_admin_or_receptionist)
 ):
     """
     Endpoint para crear un nuevo cliente.
@@ -51,12 +73,87 @@ def create_new_customer(
             detail=f"El DNI '{customer.dni}' ya se encuentra registrado."
         )
 
+@router.post("/import")
+def import_customers(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv o ndjson (por defecto según la extensión)"),
+    dry_run: bool = False,
+    db: Session = Depends(deps.get_db),
+    claims: TokenData = Depends(deps.require_admin)
+):
+    """
+    Importación masiva de clientes desde un CSV (con encabezado; separado por coma, punto
+    y coma o tabulación) o NDJSON. Las filas inválidas o duplicadas no frenan la
+    importación: se informan con su número de línea en `rows`. Con dry_run solo valida.
+    """
+    if file.size and file.size > settings.CUSTOMER_IMPORT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="El archivo supera el tamaño máximo permitido")
+    fmt = format or customer_import.detect_format(file.filename)
+    # El archivo se decodifica y recorre como stream, sin leerlo entero en memoria
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        return customer_import.import_customers(db, lines, fmt=fmt, dry_run=dry_run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        lines.detach()
+
+@router.get("/duplicates", response_model=List[schemas_customer.CustomerDuplicateCandidate])
+def read_duplicate_candidates(
+    status: str = Query(customer_duplicates.STATUS_PENDING, pattern="^(pending|dismissed)$"),
+    min_score: float = Query(0.0, ge=0, le=1),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(deps.get_db),
+    claims: TokenData = Depends(deps.require_admin)
+):
+    """
+    Pares de clientes que probablemente son la misma persona, del puntaje más alto al más
+    bajo. Los genera scripts/find_duplicate_customers.py.
+    """
+    return customer_duplicates.list_candidates(db, status=status, min_score=min_score, skip=skip, limit=limit)
+
+@router.post("/duplicates/{candidate_id}/dismiss", response_model=schemas_customer.CustomerDuplicateCandidate)
+def dismiss_duplicate_candidate(
+    candidate_id: int,
+    db: Session = Depends(deps.get_db),
+    claims: TokenData = Depends(deps.require_admin)
+):
+    """Marca un par como 'no son la misma persona'; no se vuelve a proponer."""
+    candidate = customer_duplicates.dismiss_candidate(db, candidate_id, user_id=claims.user_id)
+    if candidate is None:
+        raise HTTPException(status_code=404, detail="Par de clientes no encontrado")
+    return candidate
+
+@router.post("/{customer_id}/merge", response_model=schemas_customer.CustomerMergeResult)
+def merge_customer(
+    customer_id: int,
+    merge: schemas_customer.CustomerMerge,
+    db: Session = Depends(deps.get_db),
+    claims: TokenData = Depends(deps.require_admin)
+):
+    """
+    Fusiona el cliente `duplicate_id` en `customer_id`: sus órdenes (y las suscripciones
+    de email de esas órdenes) pasan a este cliente, se completan los datos que falten y el
+    duplicado se elimina. Todo en una sola transacción.
+    """
+    try:
+        merged = customer_duplicates.merge_customers(
+            db, keep_id=customer_id, duplicate_id=merge.duplicate_id, user_id=claims.user_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if merged is None:
+        raise HTTPException(status_code=404, detail="Cliente no encontrado")
+    customer, moved = merged
+    return {"customer": customer, "moved_orders": moved}
+
 @router.put("/{customer_id}", response_model=schemas_customer.Customer)
 def update_customer_details(
     customer_id: int,
     customer: schemas_customer.CustomerUpdate,
     db: Session = Depends(deps.get_db),
-    current_user: deps.User = Depends(deps.get_current_active_admin_or_receptionist)
+    claims: TokenData = Depends(deps.require_admin_or_receptionist)
 ):
     """
     Endpoint para actualizar los datos de un cliente.
@@ -70,7 +167,7 @@ def update_customer_details(
 def read_customer_orders(
     customer_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: deps.User = Depends(deps.get_current_active_admin_or_receptionist)
+    claims: TokenData = Depends(deps.require_admin_or_receptionist)
 ):
     """
     Endpoint para obtener las órdenes de reparación de un cliente específico.
@@ -83,12 +180,14 @@ def read_customer_orders(
 
 @router.get("/search", response_model=List[schemas_customer.Customer])
 def search_for_customers(
-    q: str = Query(..., min_length=3, description="Término de búsqueda para clientes (nombre, apellido, DNI)"),
+    q: str = Query(..., min_length=3, description="Término de búsqueda para clientes (nombre, apellido, DNI, teléfono)"),
+    limit: int = Query(None, ge=1, le=50),
     db: Session = Depends(deps.get_db),
-    current_user: deps.User = Depends(deps.get_current_active_user) # <-- Guardia añadido
+    claims: TokenData = Depends(deps.get_current_claims) # <-- Guardia añadido
 ):
     """
-    Endpoint para buscar clientes existentes.
+    Endpoint para buscar clientes existentes (autocompletado por prefijo de DNI,
+    teléfono, apellido o nombre).
     """
-    customers = crud_customer.search_customers(db, query=q)
+    customers = crud_customer.search_customers(db, query=q, limit=limit)
     return customers
@@ -4,17 +4,25 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.api.v1.dependencies import get_db
 from app.api.v1 import dependencies as deps
+from app.schemas.user import TokenData
 from app.models.user import User
 from app.models.roles import Role
 from app.models.branch import Branch
+from app.core.config import settings
+from app.core import reference_cache
+from app.core.log_throttle import log_throttle
+from app.core.rate_limit import rate_limiter
+from app.core.logger import structured_logger
 from app.core.security import verify_password, get_password_hash
+from app.db import session as db_session
+from app.db.pool_metrics import pool_stats
 
 router = APIRouter()
 
 @router.get("/db-status")
 def check_database_status(
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_admin)
+    claims: TokenData = Depends(deps.require_admin)
 ):
     """Endpoint para verificar el estado de la base de datos"""
     try:
@@ -57,7 +65,7 @@ def check_database_status(
 @router.post("/test-auth")
 def test_authentication(
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_admin)
+    claims: TokenData = Depends(deps.require_admin)
 ):
     """Endpoint para probar la autenticación del usuario admin"""
     try:
@@ -104,3 +112,63 @@ def test_authentication(
             "type": type(e).__name__,
             "traceback": traceback.format_exc()
         }
+
+@router.get("/pool-stats")
+def get_pool_stats(claims: TokenData = Depends(deps.require_admin)):
+    """
+    Telemetría del pool de conexiones de este worker: conexiones en uso, overflow,
+    esperas de checkout y timeouts. Cada worker tiene su propio pool.
+    """
+    import os
+    return {
+        "pid": os.getpid(),
+        "workers": os.getenv("WORKERS"),
+        "config": {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "pre_ping": settings.DB_POOL_PRE_PING,
+            "pre_ping_idle_seconds": settings.DB_POOL_PRE_PING_IDLE_SECONDS,
+            "statement_timeout_ms": settings.DB_STATEMENT_TIMEOUT_MS,
+            "statement_timeout_scope": settings.DB_STATEMENT_TIMEOUT_SCOPE,
+        },
+        "pools": pool_stats(),
+        "replica": db_session.replica_router.stats() if db_session.replica_router else None,
+    }
+
+@router.get("/rate-limits")
+def get_rate_limit_stats(claims: TokenData = Depends(deps.require_admin)):
+    """
+    Reglas de límite por IP y contadores de este worker: requests permitidos y rechazados
+    con 429 por regla.
+    """
+    return rate_limiter.stats()
+
+@router.get("/reference-cache")
+def get_reference_cache_stats(claims: TokenData = Depends(deps.require_admin)):
+    """Estado de la caché de tablas de referencia de este worker (versiones, aciertos, cargas)."""
+    return reference_cache.reference_cache.stats()
+
+@router.post("/reference-cache/invalidate")
+def invalidate_reference_cache(
+    table: str = None,
+    claims: TokenData = Depends(deps.require_admin)
+):
+    """
+    Invalida la caché de referencia en todos los workers (una tabla o todas). Útil tras
+    editar estados, tipos de dispositivo o roles directamente en la base de datos.
+    """
+    model = reference_cache.MODELS_BY_TABLE.get(table) if table else None
+    if table and model is None:
+        raise HTTPException(status_code=404, detail=f"Tabla de referencia desconocida: {table}")
+    reference_cache.invalidate(model)
+    return reference_cache.reference_cache.stats()
+
+@router.get("/error-fingerprints")
+def get_error_fingerprints(limit: int = 20, claims: TokenData = Depends(deps.require_admin)):
+    """Errores más repetidos en este worker: ocurrencias, entradas escritas y omitidas por huella."""
+    return {
+        "writer": structured_logger.writer_stats(),
+        "fingerprints": log_throttle.stats(limit),
+    }
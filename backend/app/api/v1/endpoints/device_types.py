@@ -8,7 +8,7 @@ from app.crud import crud_device_type
 from app.schemas import device_type as schemas_device_type
 # --- INICIO DE LA CORRECCIÓN DE SEGURIDAD ---
 from app.api.v1 import dependencies as deps
-from app.models.user import User
+from app.schemas.user import TokenData
 # --- FIN DE LA CORRECCIÓN DE SEGURIDAD ---
 
 router = APIRouter()
@@ -16,7 +16,7 @@ router = APIRouter()
 @router.get("/", response_model=List[schemas_device_type.DeviceType])
 def read_device_types(
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user) # <-- Guardia añadido
+    claims: TokenData = Depends(deps.get_current_claims) # <-- Guardia añadido
 ):
     """
     Endpoint para obtener la lista de todos los tipos de dispositivos.
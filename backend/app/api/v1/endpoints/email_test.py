@@ -5,7 +5,7 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.api.v1 import dependencies as deps
-from app.models.user import User
+from app.schemas.user import TokenData
 from app.services.email_transaccional import EmailTransactionalService
 
 router = APIRouter()
@@ -19,7 +19,7 @@ class EmailTestPayload(BaseModel):
 def send_test_email(
     payload: EmailTestPayload,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_admin)
+    claims: TokenData = Depends(deps.require_admin)
 ):
     """
     Envía un correo de prueba al destinatario indicado. Solo administradores.
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Query, Request
 from app.schemas.error_report import ErrorReport
+from app.schemas.user import TokenData
 from app.api.v1.dependencies import get_user_from_token, get_db
+from app.api.v1 import dependencies as deps
 from sqlalchemy.orm import Session
 from fastapi import Depends
 from app.core.logger import structured_logger
@@ -55,3 +57,16 @@ async def submit_error_report(payload: ErrorReport, request: Request, db: Sessio
         "message": "Reporte recibido",
         "request_id": getattr(request.state, "request_id", None)
     }
+
+@router.get("/summary")
+def get_error_reports_summary(
+    days: int = Query(7, ge=1, le=90),
+    claims: TokenData = Depends(deps.require_admin)
+):
+    """
+    Resumen de errores de los últimos `days` días (solo admin): totales por categoría y
+    severidad, últimos errores críticos e histograma por hora (hora local del servidor),
+    acumulado y por día. Se arma con los índices diarios que mantiene el hilo escritor,
+    sin recorrer los archivos de log.
+    """
+    return structured_logger.get_error_summary(days)
@@ -6,19 +6,21 @@ from sqlalchemy.exc import IntegrityError
 
 from app.api.v1.dependencies import get_db
 from app.api.v1 import dependencies as deps
+from app.schemas.user import TokenData
 from app.models.user import User
 from app.models.roles import Role
 from app.models.branch import Branch
 from app.models.status_order import StatusOrder
 from app.models.device_type import DeviceType
 from app.core.security import get_password_hash
+from app.core import reference_cache
 
 router = APIRouter()
 
 @router.post("/production-data")
 def initialize_production_data(
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_admin)
+    claims: TokenData = Depends(deps.require_admin)
 ):
     """
     Endpoint para inicializar datos básicos en producción.
@@ -89,6 +91,7 @@ def initialize_production_data(
 
         # Commit de datos básicos
         db.commit()
+        reference_cache.invalidate()
 
         # 5. Crear usuario administrador
         admin_user = User(
@@ -143,7 +146,7 @@ def initialize_production_data(
 @router.get("/health")
 def check_database_health(
     db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_admin)
+    claims: TokenData = Depends(deps.require_admin)
 ):
     """
     Endpoint para verificar la salud de la base de datos.
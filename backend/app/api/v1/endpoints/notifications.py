@@ -1,7 +1,7 @@
 # backend/app/api/v1/endpoints/notifications.py
 
 from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import asyncio
 import json
@@ -10,32 +10,33 @@ import logging
 from app.core.websockets import manager
 from app.crud import crud_notification
 from app.schemas import notification as schemas_notification
-from app.models.user import User
-from app.api.v1.dependencies import get_db, get_current_user, get_user_from_token
+from app.api.v1.dependencies import get_async_db, get_current_claims, get_user_from_token
+from app.db.session import run_db
+from app.schemas.user import TokenData
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 @router.get("/", response_model=List[schemas_notification.Notification])
-def get_user_notifications(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_user_notifications(
+    db: AsyncSession = Depends(get_async_db),
+    claims: TokenData = Depends(get_current_claims)
 ):
     """
     Obtiene el historial de notificaciones para el usuario actual.
     """
-    return crud_notification.get_notifications_for_user(db, user_id=current_user.id)
+    return await crud_notification.get_notifications_for_user_async(db, user_id=claims.user_id)
 
 @router.post("/{notification_id}/read", response_model=schemas_notification.Notification)
-def mark_as_read(
+async def mark_as_read(
     notification_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    claims: TokenData = Depends(get_current_claims)
 ):
     """
     Marca una notificación específica como leída.
     """
-    db_notification = crud_notification.mark_notification_as_read(db, notification_id=notification_id, user_id=current_user.id)
+    db_notification = await crud_notification.mark_notification_as_read_async(db, notification_id=notification_id, user_id=claims.user_id)
     if not db_notification:
         raise HTTPException(status_code=404, detail="Notificación no encontrada o no pertenece al usuario.")
     return db_notification
@@ -52,16 +53,12 @@ async def websocket_endpoint(websocket: WebSocket):
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
 
-    db = next(get_db())
-    current_user = None
-    try:
-        current_user = get_user_from_token(db=db, token=token)
-        if not current_user or not getattr(current_user, "is_active", False):
-            logger.warning(f"WS connection rejected: Invalid or inactive user (token: {token[:10]}...)")
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-            return
-    finally:
-        db.close()
+    # La validación del token puede consultar la BD: se hace sin bloquear el event loop
+    current_user = await run_db(lambda db: get_user_from_token(db=db, token=token))
+    if not current_user or not getattr(current_user, "is_active", False):
+        logger.warning(f"WS connection rejected: Invalid or inactive user (token: {token[:10]}...)")
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
 
     # Conectar al gestor de conexiones
     await manager.connect(websocket, current_user)
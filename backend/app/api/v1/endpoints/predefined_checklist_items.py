@@ -4,21 +4,22 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.api.v1.dependencies import get_db, get_current_user
+from app.api.v1.dependencies import get_db, get_current_claims
+from app.core.permissions import Permission
+from app.schemas.user import TokenData
 from app.schemas.predefined_checklist_item import (
     PredefinedChecklistItem,
     PredefinedChecklistItemCreate,
     PredefinedChecklistItemUpdate
 )
 from app.crud import crud_predefined_checklist_item
-from app.models.user import User
 
 router = APIRouter()
 
 @router.get("/", response_model=List[PredefinedChecklistItem])
 def get_predefined_questions(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    claims: TokenData = Depends(get_current_claims)
 ):
     """Obtener todas las preguntas predefinidas"""
     return crud_predefined_checklist_item.get_predefined_questions(db)
@@ -26,7 +27,7 @@ def get_predefined_questions(
 @router.get("/default", response_model=List[PredefinedChecklistItem])
 def get_default_selected_questions(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    claims: TokenData = Depends(get_current_claims)
 ):
     """Obtener preguntas que están marcadas como seleccionadas por defecto"""
     return crud_predefined_checklist_item.get_default_selected_questions(db)
@@ -35,10 +36,10 @@ def get_default_selected_questions(
 def create_predefined_question(
     question: PredefinedChecklistItemCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    claims: TokenData = Depends(get_current_claims)
 ):
     """Crear una nueva pregunta predefinida (solo administradores)"""
-    if current_user.role.role_name != "Administrator":
+    if not claims.permissions & Permission.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Solo los administradores pueden crear preguntas predefinidas"
@@ -57,10 +58,10 @@ def update_predefined_question(
     question_id: int,
     question_update: PredefinedChecklistItemUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    claims: TokenData = Depends(get_current_claims)
 ):
     """Actualizar una pregunta predefinida (solo administradores)"""
-    if current_user.role.role_name != "Administrator":
+    if not claims.permissions & Permission.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Solo los administradores pueden actualizar preguntas predefinidas"
@@ -86,10 +87,10 @@ def update_predefined_question(
 def delete_predefined_question(
     question_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    claims: TokenData = Depends(get_current_claims)
 ):
     """Eliminar una pregunta predefinida (solo administradores)"""
-    if current_user.role.role_name != "Administrator":
+    if not claims.permissions & Permission.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Solo los administradores pueden eliminar preguntas predefinidas"
@@ -108,10 +109,10 @@ def delete_predefined_question(
 def update_default_selection(
     question_ids: List[int],
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    claims: TokenData = Depends(get_current_claims)
 ):
     """Actualizar qué preguntas están seleccionadas por defecto (solo administradores)"""
-    if current_user.role.role_name != "Administrator":
+    if not claims.permissions & Permission.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Solo los administradores pueden configurar preguntas por defecto"
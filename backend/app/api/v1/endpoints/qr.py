@@ -1,28 +1,50 @@
-from fastapi import APIRouter, Query
+from typing import List, Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import Response
-import qrcode
-from io import BytesIO
-from PIL import Image
+
+from app.api.v1 import dependencies as deps
+from app.core.config import settings
+from app.schemas.qr import QrBatchItem, QrBatchRequest
+from app.schemas.user import TokenData
+from app.services import qr_codes
 
 router = APIRouter()
 
 @router.get("/qr")
-def generate_qr(data: str = Query(..., min_length=1), size: int = Query(120, ge=64, le=512)):
-    qr = qrcode.QRCode(
-        version=None,
-        error_correction=qrcode.constants.ERROR_CORRECT_M,
-        box_size=2,
-        border=0,
-    )
-    qr.add_data(data)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    img = img.convert("RGB")
-    img = img.resize((size, size), Image.NEAREST)
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    return Response(content=buf.getvalue(), media_type="image/png")
+def generate_qr(
+    request: Request,
+    data: str = Query(..., min_length=1),
+    size: int = Query(120, ge=64, le=512),
+    format: Literal["png", "svg"] = "png",
+):
+    """
+    Imagen QR de `data`. Se genera una vez por worker y se sirve desde la caché, con ETag
+    (304 si el navegador ya la tiene) y caché de larga duración.
+    """
+    etag, content, media_type = qr_codes.get_qr(data, size, format)
+    headers = {"ETag": etag, "Cache-Control": qr_codes.IMMUTABLE_CACHE_CONTROL}
+    if etag in (tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type=media_type, headers=headers)
 
 @router.head("/qr")
 def head_qr():
     return Response(status_code=200)
+
+@router.post("/qr/batch", response_model=List[QrBatchItem])
+def generate_qr_batch(
+    batch: QrBatchRequest,
+    claims: TokenData = Depends(deps.get_current_claims)
+):
+    """
+    QR de varias órdenes en una sola respuesta (impresión masiva de tickets): por cada
+    orden, el enlace al portal y la imagen como data URL.
+    """
+    if len(batch.order_ids) > settings.QR_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Máximo {settings.QR_BATCH_MAX_ITEMS} órdenes por pedido")
+    items = []
+    for order_id in dict.fromkeys(batch.order_ids):
+        data = qr_codes.order_portal_url(order_id, batch.base_url)
+        entry = qr_codes.get_qr(data, batch.size, batch.format)
+        items.append({"order_id": order_id, "data": data, "image": qr_codes.as_data_url(entry)})
+    return items
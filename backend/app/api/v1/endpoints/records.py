@@ -1,35 +1,68 @@
+from datetime import datetime, timedelta, timezone
 from typing import List, Optional
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from app.schemas.record import Record as RecordSchema
 from app.schemas.record import RecordFilter
 from app.crud import crud_record
-from app.models.user import User
 from app.api.v1 import dependencies as deps
+from app.schemas.user import TokenData
 
 router = APIRouter()
 
+def _parse_date(value: Optional[str], name: str, end_of_day: bool = False) -> Optional[datetime]:
+    """
+    Acepta 'YYYY-MM-DD' o un datetime ISO 8601. Una fecha sola como límite superior
+    incluye el día completo. Las fechas con zona horaria se pasan a UTC sin zona,
+    igual que created_at.
+    """
+    if not value:
+        return None
+    try:
+        if len(value) == 10:
+            parsed = datetime.strptime(value, "%Y-%m-%d")
+            return parsed + timedelta(days=1, microseconds=-1) if end_of_day else parsed
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Fecha inválida en '{name}': use YYYY-MM-DD o ISO 8601.")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
 @router.get("/", response_model=List[RecordSchema])
 def read_records(
+    response: Response,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    claims: TokenData = Depends(deps.get_current_claims),
     type: Optional[str] = None,
     user_id: Optional[int] = None,
     branch_id: Optional[int] = None,
     order_id: Optional[int] = None,
     from_date: Optional[str] = None,
     to_date: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=500),
 ):
+    """
+    Historial de registros del más reciente al más antiguo. Si la página está completa,
+    el header X-Next-Cursor trae el cursor de la siguiente (paginación por clave).
+    """
     filters = RecordFilter(
         type=type,
         user_id=user_id,
         branch_id=branch_id,
         order_id=order_id,
-        from_date=None,
-        to_date=None,
+        from_date=_parse_date(from_date, "from_date"),
+        to_date=_parse_date(to_date, "to_date", end_of_day=True),
+        cursor=cursor,
         skip=skip,
         limit=limit,
     )
-    return crud_record.get_records(db, filters)
+    try:
+        records = crud_record.get_records(db, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(records) == limit:
+        response.headers["X-Next-Cursor"] = crud_record.encode_cursor(records[-1])
+    return records
@@ -9,8 +9,8 @@ from PIL import Image, ImageOps
 
 from app.schemas import repair_order_photo as schemas_photo
 from app.crud import crud_repair_order_photo, crud_repair_order
-from app.models.user import User
 from app.api.v1 import dependencies as deps
+from app.schemas.user import TokenData
 from app.services.email_transaccional import EmailTransactionalService
 
 router = APIRouter()
@@ -63,7 +63,7 @@ def test_upload(
     order_id: int = Form(...),
     note: str = Form(None),
     file: UploadFile = File(...),
-    current_user: User = Depends(deps.get_current_active_admin)
+    claims: TokenData = Depends(deps.require_admin)
 ):
     """Endpoint de prueba para diagnosticar problemas de upload"""
     return {"message": "Test successful", "order_id": order_id, "note": note, "filename": file.filename}
@@ -75,7 +75,7 @@ def create_repair_order_photo(
     file: UploadFile = File(...),
     background_tasks: BackgroundTasks = None,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    claims: TokenData = Depends(deps.get_current_claims)
 ):
     """Subir una nueva foto para una orden de reparación"""
     
@@ -143,7 +143,7 @@ def create_repair_order_photo(
 def get_repair_order_photos(
     order_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    claims: TokenData = Depends(deps.get_current_claims)
 ):
     """Obtener todas las fotos de una orden de reparación"""
     # Verificar que la orden existe
@@ -159,7 +159,7 @@ def update_repair_order_photo(
     photo_id: int,
     photo_update: schemas_photo.RepairOrderPhotoUpdate,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    claims: TokenData = Depends(deps.get_current_claims)
 ):
     """Actualizar la nota de una foto"""
     photo = crud_repair_order_photo.update_repair_order_photo(
@@ -175,7 +175,7 @@ def update_photo_annotations(
     photo_id: int,
     annotations: schemas_photo.RepairOrderPhotoUpdate,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    claims: TokenData = Depends(deps.get_current_claims)
 ):
     """Actualizar marcadores y dibujos de una foto"""
     photo = crud_repair_order_photo.update_repair_order_photo(
@@ -190,7 +190,7 @@ def update_photo_annotations(
 def delete_repair_order_photo(
     photo_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user)
+    claims: TokenData = Depends(deps.get_current_claims)
 ):
     """Eliminar una foto"""
     success = crud_repair_order_photo.delete_repair_order_photo(db=db, photo_id=photo_id)
@@ -1,21 +1,23 @@
 # backend/app/api/v1/endpoints/repair_orders.py
 
-from typing import List
+from typing import List, Literal
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Response, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import traceback
 
 from app.schemas import repair_order as schemas_repair_order
 from app.crud import crud_repair_order
-from app.models.user import User
+from app.schemas.user import TokenData
 from app.api.v1 import dependencies as deps
+from app.services import ticket_renderer
 
 router = APIRouter()
 
 @router.get("/")
-def read_repair_orders(
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+async def read_repair_orders(
+    db: AsyncSession = Depends(deps.get_async_db),
+    claims: TokenData = Depends(deps.get_current_claims),
     # Parámetros de paginación
     page: int = 1,
     page_size: int = 20,
@@ -51,9 +53,8 @@ def read_repair_orders(
         skip = (page - 1) * page_size
         
         # Obtener órdenes con conteo total
-        orders, total_count = crud_repair_order.get_repair_orders(
+        orders, total_count = await crud_repair_order.get_repair_orders_async(
             db=db,
-            user=current_user,
             skip=skip,
             limit=page_size,
             order_id=order_id,
@@ -65,10 +66,10 @@ def read_repair_orders(
             branch_id=branch_id
         )
         
-        # Agregar información del creador a cada orden
+        # Agregar información del creador a cada orden (una sola consulta para la página)
+        creators = await crud_repair_order.get_order_creators_async(db, [order.id for order in orders])
         for order in orders:
-            creator = crud_repair_order.get_order_creator(db, order.id)
-            setattr(order, 'creator', creator)
+            setattr(order, 'creator', creators.get(order.id))
         
         # Calcular total de páginas
         total_pages = (total_count + page_size - 1) // page_size if total_count > 0 else 0
@@ -88,21 +89,42 @@ def read_repair_orders(
         raise HTTPException(status_code=500, detail="Ocurrió un error en el servidor al consultar las órdenes.")
 
 @router.get("/{order_id}", response_model=schemas_repair_order.RepairOrder)
-def read_repair_order(order_id: int, db: Session = Depends(deps.get_db), current_user: User = Depends(deps.get_current_active_user)):
-    db_order = crud_repair_order.get_repair_order(db, order_id=order_id)
+async def read_repair_order(order_id: int, db: AsyncSession = Depends(deps.get_async_db), claims: TokenData = Depends(deps.get_current_claims)):
+    db_order = await crud_repair_order.get_repair_order_async(db, order_id=order_id)
     if db_order is None:
         raise HTTPException(status_code=404, detail="Orden no encontrada")
     return db_order
 
+@router.get("/{order_id}/ticket")
+async def read_repair_order_ticket(
+    order_id: int,
+    kind: Literal["client", "workshop"] = "client",
+    format: Literal["html", "text", "escpos"] = "html",
+    db: AsyncSession = Depends(deps.get_async_db),
+    claims: TokenData = Depends(deps.get_current_claims),
+):
+    """
+    Ticket de la orden con la plantilla de su sucursal, listo para imprimir.
+    html para imprimir desde el navegador; text y escpos para impresoras térmicas.
+    """
+    db_order = await crud_repair_order.get_order_for_ticket_async(db, order_id=order_id)
+    if db_order is None:
+        raise HTTPException(status_code=404, detail="Orden no encontrada")
+    content, media_type = ticket_renderer.render(db_order, kind, format)
+    headers = {"Cache-Control": "no-store"}
+    if format == "escpos":
+        headers["Content-Disposition"] = f'attachment; filename="orden-{order_id}-{kind}.bin"'
+    return Response(content=content, media_type=media_type, headers=headers)
+
 @router.post("/", response_model=schemas_repair_order.RepairOrder)
 def create_new_repair_order(
         order: schemas_repair_order.RepairOrderCreate,
         background_tasks: BackgroundTasks,
         db: Session = Depends(deps.get_db),
-        current_user: User = Depends(deps.get_current_active_admin_or_receptionist)
+        claims: TokenData = Depends(deps.require_admin_or_receptionist)
 ):
     try:
-        new_order = crud_repair_order.create_repair_order(db=db, order=order, background_tasks=background_tasks, user_id=current_user.id)
+        new_order = crud_repair_order.create_repair_order(db=db, order=order, background_tasks=background_tasks, user_id=claims.user_id)
         return new_order
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -115,9 +137,9 @@ def take_order(
         order_id: int,
         background_tasks: BackgroundTasks,
         db: Session = Depends(deps.get_db),
-        current_user: User = Depends(deps.get_current_active_technician_or_admin)
+        claims: TokenData = Depends(deps.require_technician_or_admin)
 ):
-    technician_id = current_user.id
+    technician_id = claims.user_id
     updated_order = crud_repair_order.assign_technician_and_start_process(
         db=db, order_id=order_id, technician_id=technician_id, background_tasks=background_tasks
     )
@@ -131,10 +153,10 @@ def complete_order(
     order_update: schemas_repair_order.RepairOrderUpdate,
     background_tasks: BackgroundTasks,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_technician_or_admin)
+    claims: TokenData = Depends(deps.require_technician_or_admin)
 ):
     updated_order = crud_repair_order.complete_technician_work(
-        db=db, order_id=order_id, order_update=order_update, background_tasks=background_tasks, user_id=current_user.id
+        db=db, order_id=order_id, order_update=order_update, background_tasks=background_tasks, user_id=claims.user_id
     )
     if updated_order is None:
         raise HTTPException(status_code=404, detail="Orden no encontrada para completar.")
@@ -146,14 +168,14 @@ def update_order_details_endpoint(
     order_update: schemas_repair_order.RepairOrderDetailsUpdate,
     background_tasks: BackgroundTasks,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_admin_or_receptionist)
+    claims: TokenData = Depends(deps.require_admin_or_receptionist)
 ):
     updated_order = crud_repair_order.update_order_details(
         db=db,
         order_id=order_id,
         order_update=order_update,
         background_tasks=background_tasks,
-        user_id=current_user.id
+        user_id=claims.user_id
     )
     if updated_order is None:
         raise HTTPException(status_code=404, detail="Orden no encontrada para actualizar.")
@@ -164,7 +186,7 @@ def delete_order(
         order_id: int,
         background_tasks: BackgroundTasks,
         db: Session = Depends(deps.get_db),
-        current_user: User = Depends(deps.get_current_active_admin)
+        claims: TokenData = Depends(deps.require_admin)
 ):
     success = crud_repair_order.delete_repair_order(db=db, order_id=order_id, background_tasks=background_tasks)
     if not success:
@@ -176,7 +198,7 @@ def reopen_order_endpoint(
     order_id: int,
     background_tasks: BackgroundTasks,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user_all_roles)
+    claims: TokenData = Depends(deps.require_all_roles)
 ):
     reopened_order = crud_repair_order.reopen_order(db=db, order_id=order_id, background_tasks=background_tasks)
     if reopened_order is None:
@@ -188,7 +210,7 @@ def deliver_order(
     order_id: int,
     background_tasks: BackgroundTasks,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_admin_or_receptionist)
+    claims: TokenData = Depends(deps.require_admin_or_receptionist)
 ):
     """
     Marca una orden como 'Entregada'.
@@ -197,7 +219,7 @@ def deliver_order(
     """
     try:
         # --- INICIO DE LA CORRECCIÓN ---
-        delivered_order = crud_repair_order.mark_as_delivered(db=db, order_id=order_id, background_tasks=background_tasks, user_id=current_user.id)
+        delivered_order = crud_repair_order.mark_as_delivered(db=db, order_id=order_id, background_tasks=background_tasks, user_id=claims.user_id)
         # --- FIN DE LA CORRECCIÓN ---
         return delivered_order
     except ValueError as e:
@@ -214,7 +236,7 @@ def transfer_order(
     transfer_data: schemas_repair_order.RepairOrderTransfer,
     background_tasks: BackgroundTasks,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_admin_or_receptionist)
+    claims: TokenData = Depends(deps.require_admin_or_receptionist)
 ):
     """
     Transfiere una orden de reparación a otra sucursal.
@@ -227,7 +249,7 @@ def transfer_order(
             order_id=order_id, 
             target_branch_id=transfer_data.target_branch_id,
             background_tasks=background_tasks,
-            user_id=current_user.id
+            user_id=claims.user_id
         )
         return transferred_order
     except ValueError as e:
@@ -244,7 +266,7 @@ def update_order_diagnosis(
     diagnosis_update: schemas_repair_order.RepairOrderDiagnosisUpdate,
     background_tasks: BackgroundTasks,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_technician_or_admin)
+    claims: TokenData = Depends(deps.require_technician_or_admin)
 ):
     """
     Actualizar solo los campos de diagnóstico y notas de reparación.
@@ -255,7 +277,7 @@ def update_order_diagnosis(
         order_id=order_id,
         diagnosis_update=diagnosis_update,
         background_tasks=background_tasks,
-        user_id=current_user.id
+        user_id=claims.user_id
     )
     if updated_order is None:
         raise HTTPException(status_code=404, detail="Orden no encontrada para actualizar.")
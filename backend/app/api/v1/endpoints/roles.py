@@ -5,18 +5,20 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from app import models
 from app.crud import crud_role
+from app.core import reference_cache
 from app.schemas.role import Role
 from app.api.v1 import dependencies as deps
+from app.schemas.user import TokenData
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Role])
 def read_roles(
     db: Session = Depends(deps.get_db),
-    current_user: models.user.User = Depends(deps.get_current_active_user), # <-- Guardia actualizado
+    claims: TokenData = Depends(deps.get_current_claims), # <-- Guardia actualizado
 ):
     """
     Obtiene una lista de todos los roles. Solo para usuarios activos.
     """
-    roles = db.query(models.roles.Role).all()
+    roles = reference_cache.get_all(db, models.roles.Role)
     return roles
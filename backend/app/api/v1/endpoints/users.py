@@ -7,7 +7,7 @@ from app.crud import crud_user, crud_role, crud_branch
 from sqlalchemy.exc import IntegrityError
 from app.models.user import User
 from app.api.v1 import dependencies as deps
-from app.schemas.user import UserWithRole, UserCreateByAdmin, UserUpdateByAdmin
+from app.schemas.user import UserWithRole, UserCreateByAdmin, UserUpdateByAdmin, TokenData
 
 router = APIRouter()
 
@@ -25,7 +25,7 @@ def read_users(
     skip: int = 0,
     limit: int = 100,
     status: str = 'all',
-    current_user: User = Depends(deps.get_current_active_user),
+    claims: TokenData = Depends(deps.get_current_claims),
 ):
     """
     Recupera una lista de usuarios.
@@ -39,7 +39,7 @@ def create_user(
     *,
     db: Session = Depends(deps.get_db),
     user_in: UserCreateByAdmin,
-    current_user: User = Depends(deps.get_current_active_admin),
+    claims: TokenData = Depends(deps.require_admin),
 ):
     """
     Crea un nuevo usuario (solo para administradores).
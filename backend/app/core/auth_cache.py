@@ -0,0 +1,107 @@
+# backend/app/core/auth_cache.py
+
+"""
+Caché token -> usuario para la cadena de dependencias de autenticación.
+
+Las entradas se indexan por (username, exp) del JWT y guardan una instancia de
+User *desacoplada* de cualquier sesión (con su rol y sucursal ya cargados). Cada
+request obtiene su propia copia con `Session.merge(load=False)`, que no emite SQL.
+
+También cachea la versión vigente de los tokens de cada usuario (user_id -> token_version),
+que permite revocar tokens con claims sin cargar la fila del usuario en cada request. Un
+usuario inactivo se cachea como revocado: los guardias basados en claims también lo rechazan.
+"""
+
+import time
+from typing import Any, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache, invalidation_bus
+from app.core.config import settings
+from app.models.user import User
+
+AUTH_USER_NAMESPACE = "auth_user"
+TOKEN_VERSION_NAMESPACE = "auth_token_version"
+
+user_cache = TTLCache(
+    maxsize=settings.AUTH_USER_CACHE_MAX_ENTRIES,
+    ttl=settings.AUTH_USER_CACHE_TTL_SECONDS,
+)
+token_version_cache = TTLCache(
+    maxsize=settings.AUTH_USER_CACHE_MAX_ENTRIES,
+    ttl=settings.AUTH_TOKEN_VERSION_TTL_SECONDS,
+)
+
+
+def _apply_invalidation(username: Optional[str]) -> None:
+    if username is None:
+        user_cache.clear()
+    else:
+        user_cache.discard_where(lambda key: key[0] == username)
+
+
+def _apply_token_version_invalidation(user_id: Optional[int]) -> None:
+    if user_id is None:
+        token_version_cache.clear()
+    else:
+        token_version_cache.pop(int(user_id))
+
+
+# Valor cacheado para usuarios inactivos: ningún token vale (las versiones empiezan en 0)
+_INACTIVE = -1
+
+invalidation_bus.register(AUTH_USER_NAMESPACE, _apply_invalidation)
+invalidation_bus.register(TOKEN_VERSION_NAMESPACE, _apply_token_version_invalidation)
+
+
+def get_cached_user(db: Session, username: str, exp: Any) -> Optional[User]:
+    """Retorna una copia del usuario ligada a `db`, o None si no está en caché."""
+    cached = user_cache.get((username, exp))
+    if cached is None:
+        return None
+    return db.merge(cached, load=False)
+
+
+def cache_user(db: Session, user: User, exp: Any) -> User:
+    """
+    Guarda en caché un usuario recién cargado (con role y branch ya cargados) y
+    retorna la copia ligada a `db` que debe usar el request.
+    """
+    ttl = settings.AUTH_USER_CACHE_TTL_SECONDS
+    if isinstance(exp, (int, float)):
+        # Nunca conservar la entrada más allá de la expiración del token
+        ttl = min(ttl, exp - time.time())
+    if ttl <= 0:
+        return user
+    for obj in (user.role, user.branch, user):
+        if obj is not None and obj in db:
+            db.expunge(obj)
+    user_cache.set((user.username, exp), user, ttl=ttl)
+    return db.merge(user, load=False)
+
+
+def invalidate_user(username: Optional[str] = None) -> None:
+    """Invalida las entradas de un usuario (o todas si username es None) en todos los workers."""
+    invalidation_bus.publish(AUTH_USER_NAMESPACE, username)
+
+
+def get_token_version(db: Session, user_id: int) -> Optional[int]:
+    """
+    Versión vigente de los tokens del usuario; None si el usuario no existe o está inactivo
+    (sus tokens dejan de valer aunque la desactivación no haya incrementado la versión).
+    """
+    version = token_version_cache.get(user_id)
+    if version is not None:
+        return None if version == _INACTIVE else version
+    row = db.query(User.token_version, User.is_active).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    version = (row.token_version or 0) if row.is_active else _INACTIVE
+    token_version_cache.set(user_id, version)
+    return None if version == _INACTIVE else version
+
+
+def invalidate_token_version(user_id: Optional[int] = None) -> None:
+    """Descarta la versión cacheada para que la próxima validación lea la vigente."""
+    invalidation_bus.publish(TOKEN_VERSION_NAMESPACE, user_id)
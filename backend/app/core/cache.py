@@ -0,0 +1,175 @@
+# backend/app/core/cache.py
+
+"""
+Cachés en memoria del proceso y bus de invalidación entre workers.
+
+Cada worker de Uvicorn mantiene sus propias cachés. Cuando un dato cambia, el
+código que lo modifica publica una invalidación en el bus: se aplica de inmediato
+en el worker local y, si hay REDIS_URL configurado, se reenvía al resto de los
+workers mediante Redis pub/sub. Sin Redis el bus funciona solo en local y el TTL
+de cada caché acota la ventana de datos desactualizados.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+from uuid import uuid4
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Caché LRU con expiración por entrada, segura para uso desde varios hilos."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Elimina las entradas cuya clave cumpla el predicado. Retorna cuántas se eliminaron."""
+        with self._lock:
+            keys = [k for k in self._data if predicate(k)]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+class InvalidationBus:
+    """
+    Distribuye señales de invalidación por espacio de nombres (namespace).
+
+    Los manejadores reciben la clave publicada (o None para "invalidar todo").
+    Las claves deben ser serializables a JSON para viajar entre workers.
+    """
+
+    CHANNEL = "tecnomundo:cache-invalidation"
+
+    def __init__(self, redis_url: str = ""):
+        self.redis_url = redis_url
+        self.origin = uuid4().hex
+        self._handlers: Dict[str, List[Callable[[Any], None]]] = {}
+        self._lock = threading.Lock()
+        self._redis = None
+        self._listener: Optional[threading.Thread] = None
+
+    def register(self, namespace: str, handler: Callable[[Any], None]) -> None:
+        with self._lock:
+            self._handlers.setdefault(namespace, []).append(handler)
+        self._ensure_listener()
+
+    def publish(self, namespace: str, key: Any = None) -> None:
+        self._dispatch(namespace, key)
+        client = self._get_redis()
+        if client is None:
+            return
+        message = json.dumps({"ns": namespace, "key": key, "origin": self.origin}, default=str)
+        try:
+            client.publish(self.CHANNEL, message)
+        except Exception as e:
+            logger.warning(f"[Cache] No se pudo publicar la invalidación '{namespace}' en Redis: {e}")
+
+    def _dispatch(self, namespace: str, key: Any) -> None:
+        for handler in list(self._handlers.get(namespace, [])):
+            try:
+                handler(key)
+            except Exception as e:
+                logger.warning(f"[Cache] Error aplicando invalidación '{namespace}': {e}")
+
+    def _get_redis(self):
+        if not self.redis_url:
+            return None
+        if self._redis is None:
+            try:
+                import redis
+                self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=2, socket_connect_timeout=2)
+            except Exception as e:
+                logger.warning(f"[Cache] Redis no disponible ({e}); invalidaciones solo locales.")
+                self.redis_url = ""
+                return None
+        return self._redis
+
+    def _ensure_listener(self) -> None:
+        if self._listener is not None or self._get_redis() is None:
+            return
+        with self._lock:
+            if self._listener is not None:
+                return
+            self._listener = threading.Thread(target=self._listen, name="cache-invalidation-bus", daemon=True)
+            self._listener.start()
+
+    def _listen(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                import redis
+                # Conexión propia sin socket_timeout: la suscripción pasa largos periodos inactiva
+                listener_client = redis.Redis.from_url(self.redis_url, socket_keepalive=True)
+                pubsub = listener_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.CHANNEL)
+                backoff = 1.0
+                for message in pubsub.listen():
+                    try:
+                        data = json.loads(message["data"])
+                    except (TypeError, ValueError):
+                        continue
+                    if data.get("origin") == self.origin:
+                        continue
+                    self._dispatch(data.get("ns"), data.get("key"))
+            except Exception as e:
+                logger.warning(f"[Cache] Suscripción a Redis interrumpida: {e}. Reintentando en {backoff:.0f}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+
+invalidation_bus = InvalidationBus(settings.REDIS_URL)
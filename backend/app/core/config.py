@@ -16,6 +16,46 @@ class Settings:
     DB_SSLROOTCERT = os.getenv("DB_SSLROOTCERT")
     # Nuevo: permite elegir el driver del conector de PostgreSQL
     DB_DRIVER: str = os.getenv("DB_DRIVER", "pg8000")  # por defecto usamos pg8000 para evitar compilación en Windows
+    # Driver del motor asíncrono usado por los endpoints async ('asyncpg' o 'psycopg')
+    DB_ASYNC_DRIVER: str = os.getenv("DB_ASYNC_DRIVER", "asyncpg")
+
+    # --- Pool de conexiones (por worker de Uvicorn) ---
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # segundos esperando una conexión libre
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # segundos antes de reciclar una conexión
+    # Verificación de conexiones al sacarlas del pool: 'always' (pool_pre_ping), 'idle' (solo si
+    # estuvieron inactivas más de DB_POOL_PRE_PING_IDLE_SECONDS) o 'never'
+    DB_POOL_PRE_PING: str = os.getenv("DB_POOL_PRE_PING", "idle").lower()
+    DB_POOL_PRE_PING_IDLE_SECONDS: int = int(os.getenv("DB_POOL_PRE_PING_IDLE_SECONDS", "30"))
+    # Tiempo máximo por sentencia (0 = sin límite). Con el pooler en modo transacción debe
+    # aplicarse por transacción ('transaction'); con conexión directa basta por sesión ('session').
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+    DB_STATEMENT_TIMEOUT_SCOPE: str = os.getenv("DB_STATEMENT_TIMEOUT_SCOPE", "transaction").lower()
+    # Contador de consultas por request (headers Server-Timing / X-DB-Queries) y aviso de N+1
+    DB_QUERY_STATS_ENABLED: bool = os.getenv("DB_QUERY_STATS_ENABLED", "true").lower() == "true"
+    # Repeticiones de una misma consulta en un request a partir de las cuales se advierte
+    DB_QUERY_REPEAT_THRESHOLD: int = int(os.getenv("DB_QUERY_REPEAT_THRESHOLD", "5"))
+
+    # Aplicar las migraciones pendientes (alembic upgrade head) al arrancar la aplicación
+    DB_AUTO_MIGRATE: bool = os.getenv("DB_AUTO_MIGRATE", "false").lower() == "true"
+
+    # --- Particionado mensual de system.record (migración 0003, app/db/partitions.py) ---
+    # Meses futuros con partición creada por adelantado
+    RECORD_PARTITION_MONTHS_AHEAD: int = int(os.getenv("RECORD_PARTITION_MONTHS_AHEAD", "3"))
+    # Cada cuántas horas la aplicación verifica las particiones futuras (0 = nunca)
+    RECORD_PARTITION_CHECK_HOURS: float = float(os.getenv("RECORD_PARTITION_CHECK_HOURS", "12"))
+    # Meses que quedan en línea; los anteriores se archivan con scripts/manage_record_partitions.py
+    RECORD_RETENTION_MONTHS: int = int(os.getenv("RECORD_RETENTION_MONTHS", "24"))
+    RECORD_ARCHIVE_DIR: str = os.getenv("RECORD_ARCHIVE_DIR", "archive/records")
+
+    # --- Réplica de lectura (opcional) ---
+    # Mismas credenciales y base que el primario; vacío = sin réplica
+    DB_REPLICA_HOST: str = os.getenv("DB_REPLICA_HOST", "")
+    DB_REPLICA_PORT: str = os.getenv("DB_REPLICA_PORT", DB_PORT)
+    # Retraso máximo tolerado: por encima se lee del primario
+    DB_REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "2"))
+    DB_REPLICA_LAG_CHECK_SECONDS: float = float(os.getenv("DB_REPLICA_LAG_CHECK_SECONDS", "5"))
 
     # Construcción de la URL de conexión dependiendo del driver
     if DB_DRIVER == "pg8000":
@@ -53,9 +93,106 @@ class Settings:
 
     # URL del portal de clientes (para enlaces en correos)
     CLIENT_PORTAL_BASE_URL: str = os.getenv("CLIENT_PORTAL_BASE_URL", "https://tecnoapp.ar/client/order")
+    # QR de tickets y portal (/qr): imágenes generadas que guarda cada worker, por cuánto
+    # tiempo, y órdenes máximas por pedido de /qr/batch
+    QR_CACHE_SIZE: int = int(os.getenv("QR_CACHE_SIZE", "1024"))
+    QR_CACHE_TTL_SECONDS: int = int(os.getenv("QR_CACHE_TTL_SECONDS", "86400"))
+    QR_BATCH_MAX_ITEMS: int = int(os.getenv("QR_BATCH_MAX_ITEMS", "200"))
+    # Tickets generados en el backend (/repair-orders/{id}/ticket): columnas de la versión
+    # de texto y ESC/POS (48 en impresoras térmicas de 80 mm, 32 en las de 58 mm)
+    TICKET_TEXT_COLUMNS: int = int(os.getenv("TICKET_TEXT_COLUMNS", "48"))
 
     # --- Integración con Supabase (REST) para activos de marca ---
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_ANON_KEY: str = os.getenv("SUPABASE_ANON_KEY", "")
 
+    # --- Caché e invalidación entre workers ---
+    # Si se define, las invalidaciones de caché se propagan a todos los workers vía Redis pub/sub.
+    REDIS_URL: str = os.getenv("REDIS_URL", "")
+    # Caché token -> usuario en la cadena de dependencias de autenticación
+    AUTH_USER_CACHE_TTL_SECONDS: int = int(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "60"))
+    AUTH_USER_CACHE_MAX_ENTRIES: int = int(os.getenv("AUTH_USER_CACHE_MAX_ENTRIES", "1024"))
+    # Caché user_id -> token_version usada para revocar tokens sin consultar la BD en cada request
+    AUTH_TOKEN_VERSION_TTL_SECONDS: int = int(os.getenv("AUTH_TOKEN_VERSION_TTL_SECONDS", "30"))
+    # Caché de tablas de referencia (estados, tipos de dispositivo, roles, sucursales, tipos de registro)
+    REFERENCE_CACHE_TTL_SECONDS: int = int(os.getenv("REFERENCE_CACHE_TTL_SECONDS", "300"))
+    # Caché de la vista pública de órdenes (/client-orders/client, /client-orders/client-search).
+    # Se invalida al modificar la orden; el TTL solo acota cambios indirectos (nombre del técnico)
+    PUBLIC_ORDER_CACHE_SIZE: int = int(os.getenv("PUBLIC_ORDER_CACHE_SIZE", "2048"))
+    PUBLIC_ORDER_CACHE_TTL_SECONDS: int = int(os.getenv("PUBLIC_ORDER_CACHE_TTL_SECONDS", "600"))
+    # Fotos del portal de clientes: metadatos por página, lado mayor (px) de miniaturas y
+    # vistas previas, y cuántas imágenes ya renderizadas guarda cada worker
+    PHOTO_PAGE_SIZE: int = int(os.getenv("PHOTO_PAGE_SIZE", "20"))
+    PHOTO_THUMBNAIL_MAX_SIDE: int = int(os.getenv("PHOTO_THUMBNAIL_MAX_SIDE", "320"))
+    PHOTO_PREVIEW_MAX_SIDE: int = int(os.getenv("PHOTO_PREVIEW_MAX_SIDE", "1024"))
+    PHOTO_PREVIEW_CACHE_SIZE: int = int(os.getenv("PHOTO_PREVIEW_CACHE_SIZE", "256"))
+    # Eventos en vivo del portal de clientes (SSE, /client-orders/{id}/events): cada cuánto
+    # se envía un heartbeat, cuántos eventos por orden se guardan para reanudar con
+    # Last-Event-ID, de cuántas órdenes y por cuánto tiempo, y conexiones máximas por worker
+    ORDER_STREAM_HEARTBEAT_SECONDS: int = int(os.getenv("ORDER_STREAM_HEARTBEAT_SECONDS", "20"))
+    ORDER_STREAM_BUFFER_SIZE: int = int(os.getenv("ORDER_STREAM_BUFFER_SIZE", "50"))
+    ORDER_STREAM_BUFFERED_ORDERS: int = int(os.getenv("ORDER_STREAM_BUFFERED_ORDERS", "2048"))
+    ORDER_STREAM_BUFFER_TTL_SECONDS: int = int(os.getenv("ORDER_STREAM_BUFFER_TTL_SECONDS", "3600"))
+    ORDER_STREAM_MAX_CONNECTIONS: int = int(os.getenv("ORDER_STREAM_MAX_CONNECTIONS", "1000"))
+    # Autocompletado de clientes (app/services/customer_autocomplete.py): resultados por
+    # consulta, filas leídas por prefijo y caché LRU de prefijos recientes
+    CUSTOMER_AUTOCOMPLETE_LIMIT: int = int(os.getenv("CUSTOMER_AUTOCOMPLETE_LIMIT", "10"))
+    CUSTOMER_AUTOCOMPLETE_PREFETCH: int = int(os.getenv("CUSTOMER_AUTOCOMPLETE_PREFETCH", "50"))
+    CUSTOMER_AUTOCOMPLETE_CACHE_SIZE: int = int(os.getenv("CUSTOMER_AUTOCOMPLETE_CACHE_SIZE", "512"))
+    CUSTOMER_AUTOCOMPLETE_CACHE_TTL_SECONDS: int = int(os.getenv("CUSTOMER_AUTOCOMPLETE_CACHE_TTL_SECONDS", "60"))
+    # Importación masiva de clientes: filas por bloque (una consulta de duplicados y un
+    # INSERT por bloque) y tamaño máximo del archivo subido a POST /customers/import
+    CUSTOMER_IMPORT_CHUNK_SIZE: int = int(os.getenv("CUSTOMER_IMPORT_CHUNK_SIZE", "500"))
+    CUSTOMER_IMPORT_MAX_BYTES: int = int(os.getenv("CUSTOMER_IMPORT_MAX_BYTES", str(20 * 1024 * 1024)))
+    # Detección de clientes duplicados (scripts/find_duplicate_customers.py): puntaje mínimo
+    # (0 a 1) para proponer un par
+    CUSTOMER_DUPLICATE_MIN_SCORE: float = float(os.getenv("CUSTOMER_DUPLICATE_MIN_SCORE", "0.6"))
+
+    # --- Logs estructurados (backend/errors, NDJSON escrito en segundo plano) ---
+    # Tamaño máximo de cada archivo antes de pasar al siguiente segmento del día
+    LOG_FILE_MAX_BYTES: int = int(os.getenv("LOG_FILE_MAX_BYTES", str(20 * 1024 * 1024)))
+    # Días que se conservan los archivos (0 = no se borran)
+    LOG_RETENTION_DAYS: int = int(os.getenv("LOG_RETENTION_DAYS", "30"))
+    # Registros pendientes de escribir; con la cola llena se descartan en lugar de bloquear
+    LOG_QUEUE_MAX_SIZE: int = int(os.getenv("LOG_QUEUE_MAX_SIZE", "10000"))
+    # Errores críticos que conserva el índice diario de resumen (<tipo>_<día>.<pid>.summary.json)
+    LOG_SUMMARY_CRITICAL_KEEP: int = int(os.getenv("LOG_SUMMARY_CRITICAL_KEEP", "20"))
+
+    # Deduplicación de errores por huella (ver app/core/log_throttle.py)
+    LOG_DEDUP_ENABLED: bool = os.getenv("LOG_DEDUP_ENABLED", "true").lower() == "true"
+    # Entradas por minuto y ráfaga máxima por huella (tipo + endpoint + plantilla del mensaje)
+    LOG_FINGERPRINT_RATE_PER_MINUTE: float = float(os.getenv("LOG_FINGERPRINT_RATE_PER_MINUTE", "12"))
+    LOG_FINGERPRINT_BURST: int = int(os.getenv("LOG_FINGERPRINT_BURST", "5"))
+    # Errores 4xx repetidos: se escribe 1 de cada N ocurrencias de la misma huella
+    LOG_4XX_SAMPLE_EVERY: int = int(os.getenv("LOG_4XX_SAMPLE_EVERY", "20"))
+    LOG_FINGERPRINT_MAX: int = int(os.getenv("LOG_FINGERPRINT_MAX", "2048"))
+
+    # --- Protección del login ---
+    # Fallos permitidos dentro de la ventana antes de bloquear temporalmente los intentos
+    LOGIN_MAX_FAILURES_PER_USER: int = int(os.getenv("LOGIN_MAX_FAILURES_PER_USER", "5"))
+    LOGIN_MAX_FAILURES_PER_IP: int = int(os.getenv("LOGIN_MAX_FAILURES_PER_IP", "20"))
+    LOGIN_FAILURE_WINDOW_SECONDS: int = int(os.getenv("LOGIN_FAILURE_WINDOW_SECONDS", "300"))
+    # Detrás del reverse proxy (CloudPanel) la IP real del cliente llega en X-Forwarded-For.
+    # Solo activar con proxy: sin él, el cliente puede enviar esas cabeceras con cualquier IP.
+    # TRUSTED_PROXY_HOPS: proxies que agregan su entrada a X-Forwarded-For (nginx = 1, CDN + nginx = 2)
+    TRUST_PROXY_HEADERS: bool = os.getenv("TRUST_PROXY_HEADERS", "false").lower() == "true"
+    TRUSTED_PROXY_HOPS: int = int(os.getenv("TRUSTED_PROXY_HOPS", "1"))
+
+    # --- Límite de requests por IP (app/core/rate_limit.py) ---
+    # Token bucket por IP y grupo de rutas: fichas por minuto y ráfaga máxima (0 por minuto
+    # desactiva la regla). Backend "memory" (por worker), "redis" o "auto" (Redis si hay REDIS_URL)
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "auto")
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "50000"))
+    RATE_LIMIT_CLIENT_SEARCH_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_CLIENT_SEARCH_PER_MINUTE", "10"))
+    RATE_LIMIT_CLIENT_SEARCH_BURST: int = int(os.getenv("RATE_LIMIT_CLIENT_SEARCH_BURST", "5"))
+    RATE_LIMIT_CLIENT_ORDERS_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_CLIENT_ORDERS_PER_MINUTE", "120"))
+    RATE_LIMIT_CLIENT_ORDERS_BURST: int = int(os.getenv("RATE_LIMIT_CLIENT_ORDERS_BURST", "60"))
+    RATE_LIMIT_QR_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_QR_PER_MINUTE", "60"))
+    RATE_LIMIT_QR_BURST: int = int(os.getenv("RATE_LIMIT_QR_BURST", "30"))
+    RATE_LIMIT_ERROR_REPORTS_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_ERROR_REPORTS_PER_MINUTE", "30"))
+    RATE_LIMIT_ERROR_REPORTS_BURST: int = int(os.getenv("RATE_LIMIT_ERROR_REPORTS_BURST", "10"))
+    RATE_LIMIT_LOGIN_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_LOGIN_PER_MINUTE", "10"))
+    RATE_LIMIT_LOGIN_BURST: int = int(os.getenv("RATE_LIMIT_LOGIN_BURST", "10"))
+
 settings = Settings()
@@ -0,0 +1,145 @@
+# backend/app/core/log_throttle.py
+
+"""
+Deduplicación, muestreo y límite de frecuencia de los errores que se escriben en el log.
+
+Cada error se agrupa por una huella (fingerprint): tipo de excepción + endpoint (plantilla
+de la ruta, no la URL con ids) + plantilla del mensaje, con números, UUIDs y textos entre
+comillas reemplazados por marcadores. Por huella se lleva un contador y un token bucket:
+  - la primera ocurrencia siempre se escribe;
+  - los 4xx esperables (validación, 401, 404...) se muestrean: solo se escribe una de
+    cada LOG_4XX_SAMPLE_EVERY repeticiones;
+  - además ninguna huella escribe más de LOG_FINGERPRINT_RATE_PER_MINUTE entradas por
+    minuto (con ráfagas de hasta LOG_FINGERPRINT_BURST), incluidos los errores críticos.
+Lo descartado no se pierde del todo: la siguiente entrada escrita lleva el total de
+ocurrencias y cuántas se omitieron desde la anterior.
+
+El estado es por proceso (cada worker de uvicorn limita lo suyo).
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+_UUID = re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b")
+_HEX = re.compile(r"\b0x[0-9a-fA-F]+\b")
+_QUOTED = re.compile(r"'[^']*'|\"[^\"]*\"")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def message_template(message: str) -> str:
+    template = _UUID.sub("<uuid>", message)
+    template = _HEX.sub("<hex>", template)
+    template = _QUOTED.sub("'<s>'", template)
+    template = _NUMBER.sub("<n>", template)
+    return template[:300]
+
+
+def fingerprint(error_type: str, endpoint: Optional[str], message: str) -> str:
+    raw = f"{error_type}|{endpoint or ''}|{message_template(message)}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = rate_per_second
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class LogThrottle:
+    def __init__(self, rate_per_minute: float, burst: int, sample_every: int, max_fingerprints: int):
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.sample_every = max(1, sample_every)
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        # huella -> estado; orden LRU para descartar las huellas que ya no aparecen
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+
+    def check(
+        self,
+        error_type: str,
+        endpoint: Optional[str],
+        message: str,
+        expected: bool = False,
+    ) -> Optional[Dict]:
+        """
+        Registra una ocurrencia. Retorna None si no debe escribirse; si no, un dict con la
+        huella, las ocurrencias totales y las omitidas desde la última entrada escrita.
+        `expected` marca los 4xx que se muestrean.
+        """
+        key = fingerprint(error_type, endpoint, message)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {
+                    "error_type": error_type,
+                    "endpoint": endpoint,
+                    "template": message_template(message),
+                    "count": 0,
+                    "written": 0,
+                    "suppressed": 0,
+                    "pending": 0,
+                    "first_seen": time.time(),
+                    "bucket": TokenBucket(self.rate_per_minute / 60.0, self.burst),
+                }
+                self._entries[key] = entry
+                if len(self._entries) > self.max_fingerprints:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(key)
+            entry["count"] += 1
+            entry["last_seen"] = time.time()
+
+            sampled_out = expected and entry["count"] > 1 and (entry["count"] - 1) % self.sample_every != 0
+            if sampled_out or not entry["bucket"].allow():
+                entry["suppressed"] += 1
+                entry["pending"] += 1
+                return None
+            decision = {"fingerprint": key, "occurrences": entry["count"], "suppressed_since_last": entry["pending"]}
+            entry["written"] += 1
+            entry["pending"] = 0
+            return decision
+
+    def stats(self, limit: int = 20) -> List[Dict]:
+        """Huellas con más ocurrencias (para diagnóstico)."""
+        with self._lock:
+            entries = sorted(self._entries.items(), key=lambda item: item[1]["count"], reverse=True)[:limit]
+            return [
+                {
+                    "fingerprint": key,
+                    "error_type": e["error_type"],
+                    "endpoint": e["endpoint"],
+                    "template": e["template"],
+                    "count": e["count"],
+                    "written": e["written"],
+                    "suppressed": e["suppressed"],
+                    "first_seen": e["first_seen"],
+                    "last_seen": e["last_seen"],
+                }
+                for key, e in entries
+            ]
+
+
+log_throttle = LogThrottle(
+    rate_per_minute=settings.LOG_FINGERPRINT_RATE_PER_MINUTE,
+    burst=settings.LOG_FINGERPRINT_BURST,
+    sample_every=settings.LOG_4XX_SAMPLE_EVERY,
+    max_fingerprints=settings.LOG_FINGERPRINT_MAX,
+)
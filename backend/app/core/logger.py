@@ -1,11 +1,21 @@
+import atexit
+import glob
 import json
 import logging
 import os
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+import queue
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, Iterable, Iterator, List, Optional
 from enum import Enum
 import traceback
 
+from app.core.config import settings
+from app.core.log_throttle import log_throttle
+
 class ErrorCategory(Enum):
     """Categorías de errores para mejor organización"""
     AUTH = "authentication"
@@ -24,8 +34,246 @@ class ErrorSeverity(Enum):
     HIGH = "high"
     CRITICAL = "critical"
 
+_DATED_FILE = re.compile(r"^[a-z_]+_(\d{4}-\d{2}-\d{2})\.")
+# Clave de la fuente de un resumen diario: pid del worker o "legacy" (arreglo JSON anterior)
+LEGACY_SOURCE = "legacy"
+SUMMARY_SUFFIX = ".summary.json"
+
+
+def _local_hour(timestamp: Optional[str]) -> Optional[int]:
+    """Hora local (0-23) de un timestamp ISO en UTC, como se guarda en cada entrada."""
+    try:
+        return datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).astimezone().hour
+    except (TypeError, ValueError):
+        return None
+
+
+def empty_day_summary() -> Dict[str, Any]:
+    return {
+        "total": 0,
+        "occurrences": 0,
+        "by_category": {},
+        "by_severity": {},
+        "hourly": [0] * 24,
+        "critical_errors": [],
+    }
+
+
+def add_to_day_summary(summary: Dict[str, Any], error: Dict[str, Any], critical_keep: int) -> None:
+    """Suma una entrada de error al resumen del día."""
+    summary["total"] += 1
+    # Con la deduplicación activa una entrada representa también las ocurrencias omitidas
+    summary["occurrences"] += 1 + (error.get("suppressed_since_last") or 0)
+    category = error.get("category", "unknown")
+    summary["by_category"][category] = summary["by_category"].get(category, 0) + 1
+    severity = error.get("severity", "unknown")
+    summary["by_severity"][severity] = summary["by_severity"].get(severity, 0) + 1
+    hour = _local_hour(error.get("timestamp"))
+    if hour is not None:
+        summary["hourly"][hour] += 1
+    if severity == "critical":
+        summary["critical_errors"].append({
+            "timestamp": error.get("timestamp"),
+            "error_type": error.get("error_type"),
+            "error_message": error.get("error_message"),
+            "endpoint": error.get("endpoint"),
+            "request_id": error.get("request_id"),
+        })
+        del summary["critical_errors"][:-critical_keep]
+
+
+def merge_day_summaries(summaries: Iterable[Dict[str, Any]], critical_keep: int) -> Dict[str, Any]:
+    merged = empty_day_summary()
+    for summary in summaries:
+        merged["total"] += summary.get("total", 0)
+        merged["occurrences"] += summary.get("occurrences", 0)
+        for key in ("by_category", "by_severity"):
+            for name, count in summary.get(key, {}).items():
+                merged[key][name] = merged[key].get(name, 0) + count
+        for hour, count in enumerate(summary.get("hourly", [])[:24]):
+            merged["hourly"][hour] += count
+        merged["critical_errors"].extend(summary.get("critical_errors", []))
+    merged["critical_errors"].sort(key=lambda e: e.get("timestamp") or "")
+    del merged["critical_errors"][:-critical_keep]
+    return merged
+
+
+def iter_ndjson(paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Entradas de archivos NDJSON (o del arreglo JSON del formato anterior), en orden."""
+    for path in paths:
+        if not path.endswith(".ndjson"):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    yield from json.load(f)
+            except json.JSONDecodeError:
+                pass
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Línea truncada (proceso terminado a mitad de escritura)
+                    continue
+
+
+class NDJSONFileHandler(logging.Handler):
+    """
+    Escribe el `payload` de cada registro como una línea JSON (solo se agrega al final,
+    nunca se reescribe el archivo) en `<tipo>_<YYYY-MM-DD>.<pid>[.<n>].ndjson`.
+
+    Cada worker de uvicorn escribe sus propios archivos (el pid va en el nombre), así que
+    no hace falta bloquear entre procesos. Rota por día (el nombre lleva la fecha) y por
+    tamaño (segmento .1, .2, ... al superar `max_bytes`). Al cambiar de día borra los
+    archivos más viejos que `retention_days`.
+
+    Para los tipos de `summary_types` mantiene además el resumen del día (conteos por
+    categoría y severidad, histograma por hora y últimos errores críticos) en un archivo
+    índice `<tipo>_<YYYY-MM-DD>.<pid>.summary.json`, que se reescribe de forma atómica
+    tras cada entrada. Leer el resumen de un día no requiere recorrer el NDJSON.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        retention_days: int,
+        summary_types: Iterable[str] = (),
+        critical_keep: int = 20,
+    ):
+        super().__init__()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.retention_days = retention_days
+        self.summary_types = set(summary_types)
+        self.critical_keep = critical_keep
+        # tipo -> [día, segmento, archivo, bytes escritos]
+        self._streams: Dict[str, list] = {}
+        # tipo -> (día, resumen); solo el día en curso, los anteriores ya quedaron en disco
+        self._summaries: Dict[str, tuple] = {}
+        self._cleaned_day = None
+
+    def _path(self, file_type: str, day: str, segment: int) -> str:
+        suffix = f".{segment}" if segment else ""
+        return os.path.join(self.directory, f"{file_type}_{day}.{os.getpid()}{suffix}.ndjson")
+
+    def _stream(self, file_type: str, day: str, size: int):
+        current = self._streams.get(file_type)
+        if current is not None and current[0] == day and (current[3] + size <= self.max_bytes or current[3] == 0):
+            return current
+        segment = 0
+        if current is not None:
+            current[2].close()
+            if current[0] == day:
+                segment = current[1] + 1
+        path = self._path(file_type, day, segment)
+        # Un segmento del mismo día ya lleno (reinicio con el mismo pid): se pasa al siguiente
+        while os.path.exists(path) and os.path.getsize(path) + size > self.max_bytes:
+            segment += 1
+            path = self._path(file_type, day, segment)
+        handle = open(path, "a", encoding="utf-8")
+        current = [day, segment, handle, os.path.getsize(path)]
+        self._streams[file_type] = current
+        return current
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = json.dumps(record.payload, ensure_ascii=False, default=str) + "\n"
+            data = line.encode("utf-8")
+            # El resumen se carga antes de escribir la línea para no contarla dos veces
+            summary = self._summary(record.file_type, record.day) if record.file_type in self.summary_types else None
+            current = self._stream(record.file_type, record.day, len(data))
+            current[2].write(line)
+            current[2].flush()
+            current[3] += len(data)
+            if summary is not None:
+                add_to_day_summary(summary, record.payload, self.critical_keep)
+                write_summary(self.summary_path(record.file_type, record.day, str(os.getpid())), summary)
+            self._remove_expired(record.day)
+        except Exception:
+            self.handleError(record)
+
+    def summary_path(self, file_type: str, day: str, source: str) -> str:
+        return os.path.join(self.directory, f"{file_type}_{day}.{source}{SUMMARY_SUFFIX}")
+
+    def _load_summary(self, file_type: str, day: str) -> Dict[str, Any]:
+        # Reinicio con el mismo pid en el mismo día: se continúa el índice existente o,
+        # si los archivos son anteriores a los índices, se reconstruye desde el NDJSON.
+        path = self.summary_path(file_type, day, str(os.getpid()))
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError):
+                pass
+        summary = empty_day_summary()
+        own_files = glob.glob(os.path.join(self.directory, f"{file_type}_{day}.{os.getpid()}.*ndjson"))
+        for entry in iter_ndjson(sorted(own_files)):
+            add_to_day_summary(summary, entry, self.critical_keep)
+        return summary
+
+    def _summary(self, file_type: str, day: str) -> Dict[str, Any]:
+        current = self._summaries.get(file_type)
+        if current is None or current[0] != day:
+            current = (day, self._load_summary(file_type, day))
+            self._summaries[file_type] = current
+        return current[1]
+
+    def _remove_expired(self, day: str) -> None:
+        if day == self._cleaned_day or self.retention_days <= 0:
+            return
+        self._cleaned_day = day
+        cutoff = (datetime.strptime(day, "%Y-%m-%d") - timedelta(days=self.retention_days)).strftime("%Y-%m-%d")
+        for name in os.listdir(self.directory):
+            match = _DATED_FILE.match(name)
+            if match and match.group(1) < cutoff:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    # Otro worker lo borró primero
+                    pass
+
+    def close_streams(self) -> None:
+        for current in self._streams.values():
+            current[2].close()
+        self._streams.clear()
+        # Los resúmenes son por pid (tras un fork el hijo empieza los suyos)
+        self._summaries.clear()
+
+    def close(self) -> None:
+        self.close_streams()
+        super().close()
+
+
+def write_summary(path: str, summary: Dict[str, Any]) -> None:
+    """Reemplaza el índice de forma atómica: un lector nunca ve un archivo a medio escribir."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, default=str)
+    os.replace(tmp_path, path)
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Nunca bloquea al request: con la cola llena el registro se descarta y se cuenta."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
 class StructuredLogger:
-    """Logger estructurado para manejo de errores y eventos"""
+    """
+    Logger estructurado para manejo de errores y eventos.
+
+    Los errores y eventos se escriben en NDJSON desde un hilo en segundo plano
+    (QueueHandler -> QueueListener -> NDJSONFileHandler): el request solo encola.
+    """
     
     def __init__(self):
         self.errors_dir = os.path.join(os.path.dirname(__file__), "..", "..", "errors")
@@ -37,6 +285,52 @@ class StructuredLogger:
             format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
         self.logger = logging.getLogger(__name__)
+
+        self._file_handler = NDJSONFileHandler(
+            self.errors_dir,
+            settings.LOG_FILE_MAX_BYTES,
+            settings.LOG_RETENTION_DAYS,
+            summary_types=("errors",),
+            critical_keep=settings.LOG_SUMMARY_CRITICAL_KEEP,
+        )
+        self._queue_handler = _DroppingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_MAX_SIZE))
+        # Logger interno que solo alimenta la cola (no se propaga a la consola)
+        self._sink = logging.getLogger(f"{__name__}.sink")
+        self._sink.propagate = False
+        self._sink.setLevel(logging.INFO)
+        self._sink.handlers = [self._queue_handler]
+        self._listener = None
+        self._pid = None
+        self._start_writer()
+        atexit.register(self.shutdown)
+
+    def _start_writer(self):
+        # Tras un fork el hilo del listener no existe en el hijo: se arranca uno nuevo
+        self._pid = os.getpid()
+        self._queue_handler.queue = queue.Queue(maxsize=settings.LOG_QUEUE_MAX_SIZE)
+        self._file_handler.close_streams()
+        self._listener = QueueListener(self._queue_handler.queue, self._file_handler)
+        self._listener.start()
+
+    def flush(self, timeout: float = 2.0):
+        """Espera (hasta `timeout` segundos) a que el hilo escritor vacíe la cola."""
+        log_queue = self._queue_handler.queue
+        deadline = time.monotonic() + timeout
+        while log_queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def shutdown(self):
+        """Escribe lo pendiente y detiene el hilo escritor."""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+        self._file_handler.close_streams()
+
+    def writer_stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue_handler.queue.qsize(),
+            "dropped": self._queue_handler.dropped,
+        }
     
     def log_error(
         self,
@@ -46,7 +340,8 @@ class StructuredLogger:
         context: Optional[Dict[str, Any]] = None,
         user_id: Optional[str] = None,
         endpoint: Optional[str] = None,
-        request_id: Optional[str] = None
+        request_id: Optional[str] = None,
+        status_code: Optional[int] = None
     ):
         """
         Registra un error de forma estructurada
@@ -57,9 +352,18 @@ class StructuredLogger:
             severity: Severidad del error
             context: Contexto adicional del error
             user_id: ID del usuario afectado (si aplica)
-            endpoint: Endpoint donde ocurrió el error
+            endpoint: Endpoint donde ocurrió el error (plantilla de la ruta, p. ej. "GET /orders/{id}")
             request_id: ID único de la petición
+            status_code: Código HTTP de la respuesta; los 4xx se muestrean y van sin traceback
         """
+        expected = status_code is not None and 400 <= status_code < 500
+        throttle = None
+        if settings.LOG_DEDUP_ENABLED:
+            # Errores repetidos: solo se escribe una parte (ver app.core.log_throttle)
+            throttle = log_throttle.check(type(error).__name__, endpoint, str(error), expected=expected)
+            if throttle is None:
+                return
+
         error_data = {
             "timestamp": datetime.utcnow().isoformat(),
             "error_id": f"{category.value}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
@@ -67,13 +371,16 @@ class StructuredLogger:
             "severity": severity.value,
             "error_type": type(error).__name__,
             "error_message": str(error),
-            "traceback": traceback.format_exc(),
+            "traceback": None if expected else traceback.format_exc(),
             "context": context or {},
             "user_id": user_id,
             "endpoint": endpoint,
             "request_id": request_id,
+            "status_code": status_code,
             "environment": os.getenv("ENVIRONMENT", "development")
         }
+        if throttle is not None:
+            error_data.update(throttle)
         
         # Guardar en archivo JSON
         self._save_to_file(error_data)
@@ -115,25 +422,60 @@ class StructuredLogger:
         self.logger.info(f"EVENT [{event_type}]: {message}")
     
     def _save_to_file(self, data: Dict[str, Any], file_type: str = "errors"):
-        """Guarda los datos en archivo JSON"""
+        """Encola los datos para el hilo escritor (una línea NDJSON en el archivo del día)"""
+        if self._pid != os.getpid():
+            self._start_writer()
         today = datetime.now().strftime("%Y-%m-%d")
-        filename = f"{file_type}_{today}.json"
-        filepath = os.path.join(self.errors_dir, filename)
-        
-        # Leer archivo existente o crear lista vacía
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                existing_data = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            existing_data = []
-        
-        # Agregar nuevo registro
-        existing_data.append(data)
-        
-        # Guardar archivo actualizado
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(existing_data, f, indent=2, ensure_ascii=False, default=str)
-    
+        self._sink.info(file_type, extra={"payload": data, "file_type": file_type, "day": today})
+
+    def _day_sources(self, file_type: str, day: str) -> Dict[str, List[str]]:
+        """Archivos de un día agrupados por fuente (pid del worker o 'legacy')."""
+        prefix = f"{file_type}_{day}."
+        sources: Dict[str, List[str]] = {}
+        for path in sorted(glob.glob(os.path.join(self.errors_dir, f"{prefix}*ndjson"))):
+            source = os.path.basename(path)[len(prefix):].split(".")[0]
+            sources.setdefault(source, []).append(path)
+        legacy = os.path.join(self.errors_dir, f"{file_type}_{day}.json")
+        if os.path.exists(legacy):
+            sources[LEGACY_SOURCE] = [legacy]
+        return sources
+
+    def _iter_day(self, file_type: str, day: str) -> Iterator[Dict[str, Any]]:
+        """Registros de un día leídos línea a línea de los archivos de todos los workers."""
+        for paths in self._day_sources(file_type, day).values():
+            yield from iter_ndjson(paths)
+
+    def get_day_summary(self, day: str, file_type: str = "errors") -> Dict[str, Any]:
+        """
+        Resumen de un día combinando los índices `.summary.json` de cada worker. Las fuentes
+        sin índice (archivos anteriores a los índices o en formato legacy) se recorren una
+        vez; si el día ya terminó, el resultado se guarda como índice para la próxima vez.
+        """
+        keep = settings.LOG_SUMMARY_CRITICAL_KEEP
+        prefix = f"{file_type}_{day}."
+        summaries = {}
+        for path in glob.glob(os.path.join(self.errors_dir, f"{prefix}*{SUMMARY_SUFFIX}")):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    summaries[os.path.basename(path)[len(prefix):-len(SUMMARY_SUFFIX)]] = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+
+        finished = day < datetime.now().strftime("%Y-%m-%d")
+        for source, paths in self._day_sources(file_type, day).items():
+            if source in summaries:
+                continue
+            summary = empty_day_summary()
+            for entry in iter_ndjson(paths):
+                add_to_day_summary(summary, entry, keep)
+            summaries[source] = summary
+            if finished:
+                write_summary(self._file_handler.summary_path(file_type, day, source), summary)
+
+        merged = merge_day_summaries(summaries.values(), keep)
+        merged["date"] = day
+        return merged
+
     def get_error_summary(self, days: int = 7) -> Dict[str, Any]:
         """
         Obtiene un resumen de errores de los últimos días
@@ -142,49 +484,28 @@ class StructuredLogger:
             days: Número de días hacia atrás para analizar
             
         Returns:
-            Diccionario con estadísticas de errores
+            Diccionario con estadísticas de errores, el detalle por día (con histograma
+            por hora) y el histograma por hora acumulado
         """
-        summary = {
-            "total_errors": 0,
-            "by_category": {},
-            "by_severity": {},
-            "critical_errors": [],
-            "recent_patterns": []
+        # Incluir lo que todavía está en la cola del hilo escritor
+        self.flush()
+
+        day_summaries = [
+            self.get_day_summary((datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d'))
+            for i in range(days)
+        ]
+        merged = merge_day_summaries(day_summaries, settings.LOG_SUMMARY_CRITICAL_KEEP)
+        return {
+            "total_errors": merged["total"],
+            "total_occurrences": merged["occurrences"],
+            "by_category": merged["by_category"],
+            "by_severity": merged["by_severity"],
+            "hourly": merged["hourly"],
+            # Más recientes primero
+            "critical_errors": merged["critical_errors"][::-1],
+            "recent_patterns": [],
+            "days": day_summaries,
         }
-        
-        # Analizar archivos de errores de los últimos días
-        for i in range(days):
-            date = datetime.now() - timedelta(days=i)
-            filename = f"errors_{date.strftime('%Y-%m-%d')}.json"
-            filepath = os.path.join(self.errors_dir, filename)
-            
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    daily_errors = json.load(f)
-                    
-                for error in daily_errors:
-                    summary["total_errors"] += 1
-                    
-                    # Contar por categoría
-                    category = error.get("category", "unknown")
-                    summary["by_category"][category] = summary["by_category"].get(category, 0) + 1
-                    
-                    # Contar por severidad
-                    severity = error.get("severity", "unknown")
-                    summary["by_severity"][severity] = summary["by_severity"].get(severity, 0) + 1
-                    
-                    # Recopilar errores críticos
-                    if severity == "critical":
-                        summary["critical_errors"].append({
-                            "timestamp": error.get("timestamp"),
-                            "error_message": error.get("error_message"),
-                            "endpoint": error.get("endpoint")
-                        })
-                        
-            except FileNotFoundError:
-                continue
-        
-        return summary
 
 # Instancia global del logger
 structured_logger = StructuredLogger()
@@ -0,0 +1,79 @@
+# backend/app/core/login_throttle.py
+
+"""
+Límite de intentos fallidos de inicio de sesión por usuario y por IP.
+
+Se usa una ventana deslizante de fallos por clave. Cuando una clave supera el máximo
+permitido queda bloqueada hasta que el fallo más antiguo sale de la ventana, de modo
+que el tráfico de fuerza bruta se corta antes de llegar a la verificación de contraseña.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+
+class LoginThrottle:
+    def __init__(self, limits: Dict[str, int], window_seconds: int, max_keys: int = 10000):
+        # limits: prefijo de clave ("user", "ip") -> máximo de fallos dentro de la ventana
+        self.limits = limits
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._failures: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def keys_for(username: str, client_ip: Optional[str]) -> Tuple[str, ...]:
+        keys = [f"user:{(username or '').strip().lower()}"]
+        if client_ip:
+            keys.append(f"ip:{client_ip}")
+        return tuple(keys)
+
+    def _prune(self, key: str, now: float) -> Deque[float]:
+        failures = self._failures.get(key)
+        if failures is None:
+            return deque()
+        while failures and failures[0] <= now - self.window_seconds:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+        return failures
+
+    def retry_after(self, *keys: str) -> float:
+        """Segundos hasta que se permita un nuevo intento (0 si está permitido)."""
+        now = time.monotonic()
+        wait = 0.0
+        with self._lock:
+            for key in keys:
+                limit = self.limits.get(key.split(":", 1)[0])
+                failures = self._prune(key, now)
+                if limit and len(failures) >= limit:
+                    wait = max(wait, failures[0] + self.window_seconds - now)
+        return wait
+
+    def register_failure(self, *keys: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                failures = self._failures.setdefault(key, deque())
+                failures.append(now)
+                self._failures.move_to_end(key)
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+
+    def reset(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._failures.pop(key, None)
+
+
+login_throttle = LoginThrottle(
+    limits={
+        "user": settings.LOGIN_MAX_FAILURES_PER_USER,
+        "ip": settings.LOGIN_MAX_FAILURES_PER_IP,
+    },
+    window_seconds=settings.LOGIN_FAILURE_WINDOW_SECONDS,
+)
@@ -0,0 +1,51 @@
+# backend/app/core/permissions.py
+
+"""
+Permisos derivados del rol, embebidos en el JWT como máscara de bits.
+
+Cada bit corresponde a uno de los guardias de `app.api.v1.dependencies` y replica
+exactamente su regla sobre `role_name`, de modo que evaluar los claims del token
+equivale a evaluar el rol cargado desde la base de datos.
+"""
+
+from enum import IntFlag
+from typing import Optional
+
+
+class Permission(IntFlag):
+    ADMIN = 1        # get_current_active_admin
+    FRONT_DESK = 2   # get_current_active_admin_or_receptionist
+    WORKSHOP = 4     # get_current_active_technician_or_admin
+    OPERATOR = 8     # get_current_active_user_all_roles
+
+
+_FRONT_DESK_ROLES = {"administrator", "receptionist", "recepcionist", "recepcionista"}
+_OPERATOR_ROLES = _FRONT_DESK_ROLES | {"technical", "technician", "tecnico"}
+
+
+def permissions_for_role(role_name: Optional[str]) -> Permission:
+    """Calcula la máscara de permisos para un nombre de rol."""
+    name = role_name or ""
+    perms = Permission(0)
+    if name == "Administrator":
+        perms |= Permission.ADMIN
+    if name.lower() in _FRONT_DESK_ROLES:
+        perms |= Permission.FRONT_DESK
+    if name in ("Administrator", "Technical"):
+        perms |= Permission.WORKSHOP
+    if name.lower() in _OPERATOR_ROLES:
+        perms |= Permission.OPERATOR
+    return perms
+
+
+def token_claims_for_user(user) -> dict:
+    """Claims de autorización que se firman en el token de acceso del usuario."""
+    role_name = user.role.role_name if user.role else None
+    return {
+        "sub": user.username,
+        "uid": user.id,
+        "role": role_name,
+        "branch": user.branch_id,
+        "perms": int(permissions_for_role(role_name)),
+        "ver": user.token_version or 0,
+    }
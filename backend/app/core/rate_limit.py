@@ -0,0 +1,213 @@
+# backend/app/core/rate_limit.py
+
+"""
+Límite de requests por IP en los endpoints públicos o sensibles (token bucket).
+
+Cada regla agrupa rutas por prefijo (la búsqueda pública por DNI, el resto del portal
+de clientes, /qr, /error-reports, el login) y tiene su propio balde por IP: se recarga a
+RATE_LIMIT_<REGLA>_PER_MINUTE fichas por minuto y acumula hasta RATE_LIMIT_<REGLA>_BURST.
+Sin fichas se responde 429 con Retry-After, antes de llegar al endpoint.
+
+La IP es la de get_client_ip: detrás del proxy, la entrada de X-Forwarded-For que agregó
+el proxy de confianza, no la que envía el cliente (ver scripts/check_rate_limit_client_ip.py).
+
+Backends:
+  - memory: baldes en memoria del worker (cada worker limita por separado);
+  - redis: baldes compartidos entre workers, actualizados atómicamente con un script Lua.
+Con RATE_LIMIT_BACKEND=auto se usa Redis si hay REDIS_URL. Si Redis falla, ese request
+se limita con el backend en memoria en lugar de rechazarlo.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.api.v1.dependencies import get_client_ip
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitRule:
+    def __init__(self, name: str, path_prefix: str, per_minute: float, burst: int):
+        self.name = name
+        self.path_prefix = path_prefix
+        self.rate = per_minute / 60.0  # fichas por segundo
+        self.burst = max(burst, 1)
+        self.allowed = 0
+        self.limited = 0
+
+    def stats(self) -> Dict:
+        return {
+            "path_prefix": self.path_prefix,
+            "per_minute": round(self.rate * 60, 3),
+            "burst": self.burst,
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+class MemoryBackend:
+    """Baldes por clave en un LRU acotado: una clave inactiva se recarga sola al volver."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        """Consume una ficha. Retorna 0 si se permite o los segundos hasta la próxima ficha."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+# Mismo algoritmo que MemoryBackend.take, atómico en Redis y con el reloj del servidor
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(now - updated_at, 0) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBackend:
+    PREFIX = "tecnomundo:ratelimit:"
+
+    def __init__(self, redis_url: str):
+        import redis.asyncio as redis_asyncio
+        self._client = redis_asyncio.Redis.from_url(redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._script = self._client.register_script(_TOKEN_BUCKET_LUA)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        return float(await self._script(keys=[self.PREFIX + key], args=[rate, burst]))
+
+
+class RateLimiter:
+    def __init__(self, rules: List[RateLimitRule], backend: str, redis_url: str, max_keys: int):
+        # Solo las reglas activas; la más específica (prefijo más largo) primero
+        self.rules = sorted((r for r in rules if r.rate > 0), key=lambda r: len(r.path_prefix), reverse=True)
+        self.memory = MemoryBackend(max_keys)
+        self.redis: Optional[RedisBackend] = None
+        if backend == "redis" or (backend == "auto" and redis_url):
+            try:
+                self.redis = RedisBackend(redis_url)
+            except Exception as e:
+                logger.warning(f"[RateLimit] Redis no disponible ({e}); límites por worker.")
+        self._redis_failing_since = 0.0
+
+    def rule_for(self, path: str) -> Optional[RateLimitRule]:
+        for rule in self.rules:
+            if path.startswith(rule.path_prefix):
+                return rule
+        return None
+
+    async def check(self, rule: RateLimitRule, client_ip: str) -> float:
+        """Consume una ficha del balde (regla, IP). Retorna los segundos de espera (0 = permitido)."""
+        key = f"{rule.name}:{client_ip}"
+        wait = None
+        if self.redis is not None:
+            try:
+                wait = await self.redis.take(key, rule.rate, rule.burst)
+                self._redis_failing_since = 0.0
+            except Exception as e:
+                if not self._redis_failing_since:
+                    logger.warning(f"[RateLimit] Error consultando Redis ({e}); se limita en memoria.")
+                    self._redis_failing_since = time.monotonic()
+        if wait is None:
+            wait = self.memory.take(key, rule.rate, rule.burst)
+        if wait > 0:
+            rule.limited += 1
+        else:
+            rule.allowed += 1
+        return wait
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": settings.RATE_LIMIT_ENABLED,
+            "backend": "redis" if self.redis is not None else "memory",
+            "redis_failing": bool(self._redis_failing_since),
+            "tracked_keys": len(self.memory._buckets),
+            "rules": {rule.name: rule.stats() for rule in self.rules},
+        }
+
+
+_API = "/api/v1"
+
+rate_limiter = RateLimiter(
+    rules=[
+        # Búsqueda por DNI o número de orden: lo que un crawler usaría para enumerar
+        RateLimitRule("client_search", f"{_API}/client-orders/client-search",
+                      settings.RATE_LIMIT_CLIENT_SEARCH_PER_MINUTE, settings.RATE_LIMIT_CLIENT_SEARCH_BURST),
+        # Resto del portal: vista de la orden, fotos (miniaturas en ráfaga), eventos
+        RateLimitRule("client_orders", f"{_API}/client-orders/",
+                      settings.RATE_LIMIT_CLIENT_ORDERS_PER_MINUTE, settings.RATE_LIMIT_CLIENT_ORDERS_BURST),
+        RateLimitRule("qr", f"{_API}/qr",
+                      settings.RATE_LIMIT_QR_PER_MINUTE, settings.RATE_LIMIT_QR_BURST),
+        RateLimitRule("error_reports", f"{_API}/error-reports",
+                      settings.RATE_LIMIT_ERROR_REPORTS_PER_MINUTE, settings.RATE_LIMIT_ERROR_REPORTS_BURST),
+        RateLimitRule("login", f"{_API}/auth/login",
+                      settings.RATE_LIMIT_LOGIN_PER_MINUTE, settings.RATE_LIMIT_LOGIN_BURST),
+    ],
+    backend=settings.RATE_LIMIT_BACKEND,
+    redis_url=settings.REDIS_URL,
+    max_keys=settings.RATE_LIMIT_MAX_KEYS,
+)
+
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    """Responde 429 (con Retry-After) cuando la IP agotó el balde de la ruta."""
+
+    async def dispatch(self, request: Request, call_next):
+        rule = rate_limiter.rule_for(request.url.path) if request.method != "OPTIONS" else None
+        if rule is None:
+            return await call_next(request)
+        # IP agregada por el proxy de confianza: rotar X-Forwarded-For no cambia de balde
+        wait = await rate_limiter.check(rule, get_client_ip(request) or "unknown")
+        if wait <= 0:
+            return await call_next(request)
+        message = "Demasiadas solicitudes. Intente nuevamente más tarde."
+        retry_after = max(math.ceil(wait), 1)
+        # Mismo formato que los errores de main.error_payload
+        return JSONResponse(
+            status_code=429,
+            content={
+                "code": "rate_limited",
+                "message": message,
+                "details": {"rule": rule.name, "retry_after": retry_after},
+                "request_id": getattr(request.state, "request_id", None),
+                "detail": message,
+            },
+            headers={"Retry-After": str(retry_after)},
+        )
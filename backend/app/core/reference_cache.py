@@ -0,0 +1,180 @@
+# backend/app/core/reference_cache.py
+
+"""
+Caché en memoria de las tablas de referencia: estados de orden, tipos de dispositivo,
+roles, sucursales y tipos de registro.
+
+Son tablas diminutas que casi nunca cambian, pero se consultan (o se unen con JOIN) en
+casi todos los requests. Cada tabla se carga completa en una sola consulta y se guarda
+como instancias *desacopladas* de cualquier sesión. Los requests reciben su propia copia
+con `Session.merge(load=False)`, que no emite SQL, igual que `auth_cache`.
+
+Cada tabla tiene un número de versión que aumenta con cada invalidación. Una carga que
+empezó antes de una invalidación no guarda su resultado (evita volver a cachear datos
+viejos). Las invalidaciones viajan por el bus de `app.core.cache`, así que los endpoints
+de escritura (sucursales, datos iniciales) solo tienen que llamar a `invalidate`.
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.cache import invalidation_bus
+from app.core.config import settings
+from app.models.branch import Branch
+from app.models.device_type import DeviceType
+from app.models.roles import Role
+from app.models.status_order import StatusOrder
+from app.models.type_record import TypeRecord
+
+REFERENCE_NAMESPACE = "reference_data"
+
+REFERENCE_MODELS = (StatusOrder, DeviceType, Role, Branch, TypeRecord)
+MODELS_BY_TABLE = {model.__tablename__: model for model in REFERENCE_MODELS}
+
+# Relaciones de RepairOrder y Record que se adjuntan desde la caché en lugar de un JOIN
+ORDER_REFERENCES = (
+    ("status", "status_id", StatusOrder),
+    ("device_type", "device_type_id", DeviceType),
+    ("branch", "branch_id", Branch),
+)
+RECORD_REFERENCES = (("type_record", "id_even_type", TypeRecord),)
+
+
+class ReferenceCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # tabla -> (expira_en, {id: instancia desacoplada})
+        self._tables: Dict[str, tuple] = {}
+        self._versions: Dict[str, int] = {table: 0 for table in MODELS_BY_TABLE}
+        self.hits = 0
+        self.loads = 0
+
+    def rows(self, db: Session, model) -> Dict[int, object]:
+        """Filas cacheadas de `model` indexadas por id (instancias desacopladas, solo lectura)."""
+        table = model.__tablename__
+        now = time.monotonic()
+        with self._lock:
+            entry = self._tables.get(table)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            version = self._versions[table]
+
+        rows = self._load(db, model)
+        with self._lock:
+            self.loads += 1
+            if self.ttl > 0 and self._versions[table] == version:
+                self._tables[table] = (now + self.ttl, rows)
+        return rows
+
+    @staticmethod
+    def _load(db: Session, model) -> Dict[int, object]:
+        # Se leen columnas sueltas (no entidades) para no tocar el identity map del request
+        mapper = inspect(model)
+        result = db.execute(select(*mapper.columns)).mappings()
+        rows = {}
+        for row in result:
+            obj = model(**{prop.key: row[prop.columns[0].key] for prop in mapper.column_attrs})
+            make_transient_to_detached(obj)
+            rows[obj.id] = obj
+        return rows
+
+    def invalidate_local(self, table: Optional[str] = None) -> None:
+        with self._lock:
+            tables = [table] if table in self._versions else list(self._versions)
+            for name in tables:
+                self._versions[name] += 1
+                self._tables.pop(name, None)
+
+    def version(self, model) -> int:
+        return self._versions[model.__tablename__]
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "loads": self.loads,
+                "tables": {
+                    table: {
+                        "version": self._versions[table],
+                        "cached": table in self._tables and self._tables[table][0] > now,
+                        "rows": len(self._tables[table][1]) if table in self._tables else 0,
+                    }
+                    for table in self._versions
+                },
+            }
+
+
+reference_cache = ReferenceCache(ttl=settings.REFERENCE_CACHE_TTL_SECONDS)
+
+
+def _apply_invalidation(table: Optional[str]) -> None:
+    reference_cache.invalidate_local(table)
+
+
+invalidation_bus.register(REFERENCE_NAMESPACE, _apply_invalidation)
+
+
+def invalidate(model=None) -> None:
+    """Invalida una tabla de referencia (o todas si model es None) en todos los workers."""
+    invalidation_bus.publish(REFERENCE_NAMESPACE, model.__tablename__ if model is not None else None)
+
+
+def _bind(db: Session, cached):
+    """Copia de `cached` ligada a `db`, sin SQL."""
+    existing = db.identity_map.get(inspect(cached).key)
+    if existing is not None and inspect(existing).modified:
+        # Cambios pendientes en este request: no se pisan con la versión cacheada
+        return existing
+    return db.merge(cached, load=False)
+
+
+def get(db: Session, model, id: Optional[int]):
+    """Fila de referencia por id ligada a `db`, o None."""
+    if id is None:
+        return None
+    cached = reference_cache.rows(db, model).get(id)
+    return _bind(db, cached) if cached is not None else None
+
+
+def get_all(db: Session, model, order_by: Optional[str] = None) -> List:
+    """Todas las filas de una tabla de referencia ligadas a `db`."""
+    rows = list(reference_cache.rows(db, model).values())
+    rows.sort(key=lambda obj: getattr(obj, order_by or "id"))
+    return [_bind(db, obj) for obj in rows]
+
+
+def find_id(db: Session, model, **criteria) -> Optional[int]:
+    """Id de la primera fila cuyos atributos coinciden con `criteria` (p. ej. type_name=...)."""
+    for obj in reference_cache.rows(db, model).values():
+        if all(getattr(obj, key) == value for key, value in criteria.items()):
+            return obj.id
+    return None
+
+
+def attach_references(db: Session, objects: Iterable, references) -> None:
+    """
+    Adjunta a cada objeto sus filas de referencia desde la caché, como si se hubieran
+    cargado con la consulta (sin marcar el objeto como modificado). `references` es una
+    secuencia de (relación, columna FK, modelo).
+
+    Con una AsyncSession se usa vía `await db.run_sync(attach_references, objects, refs)`.
+    """
+    for obj in objects:
+        if obj is None:
+            continue
+        for relation, fk, model in references:
+            set_committed_value(obj, relation, get(db, model, getattr(obj, fk)))
+
+
+def attach_order_references(db: Session, orders: Iterable) -> None:
+    """Estado, tipo de dispositivo y sucursal de cada orden (ver `attach_references`)."""
+    attach_references(db, orders, ORDER_REFERENCES)
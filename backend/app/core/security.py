@@ -1,5 +1,6 @@
 
 from datetime import datetime, timedelta, timezone
+import asyncio
 import os
 import hashlib
 import secrets
@@ -7,6 +8,7 @@ import base64
 from jose import JWTError, jwt
 from passlib.hash import bcrypt as passlib_bcrypt
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Configuración de Seguridad ---
 # Cargar clave y configuración desde variables de entorno para producción
@@ -16,6 +18,18 @@ ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 # Permite configurar expiración del token por entorno
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "240"))  # 4 horas por defecto
 
+# El hashing (PBKDF2 de 100k iteraciones o bcrypt) se ejecuta en un pool dedicado y acotado,
+# separado del threadpool que comparten los endpoints síncronos.
+PASSWORD_HASH_MAX_WORKERS = int(os.getenv("PASSWORD_HASH_MAX_WORKERS", "2"))
+# Máximo de verificaciones en espera (además de las que se están ejecutando) antes de rechazar
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))
+
+_password_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_MAX_WORKERS, thread_name_prefix="password-hash")
+_password_hash_inflight = 0
+
+class PasswordHashingBusy(Exception):
+    """El pool de hashing está saturado; el llamador debe responder 503 y reintentar luego."""
+
 # Configuración personalizada para hashing de contraseñas usando hashlib
 # Evita problemas de bcrypt con límites de 72 bytes
 
@@ -83,6 +97,29 @@ def get_password_hash(password: str) -> str:
         print(f"Error en get_password_hash: {e}")
         raise
 
+def needs_rehash(hashed_password: str) -> bool:
+    """Indica si el hash no usa el esquema actual (pbkdf2) y debe regenerarse en el próximo login."""
+    return not (hashed_password or "").startswith("pbkdf2$")
+
+async def _run_password_hashing(func, *args):
+    global _password_hash_inflight
+    if _password_hash_inflight >= PASSWORD_HASH_MAX_WORKERS + PASSWORD_HASH_MAX_PENDING:
+        raise PasswordHashingBusy()
+    _password_hash_inflight += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_hash_executor, func, *args)
+    finally:
+        _password_hash_inflight -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Versión no bloqueante de verify_password para endpoints async."""
+    return await _run_password_hashing(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Versión no bloqueante de get_password_hash para endpoints async."""
+    return await _run_password_hashing(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Crea un nuevo token de acceso JWT."""
     to_encode = data.copy()
@@ -1,6 +1,7 @@
 # backend/app/crud/crud_branch.py
 
 from sqlalchemy.orm import Session
+from app.core import reference_cache
 from app.models.branch import Branch
 from app.schemas.branch import BranchCreate, BranchUpdate
 from typing import List, Optional
@@ -13,9 +14,10 @@ def get(db: Session, id: int) -> Optional[Branch]:
 
 def get_branch(db: Session, branch_id: int) -> Optional[Branch]:
     """
-    Obtiene una sucursal por su ID (alias para compatibilidad).
+    Obtiene una sucursal por su ID desde la caché de referencia (solo lectura).
+    Para modificar la sucursal usar `get`.
     """
-    return get(db, id=branch_id)
+    return reference_cache.get(db, Branch, branch_id)
 
 def get_multi(db: Session, *, skip: int = 0, limit: int = 100) -> List[Branch]:
     """
@@ -38,6 +40,7 @@ def create(db: Session, *, obj_in: BranchCreate) -> Branch:
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    reference_cache.invalidate(Branch)
     return db_obj
 
 def update(db: Session, *, db_obj: Branch, obj_in: BranchUpdate) -> Branch:
@@ -50,4 +53,5 @@ def update(db: Session, *, db_obj: Branch, obj_in: BranchUpdate) -> Branch:
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    reference_cache.invalidate(Branch)
     return db_obj
@@ -1,10 +1,15 @@
 # backend/app/crud/crud_customer.py
 
+import base64
+import json
+
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
+from sqlalchemy import and_, exists, func, select, tuple_
+from app.db.unit_of_work import in_unit_of_work
 from app.models.customer import Customer as CustomerModel
 from app.schemas.customer import CustomerCreate, CustomerUpdate
 from app.models.repair_order import RepairOrder as RepairOrderModel
+from app.services import customer_autocomplete, public_order_cache
 
 
 def get_customer(db: Session, customer_id: int):
@@ -14,23 +19,70 @@ def get_customer(db: Session, customer_id: int):
     return db.query(CustomerModel).filter(CustomerModel.id == customer_id).first()
 
 
-def get_customers(db: Session, skip: int = 0, limit: int = 100):
+# Estados que cierran una orden (5 = Entregado); el resto cuenta como orden abierta
+CLOSED_STATUS_IDS = (5,)
+
+
+def encode_cursor(customer: CustomerModel) -> str:
+    """Cursor opaco de paginación por clave (last_name, id) del último cliente de la página."""
+    raw = json.dumps([customer.last_name, customer.id], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Retorna (last_name, id). Lanza ValueError si el cursor no es válido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        last_name, customer_id = json.loads(raw)
+        return str(last_name), int(customer_id)
+    except Exception:
+        raise ValueError("Cursor de paginación inválido")
+
+
+def get_customers(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str = None,
+    branch_id: int = None,
+    has_open_orders: bool = None,
+):
     """
-    Obtiene un listado de todos los clientes junto con el conteo de sus órdenes
-    de reparación en una única y eficiente consulta.
+    Obtiene un listado de clientes ordenado por apellido, junto con el conteo de sus
+    órdenes de reparación. Retorna tuplas (cliente, orders_count).
+
+    Con `cursor` pagina por clave (last_name, id) sobre el índice ix_customer_last_name_id
+    e ignora `skip`. El conteo es una subconsulta correlacionada que solo se evalúa para
+    los clientes de la página (índice ix_repair_order_customer_created).
+    `branch_id` deja los clientes con órdenes en esa sucursal y `has_open_orders` los que
+    tienen (o no) órdenes sin entregar, en esa sucursal si también se indicó.
     """
-    return (
-        db.query(
-            CustomerModel,
-            func.count(RepairOrderModel.id).label("orders_count")
-        )
-        .outerjoin(RepairOrderModel, CustomerModel.id == RepairOrderModel.customer_id)
-        .group_by(CustomerModel.id)
-        .order_by(CustomerModel.last_name)
-        .offset(skip)
-        .limit(limit)
-        .all()
+    orders_count = (
+        select(func.count(RepairOrderModel.id))
+        .where(RepairOrderModel.customer_id == CustomerModel.id)
+        .correlate(CustomerModel)
+        .scalar_subquery()
     )
+    stmt = select(CustomerModel, orders_count.label("orders_count"))
+
+    order_conditions = [RepairOrderModel.customer_id == CustomerModel.id]
+    if branch_id is not None:
+        order_conditions.append(RepairOrderModel.branch_id == branch_id)
+        stmt = stmt.where(exists().where(and_(*order_conditions)))
+    if has_open_orders is not None:
+        open_orders = exists().where(
+            and_(*order_conditions, RepairOrderModel.status_id.notin_(CLOSED_STATUS_IDS))
+        )
+        stmt = stmt.where(open_orders if has_open_orders else ~open_orders)
+
+    if cursor:
+        last_name, customer_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(CustomerModel.last_name, CustomerModel.id) > tuple_(last_name, customer_id))
+    elif skip:
+        stmt = stmt.offset(skip)
+
+    stmt = stmt.order_by(CustomerModel.last_name, CustomerModel.id).limit(limit)
+    return db.execute(stmt).all()
 
 
 def update_customer(db: Session, customer_id: int, customer: CustomerUpdate):
@@ -52,24 +104,24 @@ def update_customer(db: Session, customer_id: int, customer: CustomerUpdate):
     for key, value in update_data.items():
         setattr(db_customer, key, value)
 
+    customer_autocomplete.mark_customers_changed(db)
+    # Nombre y DNI del cliente aparecen en la vista pública de todas sus órdenes
+    public_order_cache.mark_all_changed(db)
+    if in_unit_of_work(db):
+        db.flush()
+        return db_customer
     db.commit()
     db.refresh(db_customer)
     return db_customer
 
 
-def search_customers(db: Session, query: str):
+def search_customers(db: Session, query: str, limit: int = None):
     """
-    Busca clientes por nombre, apellido, DNI o teléfono.
+    Busca clientes cuyo DNI, teléfono, apellido o nombre empiezan con `query`
+    (sin distinguir acentos ni mayúsculas), ordenados por relevancia.
+    Ver app/services/customer_autocomplete.py.
     """
-    search_term = f"%{query}%"
-    return db.query(CustomerModel).filter(
-        or_(
-            CustomerModel.first_name.ilike(search_term),
-            CustomerModel.last_name.ilike(search_term),
-            CustomerModel.dni.ilike(search_term),
-            CustomerModel.phone_number.ilike(search_term)
-        )
-    ).limit(10).all()
+    return customer_autocomplete.autocomplete(db, query, limit=limit)
 
 
 def get_customer_by_dni(db: Session, dni: str):
@@ -88,6 +140,7 @@ def get_customer_by_phone(db: Session, phone_number: str):
 def create_customer(db: Session, customer: CustomerCreate):
     """
     Crea un nuevo cliente.
+    Dentro de una unidad de trabajo solo hace flush (asigna el id) y deja el commit al bloque.
     """
     # Convertir strings vacíos a None para campos opcionales únicos
     dni = customer.dni if customer.dni and customer.dni.strip() else None
@@ -113,6 +166,10 @@ def create_customer(db: Session, customer: CustomerCreate):
         is_subscribed=customer.is_subscribed
     )
     db.add(db_customer)
+    customer_autocomplete.mark_customers_changed(db)
+    if in_unit_of_work(db):
+        db.flush()
+        return db_customer
     db.commit()
     db.refresh(db_customer)
     return db_customer
\ No newline at end of file
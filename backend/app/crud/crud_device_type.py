@@ -1,10 +1,11 @@
 # backend/app/crud/crud_device_type.py
 
 from sqlalchemy.orm import Session
+from app.core import reference_cache
 from app.models.device_type import DeviceType as DeviceTypeModel
 
 def get_device_types(db: Session):
     """
-    Obtiene todos los tipos de dispositivos de la base de datos.
+    Obtiene todos los tipos de dispositivos (desde la caché de referencia).
     """
-    return db.query(DeviceTypeModel).order_by(DeviceTypeModel.type_name).all()
\ No newline at end of file
+    return reference_cache.get_all(db, DeviceTypeModel, order_by="type_name")
\ No newline at end of file
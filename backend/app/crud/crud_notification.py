@@ -1,6 +1,9 @@
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
+from app.db.unit_of_work import in_unit_of_work
 from app.models.notification import Notification
 
 def get_notifications_for_user(db: Session, user_id: int, skip: int = 0, limit: int = 20) -> List[Notification]:
@@ -19,10 +22,28 @@ def create_notification(db: Session, user_id: int, message: str, link_to: Option
         link_to=link_to
     )
     db.add(db_notification)
+    if in_unit_of_work(db):
+        db.flush()
+        return db_notification
     db.commit()
     db.refresh(db_notification)
     return db_notification
 
+def create_notifications(db: Session, user_ids: List[int], message: str, link_to: Optional[str] = None) -> List[Notification]:
+    """
+    Crea la misma notificación para varios usuarios con un único INSERT ... RETURNING y un commit
+    (dentro de una unidad de trabajo confirma el bloque).
+    """
+    if not user_ids:
+        return []
+    db_notifications = db.scalars(
+        insert(Notification).returning(Notification),
+        [{"user_id": user_id, "message": message, "link_to": link_to} for user_id in user_ids],
+    ).all()
+    if not in_unit_of_work(db):
+        db.commit()
+    return db_notifications
+
 def mark_notification_as_read(db: Session, notification_id: int, user_id: int) -> Optional[Notification]:
     """
     Marca una notificación como leída, asegurándose de que pertenece al usuario.
@@ -33,4 +54,26 @@ def mark_notification_as_read(db: Session, notification_id: int, user_id: int) -
         db.commit()
         db.refresh(db_notification)
         return db_notification
-    return None
\ No newline at end of file
+    return None
+
+# --- Versiones asíncronas (endpoints async) ---
+
+async def get_notifications_for_user_async(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 20) -> List[Notification]:
+    result = await db.scalars(
+        select(Notification)
+        .where(Notification.user_id == user_id)
+        .order_by(Notification.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    return result.all()
+
+async def mark_notification_as_read_async(db: AsyncSession, notification_id: int, user_id: int) -> Optional[Notification]:
+    db_notification = await db.scalar(
+        select(Notification).where(Notification.id == notification_id, Notification.user_id == user_id)
+    )
+    if db_notification:
+        db_notification.is_read = True
+        await db.commit()
+        return db_notification
+    return None
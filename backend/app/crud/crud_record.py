@@ -1,8 +1,14 @@
+import base64
+from datetime import datetime
+
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import func, select, tuple_, union
+from sqlalchemy.exc import IntegrityError
 from app.models.record import Record as RecordModel
+from app.models.repair_order import RepairOrder
 from app.models.type_record import TypeRecord
 from app.schemas.record import RecordFilter
+from app.core import reference_cache
 from app.core.logger import structured_logger, ErrorCategory, ErrorSeverity
 
 EVENT_CODE_TO_DBNAME = {
@@ -17,6 +23,22 @@ SPANISH_TO_DBNAME = {
     "Transferencia de orden": "Order transfer",
 }
 
+def _event_type_id(db: Session, db_name: str) -> int:
+    type_id = reference_cache.find_id(db, TypeRecord, type_name=db_name)
+    if type_id is not None:
+        return type_id
+    # Tipo nuevo: se crea en un SAVEPOINT para que una carrera con otro worker (nombre
+    # único ya insertado) no aborte la transacción de la mutación.
+    try:
+        with db.begin_nested():
+            tr = TypeRecord(type_name=db_name)
+            db.add(tr)
+        type_id = tr.id
+    except IntegrityError:
+        type_id = db.query(TypeRecord.id).filter(TypeRecord.type_name == db_name).scalar()
+    reference_cache.invalidate(TypeRecord)
+    return type_id
+
 def log_order_event(
     db: Session,
     *,
@@ -30,20 +52,14 @@ def log_order_event(
     description: str | None = None,
     meta: dict | None = None,
 ):
+    """
+    Agrega el registro de auditoría a la sesión sin hacer commit: se confirma junto con
+    la mutación que lo origina (ver app.db.unit_of_work).
+    """
     # mapear código interno a nombre en DB
     db_name = EVENT_CODE_TO_DBNAME.get(event_type, event_type)
-    try:
-        tr = db.query(TypeRecord).filter(TypeRecord.type_name == db_name).first()
-        if not tr:
-            tr = TypeRecord(type_name=db_name)
-            db.add(tr)
-            db.commit()
-            db.refresh(tr)
-    except Exception:
-        return None
-
     record = RecordModel(
-        id_even_type=tr.id,
+        id_even_type=_event_type_id(db, db_name),
         order_id=order_id,
         actor_user_id=actor_user_id,
         prev_status_id=prev_status_id,
@@ -53,27 +69,99 @@ def log_order_event(
         description=description,
         meta=meta or {},
     )
+    db.add(record)
+    return record
+
+def encode_cursor(record: RecordModel) -> str:
+    """Cursor opaco de paginación por clave (created_at, id) del último registro de la página."""
+    raw = f"{record.created_at.isoformat()}|{record.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Retorna (created_at, id). Lanza ValueError si el cursor no es válido."""
     try:
-        db.add(record)
-        db.commit()
-        db.refresh(record)
-        return record
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, record_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(record_id)
     except Exception:
-        return None
+        raise ValueError("Cursor de paginación inválido")
 
-def get_records(db: Session, filters: RecordFilter):
-    q = db.query(RecordModel)
-    if filters.type:
-        mapped = SPANISH_TO_DBNAME.get(filters.type, filters.type)
-        q = q.join(RecordModel.type_record).filter(TypeRecord.type_name == mapped)
+
+_RECORD_ORDER = (RecordModel.created_at.desc(), RecordModel.id.desc())
+
+
+def _apply_record_filters(stmt, filters: RecordFilter, type_id: int | None, postgres: bool = False):
+    """
+    Filtros de GET /records. La tabla está particionada por mes sobre created_at (ver
+    app.db.partitions): toda cota sobre created_at se expresa como comparación simple para
+    que PostgreSQL descarte las particiones fuera de rango.
+    """
+    if type_id is not None:
+        stmt = stmt.where(RecordModel.id_even_type == type_id)
     if filters.user_id:
-        q = q.filter(RecordModel.actor_user_id == filters.user_id)
-    if filters.branch_id:
-        q = q.filter(or_(RecordModel.origin_branch_id == filters.branch_id, RecordModel.target_branch_id == filters.branch_id))
+        stmt = stmt.where(RecordModel.actor_user_id == filters.user_id)
     if filters.order_id:
-        q = q.filter(RecordModel.order_id == filters.order_id)
+        stmt = stmt.where(RecordModel.order_id == filters.order_id)
+        if postgres and not filters.from_date:
+            # Los registros de una orden no son anteriores a su mes de creación: los meses
+            # previos se descartan al iniciar la ejecución (la subconsulta se evalúa una vez).
+            order_month = (
+                select(func.date_trunc("month", RepairOrder.created_at))
+                .where(RepairOrder.id == filters.order_id)
+                .scalar_subquery()
+            )
+            stmt = stmt.where(RecordModel.created_at >= order_month)
     if filters.from_date:
-        q = q.filter(RecordModel.created_at >= filters.from_date)
+        stmt = stmt.where(RecordModel.created_at >= filters.from_date)
     if filters.to_date:
-        q = q.filter(RecordModel.created_at <= filters.to_date)
-    return q.order_by(RecordModel.created_at.desc()).offset(filters.skip).limit(filters.limit).all()
+        stmt = stmt.where(RecordModel.created_at <= filters.to_date)
+    if filters.cursor:
+        created_at, record_id = decode_cursor(filters.cursor)
+        # Comparación de fila: el índice (created_at, id) se recorre desde el cursor. La
+        # comparación de fila no poda particiones; la cota simple sobre created_at sí.
+        stmt = stmt.where(
+            RecordModel.created_at <= created_at,
+            tuple_(RecordModel.created_at, RecordModel.id) < tuple_(created_at, record_id),
+        )
+    return stmt
+
+
+def get_records(db: Session, filters: RecordFilter):
+    """
+    Historial de registros, del más reciente al más antiguo.
+    Con `cursor` pagina por clave (created_at, id) e ignora `skip`.
+    """
+    type_id = None
+    if filters.type:
+        mapped = SPANISH_TO_DBNAME.get(filters.type, filters.type)
+        # Id del tipo desde la caché de referencia: sin JOIN con type_record
+        type_id = reference_cache.find_id(db, TypeRecord, type_name=mapped)
+        if type_id is None:
+            return []
+    skip = 0 if filters.cursor else filters.skip
+    postgres = db.get_bind().dialect.name == "postgresql"
+
+    if filters.branch_id:
+        # origen = X OR destino = X no aprovecha los índices; cada rama del UNION toma solo
+        # las primeras filas de su índice (sucursal, created_at) y luego se combinan.
+        window = skip + filters.limit
+        branches = [
+            _apply_record_filters(select(RecordModel.id, RecordModel.created_at).where(column == filters.branch_id), filters, type_id, postgres)
+            .order_by(*_RECORD_ORDER)
+            .limit(window)
+            .subquery()
+            for column in (RecordModel.origin_branch_id, RecordModel.target_branch_id)
+        ]
+        ids = union(*(select(branch.c.id) for branch in branches))
+        # Los mismos filtros en la consulta externa: la búsqueda por id también se poda
+        stmt = _apply_record_filters(select(RecordModel).where(RecordModel.id.in_(ids)), filters, type_id, postgres)
+    else:
+        stmt = _apply_record_filters(select(RecordModel), filters, type_id, postgres)
+
+    stmt = stmt.order_by(*_RECORD_ORDER).limit(filters.limit)
+    if skip:
+        stmt = stmt.offset(skip)
+    records = db.scalars(stmt).all()
+    reference_cache.attach_references(db, records, reference_cache.RECORD_REFERENCES)
+    return records
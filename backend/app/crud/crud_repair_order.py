@@ -1,24 +1,29 @@
 # backend/app/crud/crud_repair_order.py
 
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, insert, select
+from typing import Dict, List
 import json
 from fastapi import BackgroundTasks
 import logging # <--- Añadido para diagnóstico
 
+from app.core import reference_cache
 from app.core.websockets import manager
 from app.crud import crud_customer, crud_notification, crud_user
 from app.crud import crud_record
-from app.core.logger import structured_logger, ErrorCategory, ErrorSeverity
 from app.models.repair_order import RepairOrder as RepairOrderModel
 from app.models.device_condition import DeviceCondition as DeviceConditionModel
 from app.models.user import User as UserModel
 from app.models.record import Record as RecordModel
 from app.models.type_record import TypeRecord
+from app.models.status_order import StatusOrder
 from app.schemas.repair_order import RepairOrderCreate, RepairOrderUpdate, RepairOrder as RepairOrderSchema, \
     RepairOrderDetailsUpdate, RepairOrderDiagnosisUpdate
 from app.schemas.notification import Notification as NotificationSchema
-from app.db.session import SessionLocal
+from app.db.session import run_db
+from app.db.unit_of_work import unit_of_work
+from app.services import order_stream, public_order_cache
 
 
 def get_order_creator(db: Session, order_id: int):
@@ -40,143 +45,169 @@ def get_order_creator(db: Session, order_id: int):
         return None
 
 
+async def _dispatch_order_notifications(event_payload, notifications):
+    """Envía por WebSocket el evento de la orden y las notificaciones personales ya persistidas."""
+    if event_payload:
+        await manager.broadcast_to_all(json.dumps(event_payload, default=str))
+    for notification in notifications:
+        notification_event = {"event": "NEW_NOTIFICATION", "payload": notification}
+        await manager.send_to_user(json.dumps(notification_event, default=str), notification["user_id"])
+
+
+def _order_event(event: str, order):
+    return {"event": event, "payload": RepairOrderSchema.from_orm(order).dict()}
+
+
+def _notify(db: Session, user_ids, message: str, link: str):
+    """Persiste las notificaciones (un INSERT; commit salvo dentro de una unidad de trabajo) y las retorna serializadas."""
+    db_notifications = crud_notification.create_notifications(db, user_ids=list(user_ids), message=message, link_to=link)
+    return [NotificationSchema.from_orm(n).dict() for n in db_notifications]
+
+
+def _front_desk_recipients(db: Session, branch_id: int):
+    admins = crud_user.get_users_by_role_and_branch(db, role_name="Administrator", branch_id=branch_id)
+    receptionists = crud_user.get_users_by_role_and_branch(db, role_name="Receptionist", branch_id=branch_id)
+    logging.info(f"-> Admins encontrados para sucursal {branch_id}: {[u.username for u in admins]}")
+    logging.info(f"-> Recepcionistas encontrados para sucursal {branch_id}: {[u.username for u in receptionists]}")
+    # Sin duplicados
+    return list({user.id: user for user in admins + receptionists}.values())
+
+
+# Los helpers de notificación corren como BackgroundTasks dentro del event loop. Todo el
+# trabajo de BD se hace en una función síncrona ejecutada con `run_db` (sesión asíncrona
+# vía run_sync, o threadpool como respaldo) y solo el envío por WebSocket queda en el loop.
+
+def _plan_technician_notifications(db: Session, order_id: int):
+    order = get_repair_order(db, order_id=order_id)
+    if not order or not order.branch_id:
+        return None, []
+    event_payload = _order_event("ORDER_CREATED", order)
+
+    technicians = crud_user.get_users_by_role_and_branch(db, role_name="Technical", branch_id=order.branch_id)
+    message = f"Nueva orden #{order.id} ({order.device_model}) ha sido creada."
+    return event_payload, _notify(db, (tech.id for tech in technicians), message, f"order:{order.id}")
+
+
 async def send_technician_notifications(order_id: int):
-    with SessionLocal() as db:
-        order = get_repair_order(db, order_id=order_id)
-        if not order or not order.branch_id: return
+    event_payload, notifications = await run_db(_plan_technician_notifications, order_id)
+    await _dispatch_order_notifications(event_payload, notifications)
 
-        event_payload = {"event": "ORDER_CREATED", "payload": RepairOrderSchema.from_orm(order).dict()}
-        await manager.broadcast_to_all(json.dumps(event_payload, default=str))
 
-        technicians = crud_user.get_users_by_role_and_branch(db, role_name="Technical", branch_id=order.branch_id)
-        if not technicians: return
+def _plan_order_taken_notification(db: Session, order_id: int, technician_id: int):
+    logging.info("\n--- [DIAGNÓSTICO DE NOTIFICACIÓN: ORDEN TOMADA] ---")
+    order = get_repair_order(db, order_id=order_id)
+    if not order or not order.branch_id:
+        logging.warning("-> Orden no encontrada o sin sucursal. Abortando.")
+        return None, []
+    logging.info(f"-> Orden ID: {order.id}, Sucursal ID: {order.branch_id}")
 
-        message = f"Nueva orden #{order.id} ({order.device_model}) ha sido creada."
-        link = f"order:{order.id}"
-        for tech in technicians:
-            db_notification = crud_notification.create_notification(db, user_id=tech.id, message=message, link_to=link)
-            notification_event = {"event": "NEW_NOTIFICATION",
-                                  "payload": NotificationSchema.from_orm(db_notification).dict()}
-            await manager.send_to_user(json.dumps(notification_event, default=str), tech.id)
+    technician = db.query(UserModel).filter(UserModel.id == technician_id).first()
+    if not technician:
+        logging.warning("-> Técnico actor no encontrado. Abortando.")
+        return None, []
+    event_payload = _order_event("ORDER_UPDATED", order)
 
+    recipients = _front_desk_recipients(db, order.branch_id)
+    if not recipients:
+        logging.warning("-> No se encontraron destinatarios. Abortando.")
+        return event_payload, []
+    logging.info(f"-> Lista final de destinatarios (sin duplicados): {[u.username for u in recipients]}")
 
-async def send_order_taken_notification(order_id: int, technician_id: int):
-    with SessionLocal() as db:
-        logging.info("\n--- [DIAGNÓSTICO DE NOTIFICACIÓN: ORDEN TOMADA] ---")
-        order = get_repair_order(db, order_id=order_id)
-        if not order or not order.branch_id:
-            logging.warning("-> Orden no encontrada o sin sucursal. Abortando.")
-            return
-        logging.info(f"-> Orden ID: {order.id}, Sucursal ID: {order.branch_id}")
-
-        technician = db.query(UserModel).filter(UserModel.id == technician_id).first()
-        if not technician: 
-            logging.warning("-> Técnico actor no encontrado. Abortando.")
-            return
-
-        event_payload = {"event": "ORDER_UPDATED", "payload": RepairOrderSchema.from_orm(order).dict()}
-        await manager.broadcast_to_all(json.dumps(event_payload, default=str))
+    message = f"El técnico {technician.username} ha tomado la orden #{order.id}."
+    notifications = _notify(db, (user.id for user in recipients), message, f"order:{order.id}")
+    logging.info("--- [FIN DEL DIAGNÓSTICO] ---\n")
+    return event_payload, notifications
 
-        admins = crud_user.get_users_by_role_and_branch(db, role_name="Administrator", branch_id=order.branch_id)
-        receptionists = crud_user.get_users_by_role_and_branch(db, role_name="Receptionist", branch_id=order.branch_id)
-        logging.info(f"-> Admins encontrados para sucursal {order.branch_id}: {[u.username for u in admins]}")
-        logging.info(f"-> Recepcionistas encontrados para sucursal {order.branch_id}: {[u.username for u in receptionists]}")
 
-        recipients = admins + receptionists
-        if not recipients:
-            logging.warning("-> No se encontraron destinatarios. Abortando.")
-            return
-        
-        final_recipients = {user.id: user for user in recipients}.values()
-        logging.info(f"-> Lista final de destinatarios (sin duplicados): {[u.username for u in final_recipients]}")
-
-        message = f"El técnico {technician.username} ha tomado la orden #{order.id}."
-        link = f"order:{order.id}"
-        for user in final_recipients:
-            logging.info(f"--> Creando notificación para: {user.username} (ID: {user.id})")
-            db_notification = crud_notification.create_notification(db, user_id=user.id, message=message, link_to=link)
-            notification_event = {"event": "NEW_NOTIFICATION", "payload": NotificationSchema.from_orm(db_notification).dict()}
-            await manager.send_to_user(json.dumps(notification_event, default=str), user.id)
-        logging.info("--- [FIN DEL DIAGNÓSTico] ---\n")
+async def send_order_taken_notification(order_id: int, technician_id: int):
+    event_payload, notifications = await run_db(_plan_order_taken_notification, order_id, technician_id)
+    await _dispatch_order_notifications(event_payload, notifications)
 
-async def send_order_details_updated_notification(order_id: int, actor_user_id: int):
-    with SessionLocal() as db:
-        order = get_repair_order(db, order_id=order_id)
-        if not order or not order.branch_id: return
 
-        # Notificar a todos los conectados sobre la actualización de datos
-        event_payload = {"event": "ORDER_UPDATED", "payload": RepairOrderSchema.from_orm(order).dict()}
-        await manager.broadcast_to_all(json.dumps(event_payload, default=str))
+def _plan_order_details_updated_notification(db: Session, order_id: int):
+    order = get_repair_order(db, order_id=order_id)
+    if not order or not order.branch_id:
+        return None, []
+    # Para la actualización del dashboard basta con el broadcast a todos los conectados.
+    # Aquí podríamos agregar notificaciones personales si la lógica de negocio lo requiere.
+    return _order_event("ORDER_UPDATED", order), []
 
-        # Opcional: Notificar específicamente a roles clave si es necesario, 
-        # pero para actualización de dashboard el broadcast es lo principal.
-        # Aquí podríamos agregar notificaciones personales si la lógica de negocio lo requiere.
 
-async def send_order_updated_notification(order_id: int):
-    with SessionLocal() as db:
-        logging.info("\n--- [DIAGNÓSTICO DE NOTIFICACIÓN: ORDEN COMPLETADA] ---")
-        order = get_repair_order(db, order_id=order_id)
-        if not order or not order.branch_id:
-            logging.warning("-> Orden no encontrada o sin sucursal. Abortando.")
-            return
-        logging.info(f"-> Orden ID: {order.id}, Sucursal ID: {order.branch_id}")
-
-        event_payload = {"event": "ORDER_UPDATED", "payload": RepairOrderSchema.from_orm(order).dict()}
-        await manager.broadcast_to_all(json.dumps(event_payload, default=str))
+async def send_order_details_updated_notification(order_id: int, actor_user_id: int):
+    event_payload, notifications = await run_db(_plan_order_details_updated_notification, order_id)
+    await _dispatch_order_notifications(event_payload, notifications)
+
 
-        admins = crud_user.get_users_by_role_and_branch(db, role_name="Administrator", branch_id=order.branch_id)
-        receptionists = crud_user.get_users_by_role_and_branch(db, role_name="Receptionist", branch_id=order.branch_id)
-        logging.info(f"-> Admins encontrados para sucursal {order.branch_id}: {[u.username for u in admins]}")
-        logging.info(f"-> Recepcionistas encontrados para sucursal {order.branch_id}: {[u.username for u in receptionists]}")
+def _plan_order_updated_notification(db: Session, order_id: int):
+    logging.info("\n--- [DIAGNÓSTICO DE NOTIFICACIÓN: ORDEN COMPLETADA] ---")
+    order = get_repair_order(db, order_id=order_id)
+    if not order or not order.branch_id:
+        logging.warning("-> Orden no encontrada o sin sucursal. Abortando.")
+        return None, []
+    logging.info(f"-> Orden ID: {order.id}, Sucursal ID: {order.branch_id}")
+    event_payload = _order_event("ORDER_UPDATED", order)
 
-        recipients = admins + receptionists
-        if not recipients:
-            logging.warning("-> No se encontraron destinatarios. Abortando.")
-            return
+    recipients = _front_desk_recipients(db, order.branch_id)
+    if not recipients:
+        logging.warning("-> No se encontraron destinatarios. Abortando.")
+        return event_payload, []
+    logging.info(f"-> Lista final de destinatarios (sin duplicados): {[u.username for u in recipients]}")
 
-        final_recipients = {user.id: user for user in recipients}.values()
-        logging.info(f"-> Lista final de destinatarios (sin duplicados): {[u.username for u in final_recipients]}")
+    technician_name = order.technician.username if order.technician else "un técnico"
+    message = f"La orden #{order.id} ha sido completada por {technician_name}."
+    notifications = _notify(db, (user.id for user in recipients), message, f"order:{order.id}")
+    logging.info("--- [FIN DEL DIAGNÓSTICO] ---\n")
+    return event_payload, notifications
 
-        technician_name = order.technician.username if order.technician else "un técnico"
-        message = f"La orden #{order.id} ha sido completada por {technician_name}."
-        link = f"order:{order.id}"
-        for user in final_recipients:
-            logging.info(f"--> Creando notificación para: {user.username} (ID: {user.id})")
-            db_notification = crud_notification.create_notification(db, user_id=user.id, message=message, link_to=link)
-            notification_event = {"event": "NEW_NOTIFICATION", "payload": NotificationSchema.from_orm(db_notification).dict()}
-            await manager.send_to_user(json.dumps(notification_event, default=str), user.id)
-        logging.info("--- [FIN DEL DIAGNÓSTICO] ---\n")
 
-# ... (resto del código sin cambios)
+async def send_order_updated_notification(order_id: int):
+    event_payload, notifications = await run_db(_plan_order_updated_notification, order_id)
+    await _dispatch_order_notifications(event_payload, notifications)
 
-# (Se omite el resto del código para brevedad, ya que no se modifica)
 
 async def send_order_deleted_notification(order_id: int, branch_id: int):
     event_payload = {"event": "ORDER_DELETED", "payload": {"id": order_id}}
     await manager.broadcast_to_all(json.dumps(event_payload))
 
 
+def _plan_order_reopened_notification(db: Session, order_id: int):
+    order = get_repair_order(db, order_id=order_id)
+    if not order or not order.branch_id:
+        return None, []
+    event_payload = _order_event("ORDER_UPDATED", order)
+    if not order.technician_id:
+        return event_payload, []
+    message = f"La orden #{order.id} ({order.device_model}) ha sido reabierta y requiere tu atención."
+    return event_payload, _notify(db, [order.technician_id], message, f"order:{order.id}")
+
+
 async def send_order_reopened_notification(order_id: int):
-    with SessionLocal() as db:
-        order = get_repair_order(db, order_id=order_id)
-        if not order or not order.branch_id: return
-        event_payload = {"event": "ORDER_UPDATED", "payload": RepairOrderSchema.from_orm(order).dict()}
-        await manager.broadcast_to_all(json.dumps(event_payload, default=str))
-        if order.technician_id:
-            message = f"La orden #{order.id} ({order.device_model}) ha sido reabierta y requiere tu atención."
-            link = f"order:{order.id}"
-            db_notification = crud_notification.create_notification(db, user_id=order.technician_id, message=message,
-                                                                    link_to=link)
-            notification_event = {"event": "NEW_NOTIFICATION",
-                                  "payload": NotificationSchema.from_orm(db_notification).dict()}
-            await manager.send_to_user(json.dumps(notification_event, default=str), order.technician_id)
+    event_payload, notifications = await run_db(_plan_order_reopened_notification, order_id)
+    await _dispatch_order_notifications(event_payload, notifications)
 
-def get_repair_orders(
-    db: Session, 
-    user: UserModel, 
-    skip: int = 0, 
-    limit: int = 100,
-    # Filtros opcionales
+def _order_load_options():
+    """
+    Relaciones que se serializan junto con la orden (schemas RepairOrder).
+    Estado, tipo de dispositivo y sucursal no se unen: los adjunta `attach_order_references`.
+    """
+    return (
+        joinedload(RepairOrderModel.customer),
+        joinedload(RepairOrderModel.technician),
+        joinedload(RepairOrderModel.device_conditions),
+        joinedload(RepairOrderModel.photos),
+    )
+
+
+def _log_status_change(db: Session, db_order, prev_status_id: int, actor_user_id):
+    """Registro de auditoría y evento del portal del cambio de estado, dentro de la unidad de trabajo de la mutación."""
+    status = reference_cache.get(db, StatusOrder, db_order.status_id)
+    new_status = status.status_name if status else str(db_order.status_id)
+    crud_record.log_order_event(db, event_type="STATUS_CHANGED", order_id=db_order.id, actor_user_id=actor_user_id, prev_status_id=prev_status_id, new_status_id=db_order.status_id, description=f"Cambio de estado a {new_status}")
+    order_stream.record_status(db, db_order.id, db_order.status_id, status.status_name if status else None)
+
+
+def _apply_order_filters(
+    query,
     order_id: int = None,
     client_name: str = None,
     device_type: str = None,
@@ -185,138 +216,227 @@ def get_repair_orders(
     parts_used: str = None,
     branch_id: int = None
 ):
-    """
-    Obtener órdenes de reparación con paginación y filtros.
-    Retorna tupla: (órdenes, total_count)
-    """
-    # Query base con joins
-    query = db.query(RepairOrderModel).options(
-        joinedload(RepairOrderModel.customer),
-        joinedload(RepairOrderModel.technician),
-        joinedload(RepairOrderModel.status),
-        joinedload(RepairOrderModel.device_type),
-        joinedload(RepairOrderModel.device_conditions),
-        joinedload(RepairOrderModel.photos),
-        joinedload(RepairOrderModel.branch)
-    )
-    
-    # Filtro por permisos de usuario (actualmente todos ven todas las sucursales)
-    if user.role.role_name != "Administrator" and user.branch_id:
-        # query = query.filter(RepairOrderModel.branch_id == user.branch_id)
-        pass # Permitir ver órdenes de todas las sucursales para todos los roles
-    
-    # Aplicar filtros de búsqueda
+    """Aplica los filtros de búsqueda tanto a un `Query` (sesión síncrona) como a un `select()`."""
     if order_id is not None:
         query = query.filter(RepairOrderModel.id == order_id)
-    
+
     if client_name:
         # Búsqueda parcial case-insensitive en nombre y apellido del cliente
         search_pattern = f"%{client_name}%"
         from app.models.customer import Customer
         query = query.join(RepairOrderModel.customer).filter(
-            (Customer.first_name.ilike(search_pattern)) | 
+            (Customer.first_name.ilike(search_pattern)) |
             (Customer.last_name.ilike(search_pattern))
         )
-    
+
     if device_type:
         from app.models.device_type import DeviceType
         query = query.join(RepairOrderModel.device_type).filter(
             DeviceType.type_name == device_type
         )
-    
+
     if status_name:
         from app.models.status_order import StatusOrder
         query = query.join(RepairOrderModel.status).filter(
             StatusOrder.status_name == status_name
         )
-    
+
     if device_model:
         # Búsqueda parcial case-insensitive en modelo
         query = query.filter(RepairOrderModel.device_model.ilike(f"%{device_model}%"))
-    
+
     if parts_used:
         # Búsqueda parcial case-insensitive en repuestos
         query = query.filter(RepairOrderModel.parts_used.ilike(f"%{parts_used}%"))
-    
+
     if branch_id:
         # Filtrar por sucursal específica
         query = query.filter(RepairOrderModel.branch_id == branch_id)
+
+    return query
+
+
+def get_repair_orders(
+    db: Session, 
+    user: UserModel, 
+    skip: int = 0, 
+    limit: int = 100,
+    # Filtros opcionales
+    order_id: int = None,
+    client_name: str = None,
+    device_type: str = None,
+    status_name: str = None,
+    device_model: str = None,
+    parts_used: str = None,
+    branch_id: int = None
+):
+    """
+    Obtener órdenes de reparación con paginación y filtros.
+    Retorna tupla: (órdenes, total_count)
+    """
+    # Query base con joins
+    query = db.query(RepairOrderModel).options(*_order_load_options())
+    
+    # Filtro por permisos de usuario (actualmente todos ven todas las sucursales)
+    if user.role.role_name != "Administrator" and user.branch_id:
+        # query = query.filter(RepairOrderModel.branch_id == user.branch_id)
+        pass # Permitir ver órdenes de todas las sucursales para todos los roles
+    
+    # Aplicar filtros de búsqueda
+    query = _apply_order_filters(
+        query,
+        order_id=order_id,
+        client_name=client_name,
+        device_type=device_type,
+        status_name=status_name,
+        device_model=device_model,
+        parts_used=parts_used,
+        branch_id=branch_id
+    )
     
     # Obtener conteo total ANTES de aplicar paginación
     total_count = query.count()
     
     # Aplicar ordenamiento y paginación
     orders = query.order_by(RepairOrderModel.created_at.desc()).offset(skip).limit(limit).all()
+    reference_cache.attach_order_references(db, orders)
     
     return orders, total_count
 
 def get_repair_order(db: Session, order_id: int):
-    return db.query(RepairOrderModel).options(
-        joinedload(RepairOrderModel.customer),
-        joinedload(RepairOrderModel.technician),
-        joinedload(RepairOrderModel.status),
-        joinedload(RepairOrderModel.device_type),
-        joinedload(RepairOrderModel.device_conditions),
-        joinedload(RepairOrderModel.photos),
-        joinedload(RepairOrderModel.branch)
+    order = db.query(RepairOrderModel).options(
+        *_order_load_options()
     ).filter(RepairOrderModel.id == order_id).first()
+    reference_cache.attach_order_references(db, [order])
+    return order
 
-def create_repair_order(db: Session, order: RepairOrderCreate, background_tasks: BackgroundTasks, user_id: int):
-    creating_user = db.query(UserModel).filter(UserModel.id == user_id).first()
-    if not creating_user or not creating_user.branch_id:
-        raise ValueError("El usuario no tiene una sucursal asignada y no puede crear órdenes.")
-    customer_id = order.customer_id
-    if not customer_id and order.customer:
-        db_customer = crud_customer.get_customer_by_dni(db, dni=order.customer.dni)
-        if db_customer:
-            customer_id = db_customer.id
-        else:
-            new_customer = crud_customer.create_customer(db, customer=order.customer)
-            customer_id = new_customer.id
-    if not customer_id: raise ValueError("Se requiere información del cliente para crear una orden.")
-    status_id = 6 if order.is_spare_part_ordered else 1
-    checklist_data = order.checklist
-    order_data = order.dict(exclude={"checklist", "customer", "is_spare_part_ordered", "customer_id"})
-    db_order = RepairOrderModel(
-        **order_data,
-        customer_id=customer_id,
-        status_id=status_id,
-        branch_id=creating_user.branch_id
+
+# --- Versiones asíncronas (endpoints async) ---
+# Todas las relaciones que serializa el endpoint deben cargarse aquí: en una AsyncSession
+# no se permiten cargas perezosas.
+
+async def get_repair_orders_async(db: AsyncSession, skip: int = 0, limit: int = 100, **filters):
+    """
+    Versión asíncrona de get_repair_orders, con los mismos filtros.
+    Retorna tupla: (órdenes, total_count)
+    """
+    stmt = _apply_order_filters(select(RepairOrderModel), **filters)
+    total_count = await db.scalar(select(func.count()).select_from(stmt.subquery()))
+    result = await db.execute(
+        stmt.options(*_order_load_options())
+        .order_by(RepairOrderModel.created_at.desc())
+        .offset(skip)
+        .limit(limit)
     )
-    db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
-    try:
+    orders = result.unique().scalars().all()
+    await db.run_sync(reference_cache.attach_order_references, orders)
+    return orders, total_count or 0
+
+
+async def get_repair_order_async(db: AsyncSession, order_id: int):
+    result = await db.execute(
+        select(RepairOrderModel).options(*_order_load_options()).where(RepairOrderModel.id == order_id)
+    )
+    order = result.unique().scalars().first()
+    await db.run_sync(reference_cache.attach_order_references, [order])
+    return order
+
+
+async def get_order_for_ticket_async(db: AsyncSession, order_id: int):
+    """Orden con lo que imprime el ticket (sin fotos ni condiciones del equipo)."""
+    result = await db.execute(
+        select(RepairOrderModel)
+        .options(joinedload(RepairOrderModel.customer), joinedload(RepairOrderModel.technician))
+        .where(RepairOrderModel.id == order_id)
+    )
+    order = result.unique().scalars().first()
+    if order is not None:
+        await db.run_sync(reference_cache.attach_order_references, [order])
+    return order
+
+
+async def get_order_creators_async(db: AsyncSession, order_ids: List[int]) -> Dict[int, UserModel]:
+    """
+    Usuarios que crearon cada orden, en una sola consulta (en lugar de get_order_creator por orden).
+    Retorna un dict order_id -> usuario.
+    """
+    if not order_ids:
+        return {}
+    result = await db.execute(
+        select(RecordModel.order_id, UserModel)
+        .join(TypeRecord, RecordModel.id_even_type == TypeRecord.id)
+        .join(UserModel, UserModel.id == RecordModel.actor_user_id)
+        .where(RecordModel.order_id.in_(order_ids), TypeRecord.type_name == "Order creation")
+        .order_by(RecordModel.id)
+    )
+    creators = {}
+    for order_id, creator in result.all():
+        creators.setdefault(order_id, creator)
+    return creators
+
+def create_repair_order(db: Session, order: RepairOrderCreate, background_tasks: BackgroundTasks, user_id: int):
+    with unit_of_work(db):
+        creating_user = db.query(UserModel).filter(UserModel.id == user_id).first()
+        if not creating_user or not creating_user.branch_id:
+            raise ValueError("El usuario no tiene una sucursal asignada y no puede crear órdenes.")
+        customer_id = order.customer_id
+        if not customer_id and order.customer:
+            db_customer = crud_customer.get_customer_by_dni(db, dni=order.customer.dni)
+            if db_customer:
+                customer_id = db_customer.id
+            else:
+                new_customer = crud_customer.create_customer(db, customer=order.customer)
+                customer_id = new_customer.id
+        if not customer_id: raise ValueError("Se requiere información del cliente para crear una orden.")
+        status_id = 6 if order.is_spare_part_ordered else 1
+        order_data = order.dict(exclude={"checklist", "customer", "is_spare_part_ordered", "customer_id"})
+        db_order = RepairOrderModel(
+            **order_data,
+            customer_id=customer_id,
+            status_id=status_id,
+            branch_id=creating_user.branch_id
+        )
+        db.add(db_order)
+        db.flush()  # asigna el id de la orden para el checklist y el registro
+        if order.checklist:
+            # Un solo INSERT (executemany) para todos los ítems del checklist
+            db.execute(
+                insert(DeviceConditionModel),
+                [{**item_data.dict(), "order_id": db_order.id} for item_data in order.checklist],
+            )
         crud_record.log_order_event(db, event_type="ORDER_CREATED", order_id=db_order.id, actor_user_id=user_id, origin_branch_id=creating_user.branch_id)
-    except Exception as e:
-        structured_logger.log_error(e, ErrorCategory.DATABASE, ErrorSeverity.MEDIUM, {"event": "ORDER_CREATED", "order_id": db_order.id, "actor_user_id": user_id})
-    if checklist_data:
-        for item_data in checklist_data:
-            db_condition = DeviceConditionModel(**item_data.dict(), order_id=db_order.id)
-            db.add(db_condition)
-        db.commit()
-        db.refresh(db_order)
+        # La búsqueda pública por DNI pasa a mostrar esta orden
+        public_order_cache.mark_order_changed(db, db_order.id, dnis=[db_order.customer.dni])
+    db_order = get_repair_order(db, order_id=db_order.id)
     background_tasks.add_task(send_technician_notifications, order_id=db_order.id)
     return db_order
 
 
 def update_order_diagnosis(db: Session, order_id: int, diagnosis_update, background_tasks: BackgroundTasks, user_id: int):
     """Actualizar solo los campos de diagnóstico y notas de reparación"""
+    with unit_of_work(db):
+        db_order = get_repair_order(db, order_id)
+        if not db_order:
+            return None
+
+        # Actualizar solo los campos de diagnóstico
+        prev_diagnosis = db_order.technician_diagnosis
+        prev_notes = db_order.repair_notes
+        if diagnosis_update.technician_diagnosis is not None:
+            db_order.technician_diagnosis = diagnosis_update.technician_diagnosis
+
+        if diagnosis_update.repair_notes is not None:
+            db_order.repair_notes = diagnosis_update.repair_notes
+
+        db_order.updated_at = func.now()
+        public_order_cache.mark_order_changed(db, order_id)
+        if (prev_diagnosis, prev_notes) != (db_order.technician_diagnosis, db_order.repair_notes):
+            order_stream.record_event(db, order_id, "diagnosis", {
+                "order_id": order_id,
+                "technician_diagnosis": db_order.technician_diagnosis,
+                "repair_notes": db_order.repair_notes,
+            })
     db_order = get_repair_order(db, order_id)
-    if not db_order:
-        return None
-    
-    # Actualizar solo los campos de diagnóstico
-    prev_diagnosis = db_order.technician_diagnosis
-    if diagnosis_update.technician_diagnosis is not None:
-        db_order.technician_diagnosis = diagnosis_update.technician_diagnosis
-    
-    if diagnosis_update.repair_notes is not None:
-        db_order.repair_notes = diagnosis_update.repair_notes
-    
-    db_order.updated_at = func.now()
-    db.commit()
-    db.refresh(db_order)
     
     # Enviar notificación de actualización
     background_tasks.add_task(send_order_details_updated_notification, order_id=db_order.id, actor_user_id=user_id)
@@ -330,34 +450,31 @@ def update_order_diagnosis(db: Session, order_id: int, diagnosis_update, backgro
 
 def complete_technician_work(db: Session, order_id: int, order_update: RepairOrderUpdate,
                              background_tasks: BackgroundTasks, user_id: int):
+    with unit_of_work(db):
+        db_order = get_repair_order(db, order_id)
+        if not db_order: return None
+        prev_status_id = db_order.status_id
+
+        # Si la orden no tiene técnico asignado, asignar el usuario actual
+        # Esto permite la funcionalidad de "Completar Directamente"
+        if db_order.technician_id is None:
+            db_order.technician_id = user_id
+
+        update_data = order_update.dict(exclude_unset=True, exclude={'checklist'})
+        for key, value in update_data.items(): setattr(db_order, key, value)
+        if order_update.checklist is not None:
+            existing_conditions = {c.check_description: c for c in db_order.device_conditions}
+            for item_update in order_update.checklist:
+                if item_update.check_description in existing_conditions:
+                    condition_to_update = existing_conditions[item_update.check_description]
+                    item_data = item_update.dict(exclude_unset=True)
+                    for key, value in item_data.items(): setattr(condition_to_update, key, value)
+        db_order.status_id = 3
+        db_order.completed_at = func.now()
+        db_order.updated_at = func.now()
+        _log_status_change(db, db_order, prev_status_id, user_id)
+        public_order_cache.mark_order_changed(db, order_id)
     db_order = get_repair_order(db, order_id)
-    if not db_order: return None
-    prev_status_id = db_order.status_id
-    
-    # Si la orden no tiene técnico asignado, asignar el usuario actual
-    # Esto permite la funcionalidad de "Completar Directamente"
-    if db_order.technician_id is None:
-        db_order.technician_id = user_id
-    
-    update_data = order_update.dict(exclude_unset=True, exclude={'checklist'})
-    for key, value in update_data.items(): setattr(db_order, key, value)
-    if order_update.checklist is not None:
-        existing_conditions = {c.check_description: c for c in db_order.device_conditions}
-        for item_update in order_update.checklist:
-            if item_update.check_description in existing_conditions:
-                condition_to_update = existing_conditions[item_update.check_description]
-                item_data = item_update.dict(exclude_unset=True)
-                for key, value in item_data.items(): setattr(condition_to_update, key, value)
-    db_order.status_id = 3
-    db_order.completed_at = func.now()
-    db_order.updated_at = func.now()
-    db.commit()
-    db.refresh(db_order)
-    try:
-        new_status = db_order.status.status_name if db_order.status else str(db_order.status_id)
-        crud_record.log_order_event(db, event_type="STATUS_CHANGED", order_id=db_order.id, actor_user_id=user_id, prev_status_id=prev_status_id, new_status_id=db_order.status_id, description=f"Cambio de estado a {new_status}")
-    except Exception:
-        pass
     background_tasks.add_task(send_order_updated_notification, order_id=db_order.id)
     # Email al cliente por cambio de estado
     from app.services.email_transaccional import EmailTransactionalService
@@ -367,49 +484,50 @@ def complete_technician_work(db: Session, order_id: int, order_update: RepairOrd
 
 def update_order_details(db: Session, order_id: int, order_update: RepairOrderDetailsUpdate,
                          background_tasks: BackgroundTasks, user_id: int):
-    db_order = get_repair_order(db, order_id)
-    if not db_order: return None
-    prev_status_id = db_order.status_id
-    customer_update_data = order_update.customer
-    order_update_data = order_update.dict(exclude_unset=True, exclude={'customer', 'checklist'})
-    
-    # Manejar el cambio de estado basado en is_spare_part_ordered
-    if 'is_spare_part_ordered' in order_update_data:
-        is_spare_part_ordered = order_update_data.pop('is_spare_part_ordered')
-        # Si se cambia el estado del repuesto, actualizar el status_id
-        if is_spare_part_ordered:
-            db_order.status_id = 6  # Estado "Esperando repuesto"
-        else:
-            # Si no necesita repuesto y está en estado 6, cambiar a pendiente
-            if db_order.status_id == 6:
-                db_order.status_id = 1  # Estado "Pendiente"
-        db_order.is_spare_part_ordered = is_spare_part_ordered
-    
-    for key, value in order_update_data.items():
-        setattr(db_order, key, value)
-    if customer_update_data and db_order.customer:
-        for key, value in customer_update_data.dict(exclude_unset=True).items():
-            setattr(db_order.customer, key, value)
-    if order_update.checklist is not None:
-        existing_conditions = {cond.check_description: cond for cond in db_order.device_conditions}
-        for item_update in order_update.checklist:
-            if item_update.check_description in existing_conditions:
-                condition_to_update = existing_conditions[item_update.check_description]
-                item_data = item_update.dict(exclude_unset=True)
-                for key, value in item_data.items():
-                    setattr(condition_to_update, key, value)
+    with unit_of_work(db):
+        db_order = get_repair_order(db, order_id)
+        if not db_order: return None
+        prev_status_id = db_order.status_id
+        customer_update_data = order_update.customer
+        order_update_data = order_update.dict(exclude_unset=True, exclude={'customer', 'checklist'})
+
+        # Manejar el cambio de estado basado en is_spare_part_ordered
+        if 'is_spare_part_ordered' in order_update_data:
+            is_spare_part_ordered = order_update_data.pop('is_spare_part_ordered')
+            # Si se cambia el estado del repuesto, actualizar el status_id
+            if is_spare_part_ordered:
+                db_order.status_id = 6  # Estado "Esperando repuesto"
             else:
-                new_condition = DeviceConditionModel(**item_update.dict(), order_id=db_order.id)
-                db.add(new_condition)
-    db_order.updated_at = func.now()
-    db.commit()
-    db.refresh(db_order)
-    try:
+                # Si no necesita repuesto y está en estado 6, cambiar a pendiente
+                if db_order.status_id == 6:
+                    db_order.status_id = 1  # Estado "Pendiente"
+            db_order.is_spare_part_ordered = is_spare_part_ordered
+
+        for key, value in order_update_data.items():
+            setattr(db_order, key, value)
+        if customer_update_data and db_order.customer:
+            for key, value in customer_update_data.dict(exclude_unset=True).items():
+                setattr(db_order.customer, key, value)
+            # Los datos del cliente se muestran en todas sus órdenes
+            public_order_cache.mark_all_changed(db)
+        if order_update.checklist is not None:
+            existing_conditions = {cond.check_description: cond for cond in db_order.device_conditions}
+            new_conditions = []
+            for item_update in order_update.checklist:
+                if item_update.check_description in existing_conditions:
+                    condition_to_update = existing_conditions[item_update.check_description]
+                    item_data = item_update.dict(exclude_unset=True)
+                    for key, value in item_data.items():
+                        setattr(condition_to_update, key, value)
+                else:
+                    new_conditions.append({**item_update.dict(), "order_id": db_order.id})
+            if new_conditions:
+                db.execute(insert(DeviceConditionModel), new_conditions)
+        db_order.updated_at = func.now()
         if prev_status_id != db_order.status_id:
-            new_status = db_order.status.status_name if db_order.status else str(db_order.status_id)
-            crud_record.log_order_event(db, event_type="STATUS_CHANGED", order_id=db_order.id, actor_user_id=user_id, prev_status_id=prev_status_id, new_status_id=db_order.status_id, description=f"Cambio de estado a {new_status}")
-    except Exception:
-        pass
+            _log_status_change(db, db_order, prev_status_id, user_id)
+        public_order_cache.mark_order_changed(db, order_id)
+    db_order = get_repair_order(db, order_id)
     background_tasks.add_task(send_order_details_updated_notification, order_id=db_order.id, actor_user_id=user_id)
     # Email al cliente si cambió el estado
     from app.services.email_transaccional import EmailTransactionalService
@@ -419,32 +537,31 @@ def update_order_details(db: Session, order_id: int, order_update: RepairOrderDe
 
 def assign_technician_and_start_process(db: Session, order_id: int, technician_id: int,
                                         background_tasks: BackgroundTasks):
-    db_order = get_repair_order(db, order_id)
-    if not db_order: return None
-    prev_status_id = db_order.status_id
-    if db_order.technician_id is None and db_order.status_id in [1, 6]:
+    with unit_of_work(db):
+        db_order = get_repair_order(db, order_id)
+        if not db_order: return None
+        prev_status_id = db_order.status_id
+        if db_order.technician_id is not None or db_order.status_id not in [1, 6]:
+            return None
         db_order.technician_id = technician_id
         db_order.status_id = 2
         db_order.updated_at = func.now()
-        db.commit()
-        db.refresh(db_order)
-        try:
-            new_status = db_order.status.status_name if db_order.status else str(db_order.status_id)
-            crud_record.log_order_event(db, event_type="STATUS_CHANGED", order_id=db_order.id, actor_user_id=technician_id, prev_status_id=prev_status_id, new_status_id=db_order.status_id, description=f"Cambio de estado a {new_status}")
-        except Exception:
-            pass
-        background_tasks.add_task(send_order_taken_notification, order_id=order_id, technician_id=technician_id)
-        # Email al cliente por cambio de estado
-        from app.services.email_transaccional import EmailTransactionalService
-        email_service = EmailTransactionalService()
-        background_tasks.add_task(email_service.notify_status_change, order_id=db_order.id, prev_status_id=prev_status_id, new_status_id=db_order.status_id)
-        return db_order
-    return None
+        _log_status_change(db, db_order, prev_status_id, technician_id)
+        public_order_cache.mark_order_changed(db, order_id)
+    db_order = get_repair_order(db, order_id)
+    background_tasks.add_task(send_order_taken_notification, order_id=order_id, technician_id=technician_id)
+    # Email al cliente por cambio de estado
+    from app.services.email_transaccional import EmailTransactionalService
+    email_service = EmailTransactionalService()
+    background_tasks.add_task(email_service.notify_status_change, order_id=db_order.id, prev_status_id=prev_status_id, new_status_id=db_order.status_id)
+    return db_order
 
 def delete_repair_order(db: Session, order_id: int, background_tasks: BackgroundTasks) -> bool:
     db_order = db.query(RepairOrderModel).filter(RepairOrderModel.id == order_id).first()
     if db_order:
         branch_id = db_order.branch_id
+        public_order_cache.mark_order_changed(db, order_id, dnis=[db_order.customer.dni if db_order.customer else None])
+        order_stream.record_event(db, order_id, "deleted", {"order_id": order_id})
         db.delete(db_order)
         db.commit()
         if branch_id:
@@ -453,90 +570,74 @@ def delete_repair_order(db: Session, order_id: int, background_tasks: Background
     return False
 
 def reopen_order(db: Session, order_id: int, background_tasks: BackgroundTasks):
-    db_order = get_repair_order(db, order_id)
-    if not db_order: return None
-    prev_status_id = db_order.status_id
-    # Permitir reabrir órdenes completadas (3) o entregadas (5)
-    if db_order.status_id in [3, 5]:
+    with unit_of_work(db):
+        db_order = get_repair_order(db, order_id)
+        if not db_order: return None
+        prev_status_id = db_order.status_id
+        # Permitir reabrir órdenes completadas (3) o entregadas (5)
+        if db_order.status_id not in [3, 5]:
+            return None
         db_order.status_id = 2  # Cambiar a "In Process"
         db_order.completed_at = None
         db_order.delivered_at = None  # Limpiar fecha de entrega si existe
         note_prefix = "\n--- ORDEN REABIERTA ---"
         db_order.repair_notes = f"{db_order.repair_notes or ''}{note_prefix}"
-        db.commit()
-        db.refresh(db_order)
-        try:
-            new_status = db_order.status.status_name if db_order.status else str(db_order.status_id)
-            crud_record.log_order_event(db, event_type="STATUS_CHANGED", order_id=db_order.id, actor_user_id=None, prev_status_id=prev_status_id, new_status_id=db_order.status_id, description=f"Cambio de estado a {new_status}")
-        except Exception:
-            pass
-        background_tasks.add_task(send_order_reopened_notification, order_id=order_id)
-        # Email al cliente por cambio de estado
-        from app.services.email_transaccional import EmailTransactionalService
-        email_service = EmailTransactionalService()
-        background_tasks.add_task(email_service.notify_status_change, order_id=db_order.id, prev_status_id=prev_status_id, new_status_id=db_order.status_id)
-        return db_order
-    return None
+        _log_status_change(db, db_order, prev_status_id, None)
+        public_order_cache.mark_order_changed(db, order_id)
+    db_order = get_repair_order(db, order_id)
+    background_tasks.add_task(send_order_reopened_notification, order_id=order_id)
+    # Email al cliente por cambio de estado
+    from app.services.email_transaccional import EmailTransactionalService
+    email_service = EmailTransactionalService()
+    background_tasks.add_task(email_service.notify_status_change, order_id=db_order.id, prev_status_id=prev_status_id, new_status_id=db_order.status_id)
+    return db_order
 
 def get_repair_orders_by_customer(db: Session, customer_id: int):
-    return (
+    orders = (
         db.query(RepairOrderModel)
-        .options(
-            joinedload(RepairOrderModel.technician),
-            joinedload(RepairOrderModel.status),
-            joinedload(RepairOrderModel.device_type)
-        )
+        .options(joinedload(RepairOrderModel.technician))
         .filter(RepairOrderModel.customer_id == customer_id)
         .order_by(RepairOrderModel.created_at.desc())
         .all()
     )
+    reference_cache.attach_order_references(db, orders)
+    return orders
 
-async def send_order_delivered_notification(order_id: int, actor_user_id: int):
-    with SessionLocal() as db:
-        order = get_repair_order(db, order_id=order_id)
-        if not order or not order.branch_id: return
-
-        event_payload = {"event": "ORDER_UPDATED", "payload": RepairOrderSchema.from_orm(order).dict()}
-        await manager.broadcast_to_all(json.dumps(event_payload, default=str))
+def _plan_order_delivered_notification(db: Session, order_id: int, actor_user_id: int):
+    order = get_repair_order(db, order_id=order_id)
+    if not order or not order.branch_id:
+        return None, []
+    event_payload = _order_event("ORDER_UPDATED", order)
 
-        actor = db.query(UserModel).filter(UserModel.id == actor_user_id).first()
-        actor_name = actor.username if actor else "un usuario"
-        message = f"La orden #{order.id} ha sido entregada por {actor_name}."
+    actor = db.query(UserModel).filter(UserModel.id == actor_user_id).first()
+    actor_name = actor.username if actor else "un usuario"
+    message = f"La orden #{order.id} ha sido entregada por {actor_name}."
 
-        recipients = []
-        admins = crud_user.get_users_by_role_and_branch(db, role_name="Administrator", branch_id=order.branch_id)
-        receptionists = crud_user.get_users_by_role_and_branch(db, role_name="Receptionist", branch_id=order.branch_id)
-        recipients.extend(admins)
-        recipients.extend(receptionists)
+    recipients = _front_desk_recipients(db, order.branch_id)
+    user_ids = [user.id for user in recipients if user.id != actor_user_id]
+    return event_payload, _notify(db, user_ids, message, f"order:{order.id}")
 
-        final_recipients = {user.id: user for user in recipients}.values()
-        link = f"order:{order.id}"
 
-        for user in final_recipients:
-            if user.id != actor_user_id:
-                db_notification = crud_notification.create_notification(db, user_id=user.id, message=message, link_to=link)
-                notification_event = {"event": "NEW_NOTIFICATION", "payload": NotificationSchema.from_orm(db_notification).dict()}
-                await manager.send_to_user(json.dumps(notification_event, default=str), user.id)
+async def send_order_delivered_notification(order_id: int, actor_user_id: int):
+    event_payload, notifications = await run_db(_plan_order_delivered_notification, order_id, actor_user_id)
+    await _dispatch_order_notifications(event_payload, notifications)
 
 def mark_as_delivered(db: Session, order_id: int, background_tasks: BackgroundTasks, user_id: int):
-    db_order = get_repair_order(db, order_id=order_id)
+    with unit_of_work(db):
+        db_order = get_repair_order(db, order_id=order_id)
 
-    if not db_order:
-        raise ValueError("Orden no encontrada.")
+        if not db_order:
+            raise ValueError("Orden no encontrada.")
 
-    if db_order.status_id != 3:
-        raise ValueError("La orden no puede ser entregada si no está en estado 'Completado'.")
+        if db_order.status_id != 3:
+            raise ValueError("La orden no puede ser entregada si no está en estado 'Completado'.")
 
-    prev_status_id = db_order.status_id
-    db_order.status_id = 5
-    db_order.updated_at = func.now()
-    db.commit()
-    db.refresh(db_order)
-    try:
-        new_status = db_order.status.status_name if db_order.status else str(db_order.status_id)
-        crud_record.log_order_event(db, event_type="STATUS_CHANGED", order_id=db_order.id, actor_user_id=user_id, prev_status_id=prev_status_id, new_status_id=db_order.status_id, description=f"Cambio de estado a {new_status}")
-    except Exception:
-        pass
+        prev_status_id = db_order.status_id
+        db_order.status_id = 5
+        db_order.updated_at = func.now()
+        _log_status_change(db, db_order, prev_status_id, user_id)
+        public_order_cache.mark_order_changed(db, order_id)
+    db_order = get_repair_order(db, order_id=order_id)
 
     background_tasks.add_task(send_order_delivered_notification, order_id=db_order.id, actor_user_id=user_id)
     # Email al cliente por cambio de estado
@@ -546,66 +647,53 @@ def mark_as_delivered(db: Session, order_id: int, background_tasks: BackgroundTa
 
     return db_order
 
+def _plan_order_transferred_notification(db: Session, order_id: int, origin_branch_id: int, target_branch_id: int, actor_user_id: int):
+    logging.info(f"\n--- [NOTIFICACIÓN DE TRANSFERENCIA] ---")
+    order = get_repair_order(db, order_id=order_id)
+    if not order:
+        logging.warning("-> Orden no encontrada. Abortando.")
+        return None, []
+
+    # Obtener información del usuario que realizó la transferencia
+    actor_user = db.query(UserModel).filter(UserModel.id == actor_user_id).first()
+    actor_name = actor_user.username if actor_user else "un usuario"
+
+    # Obtener información de las sucursales
+    from app.crud import crud_branch
+    origin_branch = crud_branch.get_branch(db, branch_id=origin_branch_id)
+    target_branch = crud_branch.get_branch(db, branch_id=target_branch_id)
+
+    origin_branch_name = origin_branch.branch_name if origin_branch else "sucursal origen"
+    target_branch_name = target_branch.branch_name if target_branch else "sucursal destino"
+    link = f"order:{order.id}"
+    notifications = []
+
+    # 1. Notificar a usuarios de la sucursal DESTINO
+    target_users = crud_user.get_users_by_branch(db, branch_id=target_branch_id)
+    if target_users:
+        target_message = f"Orden #{order.id} ({order.device_model}) ha sido transferida a su sucursal desde {origin_branch_name} por {actor_name}."
+        user_ids = [user.id for user in target_users if user.id != actor_user_id and user.is_active]
+        notifications += _notify(db, user_ids, target_message, link)
+        logging.info(f"-> Notificaciones enviadas a {len(target_users)} usuarios de la sucursal destino {target_branch_name}")
+
+    # 2. Notificar a usuarios de la sucursal ORIGEN (excluyendo al actor)
+    origin_users = crud_user.get_users_by_branch(db, branch_id=origin_branch_id)
+    if origin_users:
+        origin_message = f"Orden #{order.id} ({order.device_model}) ha sido transferida desde su sucursal hacia {target_branch_name} por {actor_name}."
+        user_ids = [user.id for user in origin_users if user.id != actor_user_id and user.is_active]
+        notifications += _notify(db, user_ids, origin_message, link)
+        logging.info(f"-> Notificaciones enviadas a {len(origin_users)} usuarios de la sucursal origen {origin_branch_name}")
+
+    logging.info("--- [FIN DE NOTIFICACIÓN DE TRANSFERENCIA] ---\n")
+    return None, notifications
+
+
 async def send_order_transferred_notification(order_id: int, origin_branch_id: int, target_branch_id: int, actor_user_id: int):
     """Envía notificaciones sobre la transferencia tanto a la sucursal origen como destino."""
-    with SessionLocal() as db:
-        logging.info(f"\n--- [NOTIFICACIÓN DE TRANSFERENCIA] ---")
-        order = get_repair_order(db, order_id=order_id)
-        if not order:
-            logging.warning("-> Orden no encontrada. Abortando.")
-            return
-        
-        # Obtener información del usuario que realizó la transferencia
-        actor_user = db.query(UserModel).filter(UserModel.id == actor_user_id).first()
-        actor_name = actor_user.username if actor_user else "un usuario"
-        
-        # Obtener información de las sucursales
-        from app.crud import crud_branch
-        origin_branch = crud_branch.get_branch(db, branch_id=origin_branch_id)
-        target_branch = crud_branch.get_branch(db, branch_id=target_branch_id)
-        
-        origin_branch_name = origin_branch.branch_name if origin_branch else "sucursal origen"
-        target_branch_name = target_branch.branch_name if target_branch else "sucursal destino"
-        
-        # 1. Notificar a usuarios de la sucursal DESTINO
-        target_users = crud_user.get_users_by_branch(db, branch_id=target_branch_id)
-        if target_users:
-            target_message = f"Orden #{order.id} ({order.device_model}) ha sido transferida a su sucursal desde {origin_branch_name} por {actor_name}."
-            link = f"order:{order.id}"
-            
-            for user in target_users:
-                if user.id != actor_user_id and user.is_active:
-                    db_notification = crud_notification.create_notification(
-                        db, user_id=user.id, message=target_message, link_to=link
-                    )
-                    notification_event = {
-                        "event": "NEW_NOTIFICATION", 
-                        "payload": NotificationSchema.from_orm(db_notification).dict()
-                    }
-                    await manager.send_to_user(json.dumps(notification_event, default=str), user.id)
-            
-            logging.info(f"-> Notificaciones enviadas a {len(target_users)} usuarios de la sucursal destino {target_branch_name}")
-        
-        # 2. Notificar a usuarios de la sucursal ORIGEN (excluyendo al actor)
-        origin_users = crud_user.get_users_by_branch(db, branch_id=origin_branch_id)
-        if origin_users:
-            origin_message = f"Orden #{order.id} ({order.device_model}) ha sido transferida desde su sucursal hacia {target_branch_name} por {actor_name}."
-            link = f"order:{order.id}"
-            
-            for user in origin_users:
-                if user.id != actor_user_id and user.is_active:
-                    db_notification = crud_notification.create_notification(
-                        db, user_id=user.id, message=origin_message, link_to=link
-                    )
-                    notification_event = {
-                        "event": "NEW_NOTIFICATION", 
-                        "payload": NotificationSchema.from_orm(db_notification).dict()
-                    }
-                    await manager.send_to_user(json.dumps(notification_event, default=str), user.id)
-            
-            logging.info(f"-> Notificaciones enviadas a {len(origin_users)} usuarios de la sucursal origen {origin_branch_name}")
-        
-        logging.info("--- [FIN DE NOTIFICACIÓN DE TRANSFERENCIA] ---\n")
+    event_payload, notifications = await run_db(
+        _plan_order_transferred_notification, order_id, origin_branch_id, target_branch_id, actor_user_id
+    )
+    await _dispatch_order_notifications(event_payload, notifications)
 
 def transfer_order(db: Session, order_id: int, target_branch_id: int, background_tasks: BackgroundTasks, user_id: int):
     """
@@ -613,50 +701,45 @@ def transfer_order(db: Session, order_id: int, target_branch_id: int, background
     Si la orden está en proceso (status_id=2), se resetea el técnico y se pone en pendiente (status_id=1).
     Valida que el usuario tenga permiso para transferir la orden desde su sucursal actual si es recepcionista.
     """
-    # Verificar que la orden existe
-    db_order = get_repair_order(db, order_id=order_id)
-    if not db_order:
-        raise ValueError("Orden no encontrada.")
-    
-    # Obtener el usuario actor para validar permisos adicionales
-    actor_user = db.query(UserModel).filter(UserModel.id == user_id).first()
-    
-    # Si es recepcionista, validar que la orden pertenezca a su sucursal
-    if actor_user and actor_user.role.role_name == "Receptionist":
-        if actor_user.branch_id != db_order.branch_id:
-            raise ValueError("No tienes permiso para transferir órdenes de otras sucursales.")
-    
-    # Guardar la sucursal origen antes de actualizar
-    origin_branch_id = db_order.branch_id
-    
-    # Verificar que la sucursal destino existe
     from app.crud import crud_branch
-    target_branch = crud_branch.get_branch(db, branch_id=target_branch_id)
-    if not target_branch:
-        raise ValueError("Sucursal destino no encontrada.")
-    
-    # Verificar que no se esté transfiriendo a la misma sucursal
-    if origin_branch_id == target_branch_id:
-        raise ValueError("No se puede transferir una orden a la misma sucursal.")
-    
-    # Si la orden está en proceso (status_id=2), resetear técnico y poner en pendiente
-    prev_status_id = db_order.status_id
-    if db_order.status_id == 2:  # En proceso
-        db_order.technician_id = None
-        db_order.status_id = 1  # Pendiente
-    
-    # Actualizar la sucursal
-    db_order.branch_id = target_branch_id
-    db_order.updated_at = func.now()
-    
-    db.commit()
-    db.refresh(db_order)
-    try:
-        from app.crud import crud_branch
-        origin_branch = crud_branch.get_branch(db, branch_id=origin_branch_id)
+    with unit_of_work(db):
+        # Verificar que la orden existe
+        db_order = get_repair_order(db, order_id=order_id)
+        if not db_order:
+            raise ValueError("Orden no encontrada.")
+
+        # Obtener el usuario actor para validar permisos adicionales
+        actor_user = db.query(UserModel).filter(UserModel.id == user_id).first()
+
+        # Si es recepcionista, validar que la orden pertenezca a su sucursal
+        if actor_user and actor_user.role.role_name == "Receptionist":
+            if actor_user.branch_id != db_order.branch_id:
+                raise ValueError("No tienes permiso para transferir órdenes de otras sucursales.")
+
+        # Guardar la sucursal origen antes de actualizar
+        origin_branch_id = db_order.branch_id
+
+        # Verificar que la sucursal destino existe (caché de referencia, sin consulta)
         target_branch = crud_branch.get_branch(db, branch_id=target_branch_id)
+        if not target_branch:
+            raise ValueError("Sucursal destino no encontrada.")
+
+        # Verificar que no se esté transfiriendo a la misma sucursal
+        if origin_branch_id == target_branch_id:
+            raise ValueError("No se puede transferir una orden a la misma sucursal.")
+
+        # Si la orden está en proceso (status_id=2), resetear técnico y poner en pendiente
+        prev_status_id = db_order.status_id
+        if db_order.status_id == 2:  # En proceso
+            db_order.technician_id = None
+            db_order.status_id = 1  # Pendiente
+
+        # Actualizar la sucursal
+        db_order.branch_id = target_branch_id
+        db_order.updated_at = func.now()
+
+        origin_branch = crud_branch.get_branch(db, branch_id=origin_branch_id)
         origin_name = origin_branch.branch_name if origin_branch else str(origin_branch_id)
-        target_name = target_branch.branch_name if target_branch else str(target_branch_id)
         crud_record.log_order_event(
             db,
             event_type="TRANSFERRED",
@@ -666,10 +749,13 @@ def transfer_order(db: Session, order_id: int, target_branch_id: int, background
             target_branch_id=target_branch_id,
             prev_status_id=prev_status_id,
             new_status_id=db_order.status_id,
-            description=f"Transferencia: {origin_name} → {target_name}"
+            description=f"Transferencia: {origin_name} → {target_branch.branch_name}"
         )
-    except Exception:
-        pass
+        public_order_cache.mark_order_changed(db, order_id)
+        if prev_status_id != db_order.status_id:
+            status = reference_cache.get(db, StatusOrder, db_order.status_id)
+            order_stream.record_status(db, order_id, db_order.status_id, status.status_name if status else None)
+    db_order = get_repair_order(db, order_id=order_id)
     
     # Enviar evento WebSocket para actualizar la lista en tiempo real
     event_payload = {"event": "ORDER_UPDATED", "payload": RepairOrderSchema.from_orm(db_order).dict()}
@@ -1,10 +1,16 @@
 # backend/app/crud/crud_repair_order_photo.py
 
-from sqlalchemy.orm import Session
+import base64
+import json
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, defer
 from typing import List, Optional
 
 from app.models.repair_order_photo import RepairOrderPhoto as RepairOrderPhotoModel
-from app.schemas.repair_order_photo import RepairOrderPhotoCreate, RepairOrderPhotoUpdate
+from app.schemas.repair_order_photo import RepairOrderPhotoCreate, RepairOrderPhotoPublic, RepairOrderPhotoUpdate
+from app.services import order_stream, photo_previews, public_order_cache
 
 
 def create_repair_order_photo(db: Session, photo: RepairOrderPhotoCreate) -> RepairOrderPhotoModel:
@@ -21,6 +27,12 @@ def create_repair_order_photo(db: Session, photo: RepairOrderPhotoCreate) -> Rep
         drawings=drawings_json
     )
     db.add(db_photo)
+    db.flush()
+    db.refresh(db_photo, attribute_names=["created_at"])
+    public_order_cache.mark_order_changed(db, photo.order_id)
+    order_stream.record_event(
+        db, photo.order_id, "photo", RepairOrderPhotoPublic.model_validate(db_photo).model_dump(mode="json")
+    )
     db.commit()
     db.refresh(db_photo)
     return db_photo
@@ -33,6 +45,56 @@ def get_repair_order_photos(db: Session, order_id: int) -> List[RepairOrderPhoto
     ).order_by(RepairOrderPhotoModel.created_at.desc()).all()
 
 
+async def get_repair_order_photos_async(db: AsyncSession, order_id: int) -> List[RepairOrderPhotoModel]:
+    """Versión asíncrona de get_repair_order_photos"""
+    result = await db.scalars(
+        select(RepairOrderPhotoModel)
+        .where(RepairOrderPhotoModel.order_id == order_id)
+        .order_by(RepairOrderPhotoModel.created_at.desc())
+    )
+    return result.all()
+
+
+def encode_cursor(photo: RepairOrderPhotoModel) -> str:
+    """Cursor opaco de paginación por id de la última foto de la página."""
+    return base64.urlsafe_b64encode(json.dumps([photo.id]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Retorna el id. Lanza ValueError si el cursor no es válido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        (photo_id,) = json.loads(raw)
+        return int(photo_id)
+    except Exception:
+        raise ValueError("Cursor de paginación inválido")
+
+
+async def get_public_photo_page_async(
+    db: AsyncSession, order_id: int, limit: int, cursor: Optional[str] = None
+) -> List[RepairOrderPhotoModel]:
+    """Una página de fotos de la orden, de la más nueva a la más vieja, sin la imagen."""
+    stmt = (
+        select(RepairOrderPhotoModel)
+        .options(defer(RepairOrderPhotoModel.photo))
+        .where(RepairOrderPhotoModel.order_id == order_id)
+    )
+    if cursor:
+        stmt = stmt.where(RepairOrderPhotoModel.id < decode_cursor(cursor))
+    result = await db.scalars(stmt.order_by(RepairOrderPhotoModel.id.desc()).limit(limit))
+    return result.all()
+
+
+async def get_photo_data_async(db: AsyncSession, order_id: int, photo_id: int) -> Optional[str]:
+    """Imagen guardada (data URL o enlace) de una foto de la orden, o None si no existe."""
+    return await db.scalar(
+        select(RepairOrderPhotoModel.photo).where(
+            RepairOrderPhotoModel.id == photo_id,
+            RepairOrderPhotoModel.order_id == order_id,
+        )
+    )
+
+
 def get_repair_order_photo(db: Session, photo_id: int) -> Optional[RepairOrderPhotoModel]:
     """Obtener una foto específica por ID"""
     return db.query(RepairOrderPhotoModel).filter(
@@ -52,6 +114,7 @@ def update_repair_order_photo(db: Session, photo_id: int, photo_update: RepairOr
         if photo_update.drawings is not None:
             drawings_json = [drawing.dict() for drawing in photo_update.drawings]
             db_photo.drawings = drawings_json
+        public_order_cache.mark_order_changed(db, db_photo.order_id)
         db.commit()
         db.refresh(db_photo)
     return db_photo
@@ -62,6 +125,8 @@ def delete_repair_order_photo(db: Session, photo_id: int) -> bool:
     db_photo = get_repair_order_photo(db, photo_id)
     if db_photo:
         db.delete(db_photo)
+        public_order_cache.mark_order_changed(db, db_photo.order_id)
         db.commit()
+        photo_previews.forget(photo_id)
         return True
     return False
\ No newline at end of file
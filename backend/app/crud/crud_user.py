@@ -5,6 +5,8 @@ from app.models.user import User
 from app.models.roles import Role
 from app.schemas.user import UserCreate, UserCreateByAdmin, UserUpdateByAdmin
 from app.core.security import get_password_hash
+from app.core.auth_cache import invalidate_user, invalidate_token_version
+from app.core import reference_cache
 import logging
 from typing import Optional, List
 
@@ -87,8 +89,19 @@ def update(db: Session, *, db_obj: User, obj_in: UserUpdateByAdmin, admin_user:
         # Hash seguro de la nueva contraseña
         update_data['password'] = get_password_hash(update_data['password'])
 
+    # Cambios que afectan la autorización deben invalidar la caché token -> usuario
+    # y revocar los tokens emitidos (sus claims de rol/sucursal quedan desactualizados;
+    # al desactivar, get_current_claims rechaza al usuario en cuanto se invalida la caché)
+    auth_fields_changed = any(
+        field in update_data and getattr(db_obj, field) != update_data[field]
+        for field in ('is_active', 'role_id', 'branch_id')
+    )
+    revoke_tokens = auth_fields_changed or bool(update_data.get('password'))
+
     for field, value in update_data.items():
         setattr(db_obj, field, value)
+    if revoke_tokens:
+        db_obj.token_version = (db_obj.token_version or 0) + 1
 
     db.add(db_obj)
     try:
@@ -97,6 +110,21 @@ def update(db: Session, *, db_obj: User, obj_in: UserUpdateByAdmin, admin_user:
         db.rollback()
         raise
     db.refresh(db_obj)
+    if revoke_tokens:
+        invalidate_user(db_obj.username)
+        invalidate_token_version(db_obj.id)
+    return db_obj
+
+def set_password_hash(db: Session, *, db_obj: User, hashed_password: str) -> User:
+    """
+    Reemplaza el hash almacenado (ej. migración transparente de bcrypt a pbkdf2 al iniciar sesión).
+    """
+    db_obj.password = hashed_password
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     return db_obj
 
 # --- INICIO DE LA CORRECCIÓN TÉCNICA ---
@@ -111,9 +139,12 @@ def get_users_by_role_and_branch(db: Session, *, role_name: str, branch_id: int)
     """
     Busca todos los usuarios que pertenecen a un rol y una sucursal específicos.
     """
-    # Se utiliza el join a través de la relación definida en el modelo para mayor robustez.
-    return db.query(User).join(User.role).filter(
-        Role.role_name == role_name,
+    # El id del rol sale de la caché de referencia: evita el JOIN con roles
+    role_id = reference_cache.find_id(db, Role, role_name=role_name)
+    if role_id is None:
+        return []
+    return db.query(User).filter(
+        User.role_id == role_id,
         User.branch_id == branch_id
     ).all()
 
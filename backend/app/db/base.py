@@ -1,5 +1,6 @@
 # backend/app/db/base.py
 
+from app.core.config import settings
 from app.db.session import engine
 from app.models.base_class import Base
 
@@ -14,10 +15,27 @@ from app.models.device_type import DeviceType # ¡Importa el nuevo modelo!
 from app.models.notification import Notification
 from app.models.record import Record
 from app.models.type_record import TypeRecord
+from app.models.branch import Branch
+from app.models.device_condition import DeviceCondition
+from app.models.email_subscription import EmailSubscription
+from app.models.predefined_checklist_item import PredefinedChecklistItem
+from app.models.customer_duplicate import CustomerDuplicate
+from app.models.job_checkpoint import JobCheckpoint
 
 def init_db():
     """
-    Esta función está desactivada.
-    No se crearán tablas automáticamente. La aplicación asumirá que ya existen.
+    Aplica las migraciones pendientes (alembic upgrade head) si DB_AUTO_MIGRATE está activo.
+    No crea tablas con create_all: el esquema se gestiona solo con migraciones (backend/migrations).
     """
-    pass
+    if not settings.DB_AUTO_MIGRATE:
+        return
+    import os
+    from alembic import command
+    from alembic.config import Config
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    config = Config(os.path.join(backend_dir, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(backend_dir, "migrations"))
+    # Conservar la configuración de logging de la aplicación
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
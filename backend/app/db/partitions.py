@@ -0,0 +1,272 @@
+# backend/app/db/partitions.py
+
+"""
+Particionado mensual de system.record (historial de auditoría) y archivado de meses viejos.
+
+Desde la migración 0003 la tabla está particionada por rango sobre `created_at`: una
+partición por mes (`record_YYYY_MM`) más `record_default`, que recibe cualquier fila fuera
+de los meses creados para que un INSERT nunca falle. Las consultas acotadas por fecha
+solo leen las particiones de su rango (partition pruning).
+
+`ensure_record_partitions` crea por adelantado los meses siguientes; la aplicación lo
+ejecuta al arrancar y cada RECORD_PARTITION_CHECK_HOURS. Si alguna fila quedó en la
+partición por defecto (mantenimiento atrasado) se mueve a su mes al crearlo.
+
+`archive_record_partitions` desacopla los meses anteriores al corte, exporta sus filas a
+NDJSON comprimido (`record_YYYY_MM.ndjson.gz`) y elimina la tabla. Ver
+backend/scripts/manage_record_partitions.py.
+
+Todo es exclusivo de PostgreSQL; en otros motores las funciones no hacen nada.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import re
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.pool_metrics import without_statement_timeout
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = "system"
+TABLE = "record"
+DEFAULT_PARTITION = f"{TABLE}_default"
+# Clave arbitraria del advisory lock de mantenimiento de particiones
+PARTITION_LOCK_KEY = 7412032
+
+_PARTITION_NAME = re.compile(rf"^{TABLE}_(\d{{4}})_(\d{{2}})$")
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_{month.year:04d}_{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """Mes de una partición `record_YYYY_MM`, o None (partición por defecto u otro nombre)."""
+    match = _PARTITION_NAME.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def is_partitioned(conn) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    relkind = conn.execute(
+        text(
+            "SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE n.nspname = :schema AND c.relname = :table"
+        ),
+        {"schema": SCHEMA, "table": TABLE},
+    ).scalar()
+    return relkind == "p"
+
+
+def list_record_partitions(conn) -> List[dict]:
+    """Particiones adjuntas a system.record, de la más antigua a la más nueva (la por defecto al final)."""
+    rows = conn.execute(
+        text(
+            "SELECT c.relname, GREATEST(c.reltuples, 0)::bigint, pg_total_relation_size(c.oid) "
+            "FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:parent AS regclass)"
+        ),
+        {"parent": f"{SCHEMA}.{TABLE}"},
+    ).all()
+    partitions = [
+        {"name": name, "month": partition_month(name), "estimated_rows": estimated, "bytes": size}
+        for name, estimated, size in rows
+    ]
+    partitions.sort(key=lambda p: (p["month"] is None, p["month"] or date.min))
+    return partitions
+
+
+def _bounds(month: date) -> str:
+    return f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+
+
+def _create_partition(conn, month: date, has_default: bool) -> None:
+    name = partition_name(month)
+    stranded = has_default and conn.execute(
+        text(
+            f"SELECT EXISTS (SELECT 1 FROM {SCHEMA}.{DEFAULT_PARTITION} "
+            "WHERE created_at >= :lower AND created_at < :upper)"
+        ),
+        {"lower": month, "upper": add_months(month, 1)},
+    ).scalar()
+    if not stranded:
+        conn.execute(text(f"CREATE TABLE {SCHEMA}.{name} PARTITION OF {SCHEMA}.{TABLE} FOR VALUES {_bounds(month)}"))
+        return
+    # Hay filas del mes en la partición por defecto: se crea la tabla suelta, se mueven y
+    # recién entonces se adjunta (ATTACH falla si la por defecto conserva filas del rango).
+    conn.execute(text(f"CREATE TABLE {SCHEMA}.{name} (LIKE {SCHEMA}.{TABLE} INCLUDING DEFAULTS)"))
+    moved = conn.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {SCHEMA}.{DEFAULT_PARTITION} "
+            "WHERE created_at >= :lower AND created_at < :upper RETURNING *) "
+            f"INSERT INTO {SCHEMA}.{name} SELECT * FROM moved"
+        ),
+        {"lower": month, "upper": add_months(month, 1)},
+    ).rowcount
+    conn.execute(text(f"ALTER TABLE {SCHEMA}.{TABLE} ATTACH PARTITION {SCHEMA}.{name} FOR VALUES {_bounds(month)}"))
+    logger.warning(f"[DB] Partición {name}: {moved} filas movidas desde {DEFAULT_PARTITION}")
+
+
+def ensure_record_partitions(conn, months_ahead: Optional[int] = None, start: Optional[date] = None) -> List[str]:
+    """
+    Crea la partición por defecto y las mensuales que falten desde `start` (por defecto el
+    mes actual) hasta `months_ahead` meses después del actual. Debe ejecutarse dentro de
+    una transacción; un advisory lock evita que varios workers creen la misma partición.
+    Retorna los nombres creados.
+    """
+    if not is_partitioned(conn):
+        return []
+    months_ahead = settings.RECORD_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+
+    existing = {p["name"] for p in list_record_partitions(conn)}
+    created = []
+    if DEFAULT_PARTITION not in existing:
+        conn.execute(text(f"CREATE TABLE {SCHEMA}.{DEFAULT_PARTITION} PARTITION OF {SCHEMA}.{TABLE} DEFAULT"))
+        created.append(DEFAULT_PARTITION)
+
+    current = month_start(date.today())
+    month = min(month_start(start), current) if start else current
+    last = add_months(current, months_ahead)
+    while month <= last:
+        if partition_name(month) not in existing:
+            _create_partition(conn, month, has_default=True)
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def run_partition_maintenance() -> List[str]:
+    """Una pasada de `ensure_record_partitions` con el motor primario."""
+    from app.db.session import engine
+
+    if engine.dialect.name != "postgresql":
+        return []
+    with engine.begin() as conn:
+        created = ensure_record_partitions(conn)
+    if created:
+        logger.info(f"[DB] Particiones de {SCHEMA}.{TABLE} creadas: {', '.join(created)}")
+    return created
+
+
+async def partition_maintenance_loop(interval_hours: float) -> None:
+    """Tarea de fondo de la aplicación: verifica las particiones futuras periódicamente."""
+    while True:
+        try:
+            await run_in_threadpool(run_partition_maintenance)
+        except Exception as e:
+            logger.error(f"[DB] Error en el mantenimiento de particiones de {SCHEMA}.{TABLE}: {e}")
+        await asyncio.sleep(interval_hours * 3600)
+
+
+# --- Archivado ---
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def export_partition(conn, name: str, path: str) -> int:
+    """
+    Escribe las filas de la tabla `name` en `path` como NDJSON comprimido con gzip, leyendo
+    con un cursor del lado del servidor. Escribe primero a un temporal y lo renombra al
+    terminar, así un archivo con el nombre final siempre está completo. Retorna las filas.
+    """
+    tmp_path = f"{path}.tmp"
+    count = 0
+    result = conn.execution_options(stream_results=True, yield_per=1000).execute(
+        text(f"SELECT * FROM {SCHEMA}.{name} ORDER BY created_at, id")
+    )
+    try:
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as out:
+            for row in result.mappings():
+                out.write(json.dumps(dict(row), default=_json_default, ensure_ascii=False))
+                out.write("\n")
+                count += 1
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+def archivable_partitions(conn, before: date) -> List[dict]:
+    """Particiones mensuales cuyo mes termina antes de `before` (se redondea al inicio de mes)."""
+    cutoff = month_start(before)
+    return [p for p in list_record_partitions(conn) if p["month"] is not None and add_months(p["month"], 1) <= cutoff]
+
+
+def archive_record_partitions(engine, before: date, out_dir: str, drop: bool = True, dry_run: bool = False) -> List[dict]:
+    """
+    Archiva las particiones anteriores a `before`, una por una:
+      1. DETACH PARTITION (desde ese momento ninguna consulta ni escritura la ve),
+      2. exportación a `out_dir/record_YYYY_MM.ndjson.gz` y verificación del conteo,
+      3. DROP TABLE (o se conserva desacoplada con drop=False).
+    Si la exportación falla la partición se vuelve a adjuntar. Nunca sobrescribe un archivo.
+    Corre sin statement_timeout: exportar un mes y validar los límites al volver a adjuntar
+    recorren la partición completa.
+    """
+    engine = without_statement_timeout(engine)
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            raise RuntimeError(f"{SCHEMA}.{TABLE} no está particionada (aplicar la migración 0003)")
+        candidates = archivable_partitions(conn, before)
+    if dry_run:
+        return [dict(p, file=os.path.join(out_dir, f"{p['name']}.ndjson.gz"), archived=False) for p in candidates]
+
+    os.makedirs(out_dir, exist_ok=True)
+    archived = []
+    for partition in candidates:
+        name = partition["name"]
+        path = os.path.join(out_dir, f"{name}.ndjson.gz")
+        if os.path.exists(path):
+            raise FileExistsError(f"{path} ya existe; no se sobrescribe un archivo de auditoría")
+
+        with engine.begin() as conn:
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+            conn.execute(text(f"ALTER TABLE {SCHEMA}.{TABLE} DETACH PARTITION {SCHEMA}.{name}"))
+            # La tabla suelta no debe depender de la secuencia de ids de system.record
+            conn.execute(text(f"ALTER TABLE {SCHEMA}.{name} ALTER COLUMN id DROP DEFAULT"))
+        try:
+            with engine.begin() as conn:
+                rows = export_partition(conn, name, path)
+                expected = conn.execute(text(f"SELECT count(*) FROM {SCHEMA}.{name}")).scalar()
+            if rows != expected:
+                os.remove(path)
+                raise RuntimeError(f"{name}: se exportaron {rows} filas de {expected}")
+        except Exception:
+            with engine.begin() as conn:
+                conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+                conn.execute(
+                    text(f"ALTER TABLE {SCHEMA}.{TABLE} ATTACH PARTITION {SCHEMA}.{name} FOR VALUES {_bounds(partition['month'])}")
+                )
+            raise
+
+        if drop:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE {SCHEMA}.{name}"))
+        logger.info(f"[DB] Partición {name} archivada en {path} ({rows} filas)")
+        archived.append(dict(partition, file=path, rows=rows, archived=True, dropped=drop))
+    return archived
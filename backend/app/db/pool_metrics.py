@@ -0,0 +1,223 @@
+# backend/app/db/pool_metrics.py
+
+"""
+Telemetría del pool de conexiones y estrategias de configuración de los motores.
+
+Cada motor (síncrono y asíncrono) usa una subclase de QueuePool que mide cuánto espera
+cada checkout por una conexión libre y cuenta los timeouts del pool. Los eventos del pool
+registran conexiones nuevas, checkouts, checkins e invalidaciones; los errores de la BD
+cuentan los statement timeouts. Las métricas son por proceso (cada worker de Uvicorn
+tiene su propio pool), así que sirven para dimensionar pool_size por worker.
+"""
+
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+
+# Esperas de checkout por encima de este umbral se cuentan como "lentas"
+SLOW_CHECKOUT_SECONDS = 0.1
+
+
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.invalidations = 0
+            self.idle_pings = 0
+            self.pool_timeouts = 0
+            self.statement_timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.slow_checkouts = 0
+
+    def incr(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if seconds >= SLOW_CHECKOUT_SECONDS:
+                self.slow_checkouts += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            waits = self.checkouts + self.pool_timeouts
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "idle_pings": self.idle_pings,
+                "pool_timeouts": self.pool_timeouts,
+                "statement_timeouts": self.statement_timeouts,
+                "wait_avg_ms": round(self.wait_total / waits * 1000, 3) if waits else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "slow_checkouts": self.slow_checkouts,
+            }
+
+
+class _TimedPoolMixin:
+    """Mide el tiempo de espera de cada checkout y cuenta los timeouts del pool."""
+
+    metrics: PoolMetrics = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.incr("pool_timeouts")
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - started)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# Métricas por motor, expuestas en /debug/pool-stats
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+# Opción de ejecución: las transacciones de esa conexión corren sin statement_timeout
+# (migraciones, archivado de particiones)
+NO_STATEMENT_TIMEOUT = "no_statement_timeout"
+
+
+def without_statement_timeout(bind):
+    """Motor o conexión cuyas transacciones no tienen statement_timeout."""
+    return bind.execution_options(**{NO_STATEMENT_TIMEOUT: True})
+
+
+def pool_options(asyncio: bool = False) -> dict:
+    """Argumentos de create_engine/create_async_engine según la configuración del pool."""
+    return {
+        "poolclass": TimedAsyncAdaptedQueuePool if asyncio else TimedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        # 'always' delega en el pre-ping de SQLAlchemy; 'idle' se implementa en instrument_engine
+        "pool_pre_ping": settings.DB_POOL_PRE_PING == "always",
+    }
+
+
+def _is_statement_timeout(error) -> bool:
+    # SQLSTATE 57014 = query_canceled (statement_timeout)
+    code = getattr(error, "sqlstate", None) or getattr(error, "pgcode", None)
+    return code == "57014" or "statement timeout" in str(error)
+
+
+def instrument_engine(engine, name: str) -> PoolMetrics:
+    """
+    Registra las métricas del pool de `engine` bajo `name` y aplica la estrategia de
+    pre-ping 'idle' y el statement timeout configurados.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    metrics = pool_metrics.setdefault(name, PoolMetrics(name))
+    sync_engine.pool.metrics = metrics
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        metrics.incr("connects")
+        if settings.DB_STATEMENT_TIMEOUT_MS and settings.DB_STATEMENT_TIMEOUT_SCOPE == "session":
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"SET statement_timeout = {int(settings.DB_STATEMENT_TIMEOUT_MS)}")
+            cursor.close()
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.incr("checkouts")
+        if settings.DB_POOL_PRE_PING != "idle":
+            return
+        # Solo se verifica la conexión si estuvo inactiva en el pool más de lo configurado:
+        # evita el round trip extra de pool_pre_ping en cada checkout.
+        last_checkin = connection_record.info.get("last_checkin")
+        if last_checkin is None or time.monotonic() - last_checkin < settings.DB_POOL_PRE_PING_IDLE_SECONDS:
+            return
+        metrics.incr("idle_pings")
+        try:
+            alive = sync_engine.dialect.do_ping(dbapi_connection)
+        except Exception:
+            alive = False
+        if not alive:
+            # El pool descarta la conexión y reintenta el checkout con una nueva
+            raise exc.DisconnectionError("Conexión inactiva descartada por el pre-ping")
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        metrics.incr("checkins")
+        connection_record.info["last_checkin"] = time.monotonic()
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.incr("invalidations")
+
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        # SET LOCAL solo vive dentro de la transacción: compatible con el pooler de
+        # Supabase en modo transacción, donde un SET de sesión no se conserva. Con
+        # NO_STATEMENT_TIMEOUT también anula el timeout de sesión del scope "session".
+        @event.listens_for(sync_engine, "begin")
+        def _on_begin(connection):
+            if connection.get_execution_options().get(NO_STATEMENT_TIMEOUT):
+                connection.exec_driver_sql("SET LOCAL statement_timeout = 0")
+            elif settings.DB_STATEMENT_TIMEOUT_SCOPE == "transaction":
+                connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(settings.DB_STATEMENT_TIMEOUT_MS)}")
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _on_error(context):
+        if _is_statement_timeout(context.original_exception):
+            metrics.incr("statement_timeouts")
+
+    return metrics
+
+
+def pool_stats() -> Dict[str, dict]:
+    """Estado actual de cada pool instrumentado más sus contadores acumulados."""
+    from app.db import session
+
+    engines = {
+        "primary": session.engine,
+        "async": session.async_engine,
+        "replica": session.replica_engine,
+        "async_replica": session.async_replica_engine,
+    }
+    stats = {}
+    for name, metrics in pool_metrics.items():
+        engine = engines.get(name)
+        pool = getattr(getattr(engine, "sync_engine", engine), "pool", None)
+        live = {}
+        if pool is not None and hasattr(pool, "checkedout"):
+            live = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+            }
+        stats[name] = {**live, **metrics.snapshot()}
+    return stats
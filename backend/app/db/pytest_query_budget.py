@@ -0,0 +1,38 @@
+# backend/app/db/pytest_query_budget.py
+
+"""
+Plugin de pytest: presupuesto de consultas por endpoint o función de crud (app.db.query_stats).
+
+Se activa con `pytest -p app.db.pytest_query_budget` o con
+`pytest_plugins = ["app.db.pytest_query_budget"]` en un conftest.py. Expone el fixture
+`query_budget`:
+
+    def test_listado_de_ordenes(client, query_budget):
+        with query_budget(4, "GET /repair-orders"):
+            client.get("/api/v1/repair-orders/")
+        # o, con el header X-DB-Queries del middleware:
+        query_budget.response(client.get("/api/v1/repair-orders/"), 4)
+
+Si se supera el presupuesto la prueba falla con las consultas más repetidas en el mensaje.
+pytest no es dependencia de la aplicación: este módulo solo se importa desde pytest.
+"""
+
+import pytest
+
+from app.db import query_stats
+
+
+class QueryBudget:
+    def __call__(self, max_queries: int, label: str = "bloque"):
+        """Context manager: falla si el bloque ejecuta más de `max_queries` consultas."""
+        return query_stats.query_budget(max_queries, label)
+
+    @staticmethod
+    def response(response, max_queries: int) -> None:
+        """Verifica el presupuesto de una respuesta con el header X-DB-Queries."""
+        query_stats.assert_response_budget(response, max_queries)
+
+
+@pytest.fixture
+def query_budget() -> QueryBudget:
+    return QueryBudget()
@@ -0,0 +1,127 @@
+# backend/app/db/query_stats.py
+
+"""
+Contador de consultas SQL por request y detector de patrones N+1.
+
+Los eventos before/after_cursor_execute se registran sobre la clase Engine, así que cubren
+todos los motores (primario, réplica y el motor síncrono interno del motor asíncrono).
+Cada request activa un `QueryStats` en una ContextVar; las consultas ejecutadas en el
+threadpool (endpoints `def`) o vía run_sync heredan el contexto y se cuentan igual.
+
+Una "forma" de consulta es el SQL parametrizado con los espacios y las listas de
+parámetros normalizados: la misma forma repetida muchas veces en un request suele ser una
+carga perezosa dentro de un bucle (N+1).
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+# Listas de parámetros de cualquier paramstyle: (?, ?, ?), (%s, %s), ($1, $2), (%(a)s, %(b)s)
+_PARAM = r"(?:\?|%s|\$\d+|%\([^)]+\)s)"
+_PARAM_LIST = re.compile(rf"{_PARAM}(?:\s*,\s*{_PARAM})+")
+
+
+def statement_shape(statement: str) -> str:
+    return _PARAM_LIST.sub("?, ...", _WHITESPACE.sub(" ", statement).strip())
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Formas ejecutadas más de `threshold` veces, de la más repetida a la menos."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > threshold]
+
+    @property
+    def total_ms(self) -> float:
+        return round(self.total_seconds * 1000, 3)
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._query_stats_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    started = getattr(context, "_query_stats_started", None)
+    stats.record(statement, time.perf_counter() - started if started is not None else 0.0)
+
+
+@contextmanager
+def track_queries():
+    """Activa un contador de consultas para el bloque (un request, un script)."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def warn_repeated(stats: QueryStats, label: str, threshold: Optional[int] = None) -> None:
+    """Advierte en el log las formas de consulta repetidas más de `threshold` veces."""
+    threshold = settings.DB_QUERY_REPEAT_THRESHOLD if threshold is None else threshold
+    for shape, n in stats.repeated(threshold):
+        logger.warning(f"[DB] Posible N+1 en {label}: {n} ejecuciones de la misma consulta: {shape[:300]}")
+
+
+def response_headers(stats: QueryStats) -> dict:
+    return {
+        "Server-Timing": f'db;dur={stats.total_ms};desc="{stats.count} queries"',
+        "X-DB-Queries": str(stats.count),
+    }
+
+
+@contextmanager
+def query_budget(max_queries: int, label: str = "bloque"):
+    """
+    Falla con AssertionError si el bloque ejecuta más de `max_queries` consultas.
+    Pensado para scripts de verificación y pruebas sobre funciones de crud:
+
+        with query_budget(3):
+            crud_repair_order.get_repair_orders(db, user=user)
+
+    Para un endpoint completo, usar `assert_response_budget` con la respuesta. En pytest,
+    el fixture `query_budget` de app.db.pytest_query_budget envuelve ambas.
+    """
+    with track_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        detail = "; ".join(f"{n}x {shape[:120]}" for shape, n in stats.shapes.most_common(3))
+        raise AssertionError(f"{label}: {stats.count} consultas (presupuesto {max_queries}). Más repetidas: {detail}")
+
+
+def assert_response_budget(response, max_queries: int) -> None:
+    """Verifica el presupuesto de consultas de un endpoint a partir del header X-DB-Queries."""
+    count = int(response.headers["X-DB-Queries"])
+    if count > max_queries:
+        raise AssertionError(f"{response.request.method} {response.request.url.path}: {count} consultas (presupuesto {max_queries})")
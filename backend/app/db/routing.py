@@ -0,0 +1,140 @@
+# backend/app/db/routing.py
+
+"""
+Enrutamiento de lecturas a una réplica de solo lectura.
+
+`RoutingSession` decide el motor de cada sentencia en `get_bind`:
+  - Las sesiones marcadas con info["prefer_replica"] (requests GET, tareas en segundo
+    plano) leen de la réplica mientras no hayan escrito nada.
+  - Todo flush, INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE o SQL textual va al primario,
+    y desde ese momento la sesión queda fijada al primario (read-your-writes: por ejemplo
+    el `db.refresh` posterior a un commit).
+  - La réplica solo se usa si su retraso medido no supera DB_REPLICA_MAX_LAG_SECONDS y si
+    la última escritura de este proceso es más antigua que ese retraso; así una recarga
+    inmediatamente posterior a un commit (BackgroundTasks) lee del primario.
+
+Sin réplica configurada la sesión se comporta exactamente como una Session normal.
+"""
+
+import logging
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+
+logger = logging.getLogger(__name__)
+
+# Consulta de retraso en un standby de PostgreSQL. Si todo lo recibido ya se aplicó el
+# retraso es 0 (evita falsos positivos cuando el primario está inactivo).
+_PG_REPLICA_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+class ReplicaLagMonitor:
+    """Mide periódicamente el retraso de la réplica en un hilo en segundo plano."""
+
+    def __init__(self, engine, interval: float):
+        self.engine = engine
+        self.interval = interval
+        # None = no medido (motores que no son PostgreSQL); inf = réplica inaccesible
+        self.lag: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None or self.engine.dialect.name != "postgresql":
+            return
+        self._thread = threading.Thread(target=self._run, name="replica-lag-monitor", daemon=True)
+        self._thread.start()
+
+    def check(self) -> Optional[float]:
+        try:
+            with self.engine.connect() as conn:
+                self.lag = float(conn.execute(_PG_REPLICA_LAG_SQL).scalar() or 0.0)
+        except Exception as e:
+            logger.warning(f"[DB] No se pudo medir el retraso de la réplica: {e}")
+            self.lag = float("inf")
+        return self.lag
+
+    def _run(self) -> None:
+        while True:
+            self.check()
+            time.sleep(self.interval)
+
+
+class ReplicaRouter:
+    """Estado compartido por todas las sesiones del proceso."""
+
+    def __init__(self, max_lag_seconds: float, monitor: Optional[ReplicaLagMonitor] = None):
+        self.max_lag_seconds = max_lag_seconds
+        self.monitor = monitor
+        self._last_write_at = float("-inf")
+        self.replica_reads = 0
+        self.primary_fallback_reads = 0
+
+    def note_write(self) -> None:
+        self._last_write_at = time.monotonic()
+
+    def replica_ready(self) -> bool:
+        lag = self.monitor.lag if self.monitor is not None else None
+        if lag is not None and lag > self.max_lag_seconds:
+            return False
+        # Sin medición se asume el peor caso tolerado
+        effective_lag = lag if lag is not None else self.max_lag_seconds
+        return time.monotonic() - self._last_write_at >= effective_lag
+
+    def stats(self) -> dict:
+        return {
+            "max_lag_seconds": self.max_lag_seconds,
+            "measured_lag_seconds": self.monitor.lag if self.monitor is not None else None,
+            "replica_reads": self.replica_reads,
+            "primary_fallback_reads": self.primary_fallback_reads,
+        }
+
+
+def _is_write(clause) -> bool:
+    if clause is None:
+        return False
+    if getattr(clause, "is_dml", False) or isinstance(clause, TextClause):
+        return True
+    return getattr(clause, "_for_update_arg", None) is not None
+
+
+class RoutingSession(Session):
+    def __init__(self, *args, replica_bind=None, router: Optional[ReplicaRouter] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica_bind = replica_bind
+        self.router = router
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or _is_write(clause):
+            self.info["wrote"] = True
+        if self.replica_bind is None or not self.info.get("prefer_replica") or self.info.get("wrote"):
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+        if self.router is None or self.router.replica_ready():
+            if self.router is not None:
+                self.router.replica_reads += 1
+            return self.replica_bind
+        # Réplica atrasada o escritura reciente: se lee del primario
+        self.router.primary_fallback_reads += 1
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_session_wrote(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _note_committed_write(session):
+    if session.info.get("wrote") and session.router is not None:
+        session.router.note_write()
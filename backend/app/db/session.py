@@ -1,61 +1,184 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.engine import URL
+from starlette.concurrency import run_in_threadpool
+from uuid import uuid4
 from app.core.config import settings
+from app.db.pool_metrics import instrument_engine, pool_options
+from app.db.routing import ReplicaLagMonitor, ReplicaRouter, RoutingSession
 
 print(f"[DB] Using driver: {settings.DB_DRIVER}, url: {settings.DATABASE_URL}")
 
+
+def _build_ssl_context(mode: str):
+    """SSLContext equivalente a los modos de libpq (require / verify-ca / verify-full)."""
+    import ssl
+    ssl_context = ssl.create_default_context()
+    # Mapeo de modos de SSL a configuración de SSLContext
+    if mode == "require":
+        # Cifrado requerido pero sin verificación de certificado (equivalente a libpq 'require')
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+    elif mode == "verify-ca":
+        # Verifica contra CA pero no hostname
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_REQUIRED
+        if getattr(settings, "DB_SSLROOTCERT", None):
+            try:
+                ssl_context.load_verify_locations(cafile=settings.DB_SSLROOTCERT)
+                print(f"[DB][SSL] CA cargada: {settings.DB_SSLROOTCERT}")
+            except Exception as e:
+                print(f"[DB][SSL] No se pudo cargar CA {settings.DB_SSLROOTCERT}: {e}")
+    elif mode == "verify-full":
+        # Verifica CA y hostname
+        ssl_context.check_hostname = True
+        ssl_context.verify_mode = ssl.CERT_REQUIRED
+        if getattr(settings, "DB_SSLROOTCERT", None):
+            try:
+                ssl_context.load_verify_locations(cafile=settings.DB_SSLROOTCERT)
+                print(f"[DB][SSL] CA cargada: {settings.DB_SSLROOTCERT}")
+            except Exception as e:
+                print(f"[DB][SSL] No se pudo cargar CA {settings.DB_SSLROOTCERT}: {e}")
+    return ssl_context
+
+
 # Configuración de SSL para pg8000 según DB_SSLMODE
 connect_args = {}
 try:
     if settings.DB_DRIVER == "pg8000":
-        import ssl
-        ssl_context = ssl.create_default_context()
         mode = (settings.DB_SSLMODE or "require").lower()
         print(f"[DB] SSL mode: {mode}")
-        # Mapeo de modos de SSL a configuración de SSLContext
-        if mode == "require":
-            # Cifrado requerido pero sin verificación de certificado (equivalente a libpq 'require')
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
-        elif mode == "verify-ca":
-            # Verifica contra CA pero no hostname
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_REQUIRED
-            if getattr(settings, "DB_SSLROOTCERT", None):
-                try:
-                    ssl_context.load_verify_locations(cafile=settings.DB_SSLROOTCERT)
-                    print(f"[DB][SSL] CA cargada: {settings.DB_SSLROOTCERT}")
-                except Exception as e:
-                    print(f"[DB][SSL] No se pudo cargar CA {settings.DB_SSLROOTCERT}: {e}")
-        elif mode == "verify-full":
-            # Verifica CA y hostname
-            ssl_context.check_hostname = True
-            ssl_context.verify_mode = ssl.CERT_REQUIRED
-            if getattr(settings, "DB_SSLROOTCERT", None):
-                try:
-                    ssl_context.load_verify_locations(cafile=settings.DB_SSLROOTCERT)
-                    print(f"[DB][SSL] CA cargada: {settings.DB_SSLROOTCERT}")
-                except Exception as e:
-                    print(f"[DB][SSL] No se pudo cargar CA {settings.DB_SSLROOTCERT}: {e}")
         # Asignamos el contexto SSL al conector pg8000
-        connect_args = {"ssl_context": ssl_context}
+        connect_args = {"ssl_context": _build_ssl_context(mode)}
 except Exception as e:
     print(f"[DB] Error configurando SSL: {e}")
     connect_args = {}
 
-if settings.DB_DRIVER == "pg8000":
-    # Construimos la URL sin parámetros de query para evitar 'sslmode'
+def _create_sync_engine(host: str, port: str):
+    if settings.DB_DRIVER == "pg8000":
+        # Construimos la URL sin parámetros de query para evitar 'sslmode'
+        url = URL.create(
+            drivername="postgresql+pg8000",
+            username=settings.DB_USER,
+            password=settings.DB_PASSWORD,
+            host=host,
+            port=int(port) if port else None,
+            database=settings.DB_NAME,
+        )
+        return create_engine(url, connect_args=connect_args, **pool_options())
+    if host == settings.DB_HOST and port == settings.DB_PORT:
+        return create_engine(settings.DATABASE_URL, **pool_options())
     url = URL.create(
-        drivername="postgresql+pg8000",
+        drivername=f"postgresql+{settings.DB_DRIVER}",
+        username=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        host=host,
+        port=int(port) if port else None,
+        database=settings.DB_NAME,
+        query={"sslmode": settings.DB_SSLMODE},
+    )
+    return create_engine(url, **pool_options())
+
+
+def _create_async_engine(host: str, port: str):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_url = URL.create(
+        drivername=f"postgresql+{settings.DB_ASYNC_DRIVER}",
         username=settings.DB_USER,
         password=settings.DB_PASSWORD,
-        host=settings.DB_HOST,
-        port=int(settings.DB_PORT) if settings.DB_PORT else None,
+        host=host,
+        port=int(port) if port else None,
         database=settings.DB_NAME,
     )
-    engine = create_engine(url, pool_pre_ping=True, connect_args=connect_args)
-else:
-    engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+    async_connect_args = {}
+    if settings.DB_ASYNC_DRIVER == "asyncpg":
+        # El pooler de Supabase (pgbouncer en modo transacción) no admite sentencias preparadas
+        # reutilizables entre transacciones: se desactiva la caché y se usan nombres únicos.
+        async_url = async_url.update_query_dict({"prepared_statement_cache_size": "0"})
+        async_connect_args = {
+            "statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+        mode = (settings.DB_SSLMODE or "require").lower()
+        if mode != "disable":
+            async_connect_args["ssl"] = _build_ssl_context(mode)
+    else:
+        async_url = async_url.update_query_dict({"sslmode": settings.DB_SSLMODE})
+    return create_async_engine(async_url, connect_args=async_connect_args, **pool_options(asyncio=True))
+
+
+engine = _create_sync_engine(settings.DB_HOST, settings.DB_PORT)
+instrument_engine(engine, "primary")
+
+# --- Réplica de lectura (opcional) ---
+# Con DB_REPLICA_HOST las sesiones de requests GET y de tareas en segundo plano leen de la
+# réplica; las escrituras y las lecturas posteriores a una escritura van al primario.
+replica_engine = None
+replica_router = None
+if settings.DB_REPLICA_HOST:
+    replica_engine = _create_sync_engine(settings.DB_REPLICA_HOST, settings.DB_REPLICA_PORT)
+    instrument_engine(replica_engine, "replica")
+    replica_monitor = ReplicaLagMonitor(replica_engine, interval=settings.DB_REPLICA_LAG_CHECK_SECONDS)
+    replica_monitor.start()
+    replica_router = ReplicaRouter(settings.DB_REPLICA_MAX_LAG_SECONDS, monitor=replica_monitor)
+    print(f"[DB] Read replica: {settings.DB_REPLICA_HOST}:{settings.DB_REPLICA_PORT}")
+
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    replica_bind=replica_engine,
+    router=replica_router,
+)
+
+
+# --- Motor asíncrono ---
+# Usado por los endpoints calientes (órdenes, notificaciones, portal de clientes) y por los
+# helpers de notificación WebSocket, que así no bloquean el event loop esperando a la BD.
+async_engine = None
+async_replica_engine = None
+AsyncSessionLocal = None
+try:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = _create_async_engine(settings.DB_HOST, settings.DB_PORT)
+    instrument_engine(async_engine, "async")
+    if settings.DB_REPLICA_HOST:
+        async_replica_engine = _create_async_engine(settings.DB_REPLICA_HOST, settings.DB_REPLICA_PORT)
+        instrument_engine(async_replica_engine, "async_replica")
+    # expire_on_commit=False: los objetos siguen siendo serializables tras el commit sin
+    # disparar cargas perezosas (que no están permitidas en contexto asíncrono).
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+        sync_session_class=RoutingSession,
+        replica_bind=async_replica_engine.sync_engine if async_replica_engine is not None else None,
+        router=replica_router,
+    )
+    print(f"[DB] Async driver: {settings.DB_ASYNC_DRIVER}")
+except Exception as e:
+    print(f"[DB] Motor asíncrono no disponible ({e}); se usará el motor síncrono en el threadpool.")
+
+# Sesiones que pueden leer de la réplica (ver app.db.routing)
+REPLICA_READS = {"prefer_replica": True}
+
+
+async def run_db(fn, *args, **kwargs):
+    """
+    Ejecuta `fn(db, *args, **kwargs)` (código ORM síncrono) sin bloquear el event loop.
+
+    Con el motor asíncrono disponible se ejecuta vía `AsyncSession.run_sync`; si no,
+    se usa una sesión síncrona en el threadpool. La sesión puede leer de la réplica.
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal(info=REPLICA_READS) as db:
+            return await db.run_sync(lambda session: fn(session, *args, **kwargs))
+
+    def _call():
+        with SessionLocal(expire_on_commit=False, info=REPLICA_READS) as db:
+            return fn(db, *args, **kwargs)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+    return await run_in_threadpool(_call)
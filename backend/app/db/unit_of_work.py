@@ -0,0 +1,40 @@
+# backend/app/db/unit_of_work.py
+
+"""
+Unidad de trabajo: una mutación completa (orden, checklist, registro de auditoría,
+cliente nuevo...) se confirma con un único commit.
+
+Dentro del bloque las funciones de crud solo agregan objetos a la sesión o hacen `flush`
+cuando necesitan un id generado; al salir se hace un solo commit, o un rollback si algo
+falló, de modo que nunca queda un estado parcial (orden sin registro, checklist a medias).
+Los bloques anidados se integran en el más externo, que es el único que confirma. Las
+funciones de crud que también se usan fuera de un bloque (alta de cliente, notificaciones)
+consultan `in_unit_of_work` para no confirmar a mitad de una mutación.
+"""
+
+from contextlib import contextmanager
+
+from sqlalchemy.orm import Session
+
+_DEPTH_KEY = "unit_of_work_depth"
+
+
+def in_unit_of_work(db: Session) -> bool:
+    """True dentro de un bloque: las funciones de crud que confirman por su cuenta solo hacen flush."""
+    return db.info.get(_DEPTH_KEY, 0) > 0
+
+
+@contextmanager
+def unit_of_work(db: Session):
+    depth = db.info.get(_DEPTH_KEY, 0)
+    db.info[_DEPTH_KEY] = depth + 1
+    try:
+        yield db
+        if depth == 0:
+            db.commit()
+    except Exception:
+        if depth == 0:
+            db.rollback()
+        raise
+    finally:
+        db.info[_DEPTH_KEY] = depth
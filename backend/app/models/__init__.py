@@ -12,3 +12,5 @@ from .status_order import StatusOrder
 from .device_condition import DeviceCondition
 from .predefined_checklist_item import PredefinedChecklistItem
 from .email_subscription import EmailSubscription
+from .customer_duplicate import CustomerDuplicate
+from .job_checkpoint import JobCheckpoint
@@ -1,11 +1,20 @@
-from sqlalchemy import Column, Integer, String, DateTime, func, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, func, Boolean, Index
 from sqlalchemy.orm import relationship
 from .base_class import Base
 
 class Customer(Base):
     __tablename__ = "customer"
     # --- CAMBIO DE SCHEMA ---
-    __table_args__ = {'schema': 'customer'}
+    __table_args__ = (
+        # Listado paginado por clave (last_name, id), ver crud_customer.get_customers
+        Index("ix_customer_last_name_id", "last_name", "id"),
+        # Autocompletado por prefijo (LIKE 'texto%'), ver app/services/customer_autocomplete.py
+        Index("ix_customer_dni_digits", "dni_digits", postgresql_ops={"dni_digits": "text_pattern_ops"}),
+        Index("ix_customer_phone_digits", "phone_digits", postgresql_ops={"phone_digits": "text_pattern_ops"}),
+        Index("ix_customer_name_key", "name_key", postgresql_ops={"name_key": "text_pattern_ops"}),
+        Index("ix_customer_name_key_rev", "name_key_rev", postgresql_ops={"name_key_rev": "text_pattern_ops"}),
+        {'schema': 'customer'},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String, nullable=False)
@@ -17,6 +26,11 @@ class Customer(Base):
     is_subscribed = Column(Boolean, default=False)
     dni = Column(String, unique=True, index=True)
     created_at = Column(DateTime, server_default=func.now())
+    # Claves normalizadas para el autocompletado; se recalculan en cada INSERT/UPDATE
+    dni_digits = Column(String, nullable=True)
+    phone_digits = Column(String, nullable=True)
+    name_key = Column(String, nullable=True)
+    name_key_rev = Column(String, nullable=True)
 
     # Relación: Un cliente puede tener muchas órdenes de reparación
     repair_orders = relationship("RepairOrder", back_populates="customer")
\ No newline at end of file
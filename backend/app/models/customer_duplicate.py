@@ -0,0 +1,30 @@
+# backend/app/models/customer_duplicate.py
+
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, func, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from .base_class import Base
+
+class CustomerDuplicate(Base):
+    """Par de clientes que probablemente son la misma persona (ver customer_duplicates)."""
+    __tablename__ = "customer_duplicate"
+    __table_args__ = (
+        UniqueConstraint("customer_id", "duplicate_id", name="uq_customer_duplicate_pair"),
+        Index("ix_customer_duplicate_status_score", "status", "score"),
+        {'schema': 'customer'},
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    # customer_id es siempre el cliente más antiguo (id menor) del par
+    customer_id = Column(Integer, ForeignKey("customer.customer.id", ondelete="CASCADE"), nullable=False, index=True)
+    duplicate_id = Column(Integer, ForeignKey("customer.customer.id", ondelete="CASCADE"), nullable=False, index=True)
+    score = Column(Float, nullable=False)
+    # Señales que coincidieron, separadas por coma (p. ej. "phone,name:0.82")
+    reasons = Column(String, nullable=False)
+    # pending | dismissed
+    status = Column(String, nullable=False, default="pending")
+    created_at = Column(DateTime, server_default=func.now())
+    resolved_at = Column(DateTime, nullable=True)
+    resolved_by = Column(Integer, ForeignKey("system.user.id", ondelete="SET NULL"), nullable=True)
+
+    customer = relationship("Customer", foreign_keys=[customer_id])
+    duplicate = relationship("Customer", foreign_keys=[duplicate_id])
@@ -1,12 +1,15 @@
 # backend/app/models/email_subscription.py
 
-from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from .base_class import Base
 
 class EmailSubscription(Base):
     __tablename__ = "email_subscription"
-    __table_args__ = {'schema': 'customer'}
+    __table_args__ = (
+        Index("ix_email_subscription_order_email", "order_id", "email"),
+        {'schema': 'customer'},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey("customer.repair_order.id"), nullable=False, index=True)
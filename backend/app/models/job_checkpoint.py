@@ -0,0 +1,13 @@
+# backend/app/models/job_checkpoint.py
+
+from sqlalchemy import Column, Integer, String, DateTime, func
+from .base_class import Base
+
+class JobCheckpoint(Base):
+    """Último id procesado por un proceso por lotes incremental (uno por nombre de job)."""
+    __tablename__ = "job_checkpoint"
+    __table_args__ = {'schema': 'system'}
+
+    name = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
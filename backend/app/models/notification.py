@@ -1,12 +1,15 @@
 #backend/app/models/notification.py
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, func, Index
 from sqlalchemy.orm import relationship
 from .base_class import Base
 
 class Notification(Base):
     __tablename__ = "notifications"
-    __table_args__ = {'schema': 'system'}
+    __table_args__ = (
+        Index("ix_notifications_user_created", "user_id", "created_at"),
+        {'schema': 'system'},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     message = Column(String, nullable=False)
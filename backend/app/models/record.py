@@ -1,13 +1,21 @@
-from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Text, Index, Sequence
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from .base_class import Base
 
 class Record(Base):
     __tablename__ = "record"
-    __table_args__ = {'schema': 'system'}
+    __table_args__ = (
+        Index("ix_record_order_created", "order_id", "created_at"),
+        Index("ix_record_created_id", "created_at", "id"),
+        Index("ix_record_origin_branch_created", "origin_branch_id", "created_at"),
+        Index("ix_record_target_branch_created", "target_branch_id", "created_at"),
+        {'schema': 'system'},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    # Clave primaria (id, created_at), como la de la tabla particionada (migración 0003);
+    # los ids salen de la secuencia system.record_id_seq
+    id = Column(Integer, Sequence("record_id_seq", schema="system"), primary_key=True, index=True)
     id_even_type = Column(Integer, ForeignKey("system.type_record.id", ondelete="RESTRICT"), nullable=False, index=True)
     order_id = Column(Integer, ForeignKey("customer.repair_order.id", ondelete="CASCADE"), nullable=False, index=True)
     actor_user_id = Column(Integer, ForeignKey("system.user.id", ondelete="SET NULL"), nullable=True, index=True)
@@ -17,7 +25,8 @@ class Record(Base):
     new_status_id = Column(Integer, ForeignKey("customer.status_order.id", ondelete="SET NULL"), nullable=True)
     description = Column(Text, nullable=True)
     meta = Column("metadata", JSONB, default=lambda: {})
-    created_at = Column(DateTime, server_default=func.now())
+    # Clave de partición de la tabla (migración 0003): parte de la clave primaria
+    created_at = Column(DateTime, primary_key=True, server_default=func.now(), nullable=False)
 
     order = relationship("RepairOrder", back_populates="records")
     type_record = relationship("TypeRecord", back_populates="records")
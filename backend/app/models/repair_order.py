@@ -1,13 +1,19 @@
 # backend/app/models/repair_order.py
 
-from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 from .base_class import Base
 
 
 class RepairOrder(Base):
     __tablename__ = "repair_order"
-    __table_args__ = {'schema': 'customer'}
+    __table_args__ = (
+        # Índices de los filtros calientes (migración 0001)
+        Index("ix_repair_order_branch_created", "branch_id", "created_at"),
+        Index("ix_repair_order_status_id", "status_id"),
+        Index("ix_repair_order_customer_created", "customer_id", "created_at"),
+        {'schema': 'customer'},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     # ... (resto de las columnas existentes sin cambios)
@@ -1,6 +1,6 @@
 # backend/app/models/repair_order_photo.py
 
-from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Text, Index
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from .base_class import Base
@@ -8,7 +8,11 @@ from .base_class import Base
 
 class RepairOrderPhoto(Base):
     __tablename__ = "repair_order_photo"
-    __table_args__ = {'schema': 'customer'}
+    __table_args__ = (
+        # Fotos de una orden paginadas por id (portal de clientes)
+        Index("ix_repair_order_photo_order_id_id", "order_id", "id"),
+        {'schema': 'customer'},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey("customer.repair_order.id", ondelete="CASCADE"), nullable=False)
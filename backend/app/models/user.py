@@ -16,6 +16,8 @@ class User(Base):
     phone_number = Column(String(30), nullable=True)
     created_at = Column(DateTime, server_default=func.now())
     is_active = Column(Boolean, default=True) # <-- AÑADIMOS LA COLUMNA IS_ACTIVE
+    # Se incrementa al cambiar estado, rol, sucursal o contraseña: invalida los tokens emitidos antes
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
 
     role_id = Column(Integer, ForeignKey("system.roles.id"))
     branch_id = Column(Integer, ForeignKey("system.branch.id"))
@@ -2,6 +2,7 @@
 
 from pydantic import BaseModel
 from typing import Optional
+from datetime import datetime
 
 class CustomerCreate(BaseModel):
     first_name: str
@@ -40,3 +41,24 @@ class CustomerPublic(BaseModel):
 
     class Config:
         from_attributes = True
+
+class CustomerDuplicateCandidate(BaseModel):
+    id: int
+    score: float
+    reasons: str
+    status: str
+    created_at: Optional[datetime] = None
+    # customer es el cliente más antiguo del par
+    customer: Customer
+    duplicate: Customer
+
+    class Config:
+        from_attributes = True
+
+class CustomerMerge(BaseModel):
+    # Cliente que se fusiona en el del path y luego se elimina
+    duplicate_id: int
+
+class CustomerMergeResult(BaseModel):
+    customer: Customer
+    moved_orders: int
@@ -0,0 +1,18 @@
+# backend/app/schemas/qr.py
+
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+
+class QrBatchRequest(BaseModel):
+    order_ids: List[int] = Field(..., min_length=1)
+    size: int = Field(120, ge=64, le=512)
+    format: Literal["png", "svg"] = "png"
+    # Base del enlace al portal (por defecto CLIENT_PORTAL_BASE_URL); se le agrega /{order_id}
+    base_url: Optional[str] = None
+
+
+class QrBatchItem(BaseModel):
+    order_id: int
+    data: str  # Texto codificado en el QR (enlace al portal)
+    image: str  # Data URL lista para usar como src de una <img>
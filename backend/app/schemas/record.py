@@ -26,5 +26,6 @@ class RecordFilter(BaseModel):
     order_id: Optional[int] = None
     from_date: Optional[datetime] = None
     to_date: Optional[datetime] = None
+    cursor: Optional[str] = None
     skip: int = 0
     limit: int = 100
@@ -9,7 +9,7 @@ from .user import User
 from .status_order import StatusOrder
 from .device_type import DeviceType
 from .device_condition import DeviceCondition, DeviceConditionCreate, DeviceConditionUpdate
-from .repair_order_photo import RepairOrderPhoto
+from .repair_order_photo import RepairOrderPhoto, RepairOrderPhotoPublic
 from .branch import Branch, BranchPublic # <-- IMPORTAMOS EL NUEVO ESQUEMA
 
 
@@ -99,10 +99,14 @@ class RepairOrderPublic(BaseModel):
     parts_used: Optional[str] = None
     technician_diagnosis: Optional[str] = None
     repair_notes: Optional[str] = None
-    photos: List[RepairOrderPhoto] = []
+    # Solo metadatos: las imágenes se piden por thumbnail_url / preview_url
+    photos: List[RepairOrderPhotoPublic] = []
     estimated_completion_date: Optional[datetime] = None
     delivery_date: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+    # Token para /client-orders/{id}/events (eventos en vivo); solo en la búsqueda por DNI
+    # o con el token del enlace del ticket
+    stream_token: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -1,6 +1,6 @@
 # backend/app/schemas/repair_order_photo.py
 
-from pydantic import BaseModel
+from pydantic import BaseModel, computed_field
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 
@@ -42,4 +42,27 @@ class RepairOrderPhoto(RepairOrderPhotoBase):
     created_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class RepairOrderPhotoPublic(BaseModel):
+    """Metadatos de una foto para el portal de clientes: sin la imagen, con sus URLs."""
+    id: int
+    order_id: int
+    note: Optional[str] = None
+    markers: Optional[List[MarkerData]] = []
+    drawings: Optional[List[DrawingData]] = []
+    created_at: Optional[datetime] = None
+
+    @computed_field
+    @property
+    def thumbnail_url(self) -> str:
+        return f"/api/v1/client-orders/{self.order_id}/photos/{self.id}/thumbnail"
+
+    @computed_field
+    @property
+    def preview_url(self) -> str:
+        return f"/api/v1/client-orders/{self.order_id}/photos/{self.id}/preview"
+
+    class Config:
+        from_attributes = True
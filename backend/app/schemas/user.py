@@ -49,6 +49,11 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+    user_id: Optional[int] = None
+    role: Optional[str] = None
+    branch_id: Optional[int] = None
+    permissions: int = 0
+    token_version: Optional[int] = None
 
 # Schemas para la gestión de usuarios por un administrador
 class UserCreateByAdmin(BaseModel):
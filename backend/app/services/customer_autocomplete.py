@@ -0,0 +1,238 @@
+# backend/app/services/customer_autocomplete.py
+
+"""
+Autocompletado de clientes para la recepción (DNI, teléfono o apellido/nombre).
+
+En lugar de cuatro `ILIKE '%texto%'` (que no pueden usar índices) cada cliente guarda
+claves normalizadas, indexadas para búsquedas por prefijo (`LIKE 'texto%'`, operador
+`text_pattern_ops` en PostgreSQL, migración 0004):
+  - dni_digits / phone_digits: solo los dígitos ("20.345.678" -> "20345678");
+  - name_key / name_key_rev: "apellido nombre" y "nombre apellido" en minúsculas, sin
+    acentos ni signos ("Muñoz, José" -> "munoz jose"), así "gar", "garcia ju" y
+    "juan gar" encuentran a Juan García.
+Las claves se calculan en Python antes de cada INSERT/UPDATE del modelo, de modo que la
+aplicación y la base normalizan exactamente igual (y no hace falta la extensión unaccent).
+
+Los resultados se ordenan por relevancia: DNI exacto, prefijo de DNI, prefijo de
+teléfono, apellido y por último nombre. Los prefijos consultados hace poco quedan en una
+caché LRU del proceso; si un prefijo más corto ya trajo todas sus coincidencias (hasta
+CUSTOMER_AUTOCOMPLETE_PREFETCH), las del prefijo nuevo se filtran de ahí sin ir a la base. La caché se
+invalida en todos los workers cuando se confirma un alta o modificación de cliente.
+"""
+
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, event, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache, invalidation_bus
+from app.core.config import settings
+from app.models.customer import Customer
+
+AUTOCOMPLETE_NAMESPACE = "customer_autocomplete"
+# Marca en session.info: hubo altas/modificaciones de clientes pendientes de commit
+_DIRTY_KEY = "customer_autocomplete_dirty"
+# Dígitos mínimos para buscar por DNI/teléfono
+MIN_DIGITS = 3
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_NON_DIGIT = re.compile(r"\D+")
+
+# Columnas que se leen (y se cachean) por cliente; las de PUBLIC_FIELDS son la respuesta
+RESULT_COLUMNS = (
+    Customer.id,
+    Customer.first_name,
+    Customer.last_name,
+    Customer.dni,
+    Customer.phone_number,
+    Customer.email,
+    Customer.is_subscribed,
+    Customer.dni_digits,
+    Customer.phone_digits,
+    Customer.name_key,
+    Customer.name_key_rev,
+)
+PUBLIC_FIELDS = ("id", "first_name", "last_name", "dni", "phone_number", "email", "is_subscribed")
+
+
+def fold_text(value: Optional[str]) -> str:
+    """Minúsculas, sin acentos y con cualquier signo reducido a un espacio."""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", stripped.lower()).strip()
+
+
+def digits_only(value: Optional[str]) -> str:
+    return _NON_DIGIT.sub("", value or "")
+
+
+def search_keys(first_name: Optional[str], last_name: Optional[str], dni: Optional[str], phone_number: Optional[str]) -> Dict[str, Optional[str]]:
+    """Claves de búsqueda de un cliente (las columnas *_digits y name_key*)."""
+    first, last = fold_text(first_name), fold_text(last_name)
+    return {
+        "dni_digits": digits_only(dni) or None,
+        "phone_digits": digits_only(phone_number) or None,
+        "name_key": f"{last} {first}".strip() or None,
+        "name_key_rev": f"{first} {last}".strip() or None,
+    }
+
+
+def _refresh_keys(mapper, connection, target: Customer) -> None:
+    for key, value in search_keys(target.first_name, target.last_name, target.dni, target.phone_number).items():
+        setattr(target, key, value)
+
+
+event.listen(Customer, "before_insert", _refresh_keys)
+event.listen(Customer, "before_update", _refresh_keys)
+
+
+# --- Caché de prefijos ---
+
+# consulta normalizada -> (filas, completa); `completa` = trajo todas las coincidencias
+prefix_cache = TTLCache(
+    maxsize=settings.CUSTOMER_AUTOCOMPLETE_CACHE_SIZE,
+    ttl=settings.CUSTOMER_AUTOCOMPLETE_CACHE_TTL_SECONDS,
+)
+
+
+# Aumenta con cada invalidación: una consulta que empezó antes no guarda su resultado
+_generation = 0
+
+
+def _apply_invalidation(key) -> None:
+    global _generation
+    _generation += 1
+    prefix_cache.clear()
+
+
+invalidation_bus.register(AUTOCOMPLETE_NAMESPACE, _apply_invalidation)
+
+
+def invalidate() -> None:
+    """Descarta los prefijos cacheados en todos los workers."""
+    invalidation_bus.publish(AUTOCOMPLETE_NAMESPACE)
+
+
+def mark_customers_changed(db: Session) -> None:
+    """Invalida la caché cuando la sesión confirme (no antes: la fila aún no es visible)."""
+    db.info[_DIRTY_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session) -> None:
+    if session.info.pop(_DIRTY_KEY, False):
+        invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session) -> None:
+    session.info.pop(_DIRTY_KEY, None)
+
+
+# --- Búsqueda ---
+
+def normalize_query(query: str) -> Optional[Tuple[str, str]]:
+    """
+    ("digits", dígitos) si la consulta no tiene letras y alcanza MIN_DIGITS,
+    ("name", texto normalizado) si tiene letras, o None si no hay nada que buscar.
+    """
+    folded = fold_text(query)
+    if re.search(r"[a-z]", folded):
+        return "name", folded
+    digits = digits_only(query)
+    if len(digits) >= MIN_DIGITS:
+        return "digits", digits
+    return None
+
+
+def _rank(row: dict, mode: str, term: str) -> Tuple:
+    # Mismo criterio que el ORDER BY de `_query_rows`
+    if mode == "digits":
+        if row["dni_digits"] == term:
+            rank = 0
+        elif (row["dni_digits"] or "").startswith(term):
+            rank = 1
+        else:
+            rank = 2
+    else:
+        rank = 3 if (row["name_key"] or "").startswith(term) else 4
+    return rank, row["name_key"] or "", row["id"]
+
+
+def _matches(row: dict, mode: str, term: str) -> bool:
+    if mode == "digits":
+        return (row["dni_digits"] or "").startswith(term) or (row["phone_digits"] or "").startswith(term)
+    return (row["name_key"] or "").startswith(term) or (row["name_key_rev"] or "").startswith(term)
+
+
+def _query_rows(db: Session, mode: str, term: str, limit: int) -> List[dict]:
+    # `term` sale de fold_text/digits_only: solo [a-z0-9 ], sin comodines que escapar
+    pattern = f"{term}%"
+    if mode == "digits":
+        condition = or_(
+            Customer.dni_digits.like(pattern),
+            Customer.phone_digits.like(pattern),
+        )
+        rank = case(
+            (Customer.dni_digits == term, 0),
+            (Customer.dni_digits.like(pattern), 1),
+            else_=2,
+        )
+    else:
+        condition = or_(
+            Customer.name_key.like(pattern),
+            Customer.name_key_rev.like(pattern),
+        )
+        rank = case((Customer.name_key.like(pattern), 3), else_=4)
+    stmt = (
+        select(*RESULT_COLUMNS)
+        .where(condition)
+        .order_by(rank, Customer.name_key, Customer.id)
+        .limit(limit)
+    )
+    return [dict(row) for row in db.execute(stmt).mappings()]
+
+
+def _from_shorter_prefix(mode: str, term: str) -> Optional[List[dict]]:
+    """Coincidencias de `term` filtradas de un prefijo más corto ya cacheado y completo."""
+    for length in range(len(term) - 1, 0, -1):
+        cached = prefix_cache.get((mode, term[:length]))
+        if cached is not None and cached[1]:
+            rows = [row for row in cached[0] if _matches(row, mode, term)]
+            rows.sort(key=lambda row: _rank(row, mode, term))
+            return rows
+    return None
+
+
+def autocomplete(db: Session, query: str, limit: Optional[int] = None) -> List[dict]:
+    """
+    Clientes cuyo DNI, teléfono o nombre empiezan con `query`, ordenados por relevancia.
+    Retorna dicts con los campos del esquema Customer.
+    """
+    limit = limit or settings.CUSTOMER_AUTOCOMPLETE_LIMIT
+    normalized = normalize_query(query)
+    if normalized is None:
+        return []
+    mode, term = normalized
+
+    cached = prefix_cache.get((mode, term))
+    rows = cached[0] if cached is not None else None
+    if rows is None:
+        generation = _generation
+        rows = _from_shorter_prefix(mode, term)
+        complete = True
+        if rows is None:
+            # Se piden más filas que las mostradas (y una de más para saber si están todas)
+            # para que los siguientes caracteres tecleados se resuelvan desde la caché
+            prefetch = max(limit, settings.CUSTOMER_AUTOCOMPLETE_PREFETCH)
+            rows = _query_rows(db, mode, term, prefetch + 1)
+            complete = len(rows) <= prefetch
+            rows = rows[:prefetch]
+        if generation == _generation:
+            prefix_cache.set((mode, term), (rows, complete))
+
+    return [{field: row[field] for field in PUBLIC_FIELDS} for row in rows[:limit]]
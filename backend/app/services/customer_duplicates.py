@@ -0,0 +1,308 @@
+# backend/app/services/customer_duplicates.py
+
+"""
+Detección de clientes duplicados y fusión.
+
+`create_repair_order` solo reutiliza un cliente si el DNI coincide exactamente, así que se
+acumulan casi-duplicados: el mismo teléfono sin DNI, apellidos con errores de tipeo, un
+dígito cambiado en el DNI. `find_duplicates` es un proceso por lotes que:
+  1. recorre los clientes en orden de id (solo columnas normalizadas del autocompletado);
+  2. agrupa candidatos por bloques baratos: mismo DNI, mismo teléfono (últimos 8 dígitos),
+     mismo email y trigramas del nombre (índice invertido en memoria con filtrado por
+     prefijo: solo se indexan los trigramas más raros de cada nombre, los suficientes
+     para que dos nombres con similitud >= NAME_BLOCK_SIMILARITY compartan al menos uno);
+  3. puntúa cada par (similitud de trigramas del nombre + coincidencias de DNI, teléfono y
+     email; un DNI distinto penaliza) y guarda los que superan
+     CUSTOMER_DUPLICATE_MIN_SCORE en customer.customer_duplicate como 'pending'.
+Es incremental: solo compara los clientes con id mayor al último procesado (guardado en
+system.job_checkpoint) contra todos los anteriores. Con full=True recorre todo de nuevo.
+Los pares descartados no se vuelven a proponer.
+
+`merge_customers` fusiona un duplicado en el cliente que se conserva en una sola
+transacción: mueve sus órdenes (y con ellas las suscripciones de email, que cuelgan de
+la orden), completa los datos que falten y elimina el duplicado.
+"""
+
+import logging
+import math
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session, joinedload
+
+from app.core.config import settings
+from app.core.logger import structured_logger
+from app.db.unit_of_work import unit_of_work
+from app.models.customer import Customer
+from app.models.customer_duplicate import CustomerDuplicate
+from app.models.job_checkpoint import JobCheckpoint
+from app.models.repair_order import RepairOrder
+from app.services import customer_autocomplete, public_order_cache
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "customer_duplicates"
+STATUS_PENDING = "pending"
+STATUS_DISMISSED = "dismissed"
+# Similitud mínima de nombre para que el bloque de trigramas proponga un candidato
+NAME_BLOCK_SIMILARITY = 0.75
+# Dígitos finales del teléfono que se comparan (ignora prefijos +54 9, 0, 15)
+PHONE_SUFFIX_DIGITS = 8
+
+
+def trigrams(text: Optional[str]) -> Set[str]:
+    """Trigramas de cada palabra con relleno, como pg_trgm."""
+    grams = set()
+    for word in (text or "").split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _phone_key(phone_digits: Optional[str]) -> Optional[str]:
+    if not phone_digits or len(phone_digits) < 6:
+        return None
+    return phone_digits[-PHONE_SUFFIX_DIGITS:]
+
+
+def _dni_typo(a: str, b: str) -> bool:
+    """Mismo largo y un dígito distinto, o dos dígitos contiguos intercambiados."""
+    if len(a) != len(b):
+        return False
+    diff = [i for i in range(len(a)) if a[i] != b[i]]
+    if len(diff) == 1:
+        return True
+    return len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+
+
+def score_pair(a: dict, b: dict, name_similarity: float) -> Tuple[float, List[str]]:
+    """Puntaje (0 a 1) de que `a` y `b` sean la misma persona y las señales que coinciden."""
+    reasons = []
+    score = 0.8 * name_similarity if name_similarity >= NAME_BLOCK_SIMILARITY else 0.0
+    dni_conflict = False
+    if a["dni"] and b["dni"]:
+        if a["dni"] == b["dni"]:
+            score = max(score, 0.9 + 0.1 * name_similarity)
+            reasons.append("dni")
+        elif _dni_typo(a["dni"], b["dni"]) and name_similarity >= NAME_BLOCK_SIMILARITY:
+            score = max(score, 0.6 + 0.3 * name_similarity)
+            reasons.append("dni_typo")
+        else:
+            dni_conflict = True
+    if a["phone"] and a["phone"] == b["phone"]:
+        # Familiares comparten teléfono: sin nombre parecido no alcanza el umbral
+        score = max(score, 0.3 + 0.6 * name_similarity)
+        reasons.append("phone")
+    if a["email"] and a["email"] == b["email"]:
+        score = max(score, 0.5 + 0.5 * name_similarity)
+        reasons.append("email")
+    if dni_conflict:
+        score *= 0.5
+        reasons.append("dni_conflict")
+    reasons.append(f"name:{name_similarity:.2f}")
+    return round(score, 3), reasons
+
+
+class _BlockIndex:
+    """Índices en memoria de los clientes ya recorridos, para buscar candidatos."""
+
+    def __init__(self, frequencies: Counter):
+        self.frequencies = frequencies
+        self.customers: Dict[int, dict] = {}
+        self.by_dni: Dict[str, List[int]] = defaultdict(list)
+        self.by_phone: Dict[str, List[int]] = defaultdict(list)
+        self.by_email: Dict[str, List[int]] = defaultdict(list)
+        self.by_trigram: Dict[str, List[int]] = defaultdict(list)
+
+    def _prefix(self, grams: Set[str]) -> List[str]:
+        # Con similitud >= t dos conjuntos comparten al menos uno de sus primeros
+        # |A| - ceil(t·|A|) + 1 trigramas en un mismo orden global (del más raro al más común)
+        length = len(grams) - math.ceil(NAME_BLOCK_SIMILARITY * len(grams)) + 1
+        return sorted(grams, key=lambda gram: (self.frequencies[gram], gram))[:length]
+
+    def add(self, customer: dict) -> None:
+        self.customers[customer["id"]] = customer
+        for key, index in (("dni", self.by_dni), ("phone", self.by_phone), ("email", self.by_email)):
+            if customer[key]:
+                index[customer[key]].append(customer["id"])
+        for gram in self._prefix(customer["trigrams"]):
+            self.by_trigram[gram].append(customer["id"])
+
+    def _similarity(self, customer: dict, other_id: int) -> float:
+        grams, other = customer["trigrams"], self.customers[other_id]["trigrams"]
+        common = len(grams & other)
+        total = len(grams) + len(other) - common
+        return common / total if total else 0.0
+
+    def candidates(self, customer: dict) -> Dict[int, float]:
+        """Candidatos (id -> similitud de nombre) entre los clientes ya indexados."""
+        result = {}
+        checked = set()
+        size = len(customer["trigrams"])
+        # Con similitud >= t el otro nombre tiene entre t·|A| y |A|/t trigramas
+        min_size, max_size = NAME_BLOCK_SIMILARITY * size, size / NAME_BLOCK_SIMILARITY
+        for gram in self._prefix(customer["trigrams"]):
+            for other_id in self.by_trigram.get(gram, ()):
+                if other_id in checked:
+                    continue
+                checked.add(other_id)
+                if not min_size <= len(self.customers[other_id]["trigrams"]) <= max_size:
+                    continue
+                value = self._similarity(customer, other_id)
+                if value >= NAME_BLOCK_SIMILARITY:
+                    result[other_id] = value
+        for key, index in (("dni", self.by_dni), ("phone", self.by_phone), ("email", self.by_email)):
+            if customer[key]:
+                for other_id in index.get(customer[key], ()):
+                    if other_id not in result:
+                        result[other_id] = self._similarity(customer, other_id)
+        return result
+
+
+def _load_customers(db: Session) -> List[dict]:
+    stmt = (
+        select(Customer.id, Customer.name_key, Customer.dni_digits, Customer.phone_digits, Customer.email)
+        .order_by(Customer.id)
+        .execution_options(yield_per=2000)
+    )
+    return [
+        {
+            "id": row.id,
+            "dni": row.dni_digits,
+            "phone": _phone_key(row.phone_digits),
+            "email": (row.email or "").strip().lower() or None,
+            "trigrams": trigrams(row.name_key),
+        }
+        for row in db.execute(stmt)
+    ]
+
+
+def find_duplicates(db: Session, full: bool = False, min_score: Optional[float] = None, dry_run: bool = False) -> dict:
+    """
+    Busca duplicados de los clientes nuevos desde la última ejecución (o de todos con
+    full=True) y guarda los pares que superan `min_score`. Retorna un resumen.
+    """
+    min_score = settings.CUSTOMER_DUPLICATE_MIN_SCORE if min_score is None else min_score
+    checkpoint = db.get(JobCheckpoint, JOB_NAME)
+    since_id = 0 if full or checkpoint is None else checkpoint.last_id
+    known = set(db.execute(select(CustomerDuplicate.customer_id, CustomerDuplicate.duplicate_id)).all())
+
+    customers = _load_customers(db)
+    index = _BlockIndex(Counter(gram for customer in customers for gram in customer["trigrams"]))
+    found = []
+    scanned = 0
+    last_id = since_id
+    for customer in customers:
+        if customer["id"] > since_id:
+            scanned += 1
+            last_id = customer["id"]
+            for other_id, similarity in index.candidates(customer).items():
+                if (other_id, customer["id"]) in known:
+                    continue
+                score, reasons = score_pair(index.customers[other_id], customer, similarity)
+                if score >= min_score:
+                    found.append({
+                        "customer_id": other_id,
+                        "duplicate_id": customer["id"],
+                        "score": score,
+                        "reasons": ",".join(reasons),
+                        "status": STATUS_PENDING,
+                    })
+        index.add(customer)
+
+    if not dry_run:
+        if found:
+            db.bulk_insert_mappings(CustomerDuplicate, found)
+        if checkpoint is None:
+            checkpoint = JobCheckpoint(name=JOB_NAME, last_id=last_id)
+            db.add(checkpoint)
+        else:
+            checkpoint.last_id = last_id
+        db.commit()
+    return {"since_id": since_id, "last_id": last_id, "scanned": scanned, "found": len(found), "dry_run": dry_run}
+
+
+def list_candidates(db: Session, status: str = STATUS_PENDING, min_score: float = 0.0, skip: int = 0, limit: int = 50):
+    """Pares propuestos, del puntaje más alto al más bajo, con ambos clientes cargados."""
+    return (
+        db.query(CustomerDuplicate)
+        .options(joinedload(CustomerDuplicate.customer), joinedload(CustomerDuplicate.duplicate))
+        .filter(CustomerDuplicate.status == status, CustomerDuplicate.score >= min_score)
+        .order_by(CustomerDuplicate.score.desc(), CustomerDuplicate.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+
+def dismiss_candidate(db: Session, candidate_id: int, user_id: Optional[int] = None):
+    """Marca un par como 'no es duplicado'; no se vuelve a proponer."""
+    candidate = db.get(CustomerDuplicate, candidate_id)
+    if candidate is None:
+        return None
+    candidate.status = STATUS_DISMISSED
+    candidate.resolved_at = datetime.utcnow()
+    candidate.resolved_by = user_id
+    db.commit()
+    db.refresh(candidate)
+    return candidate
+
+
+def merge_customers(db: Session, keep_id: int, duplicate_id: int, user_id: Optional[int] = None) -> Optional[Tuple[Customer, int]]:
+    """
+    Fusiona `duplicate_id` en `keep_id` en una sola transacción y retorna (cliente, órdenes
+    movidas), o None si alguno de los dos no existe. Lanza ValueError si son el mismo.
+    """
+    if keep_id == duplicate_id:
+        raise ValueError("No se puede fusionar un cliente consigo mismo")
+    with unit_of_work(db):
+        # Se bloquean ambas filas en orden de id para que dos fusiones cruzadas no se traben
+        rows = (
+            db.query(Customer)
+            .filter(Customer.id.in_([keep_id, duplicate_id]))
+            .order_by(Customer.id)
+            .with_for_update()
+            .all()
+        )
+        by_id = {customer.id: customer for customer in rows}
+        keep, duplicate = by_id.get(keep_id), by_id.get(duplicate_id)
+        if keep is None or duplicate is None:
+            return None
+
+        moved = db.execute(
+            update(RepairOrder)
+            .where(RepairOrder.customer_id == duplicate_id)
+            .values(customer_id=keep_id)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        # Datos que el cliente conservado no tiene. El DNI es único: primero se libera.
+        missing = {
+            field: getattr(duplicate, field)
+            for field in ("dni", "phone_number", "email")
+            if getattr(keep, field) is None and getattr(duplicate, field) is not None
+        }
+        if "dni" in missing:
+            duplicate.dni = None
+            db.flush()
+        for field, value in missing.items():
+            setattr(keep, field, value)
+        keep.is_subscribed = bool(keep.is_subscribed or duplicate.is_subscribed)
+
+        db.query(CustomerDuplicate).filter(
+            or_(CustomerDuplicate.customer_id == duplicate_id, CustomerDuplicate.duplicate_id == duplicate_id)
+        ).delete(synchronize_session=False)
+        db.delete(duplicate)
+        customer_autocomplete.mark_customers_changed(db)
+        public_order_cache.mark_all_changed(db)
+    db.refresh(keep)
+
+    structured_logger.log_event(
+        event_type="customer_merged",
+        message=f"Cliente {duplicate_id} fusionado en {keep_id}",
+        context={"keep_id": keep_id, "duplicate_id": duplicate_id, "moved_orders": moved, "filled": sorted(missing)},
+        user_id=str(user_id) if user_id else None,
+    )
+    return keep, moved
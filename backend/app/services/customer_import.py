@@ -0,0 +1,311 @@
+# backend/app/services/customer_import.py
+
+"""
+Importación masiva de clientes desde CSV o NDJSON (alta de una sucursal nueva).
+
+El archivo se lee como stream y se procesa por bloques de CUSTOMER_IMPORT_CHUNK_SIZE
+filas. Por cada bloque:
+  1. se valida y normaliza cada fila (DNI solo dígitos, espacios del teléfono, email en
+     minúsculas);
+  2. una sola consulta busca los clientes existentes con esos DNI o teléfonos (columnas
+     normalizadas dni_digits / phone_digits del autocompletado);
+  3. las filas nuevas se insertan con un único INSERT ... ON CONFLICT (dni) DO NOTHING,
+     así un alta concurrente con el mismo DNI no hace fallar el bloque;
+  4. se confirma el bloque.
+Una fila inválida o duplicada no aborta la importación: queda en el reporte con su
+número de línea y el motivo. También se detectan duplicados dentro del mismo archivo.
+
+Lo usan POST /customers/import y backend/scripts/import_customers.py.
+"""
+
+import csv
+import json
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.customer import Customer
+from app.services import customer_autocomplete
+from app.services.customer_autocomplete import digits_only, fold_text, search_keys
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "ndjson")
+
+# Encabezados aceptados (normalizados con fold_text, espacios como "_") -> campo
+FIELD_ALIASES = {
+    "first_name": "first_name", "nombre": "first_name", "nombres": "first_name",
+    "last_name": "last_name", "apellido": "last_name", "apellidos": "last_name",
+    "dni": "dni", "documento": "dni", "nro_documento": "dni",
+    "phone_number": "phone_number", "phone": "phone_number", "telefono": "phone_number",
+    "celular": "phone_number", "tel": "phone_number",
+    "email": "email", "mail": "email", "correo": "email", "e_mail": "email",
+    "is_subscribed": "is_subscribed", "suscripto": "is_subscribed", "suscrito": "is_subscribed",
+}
+_TRUE_VALUES = {"1", "true", "si", "s", "yes", "y", "x"}
+_CSV_DELIMITERS = (",", ";", "\t")
+
+
+def detect_format(filename: Optional[str]) -> str:
+    """'ndjson' para .ndjson / .jsonl, 'csv' para el resto."""
+    if (filename or "").lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+
+def _field_name(header: str) -> Optional[str]:
+    return FIELD_ALIASES.get(fold_text(str(header)).replace(" ", "_"))
+
+
+def iter_records(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Recorre el archivo línea a línea, sin cargarlo entero. Produce (línea, fila, error):
+    la fila es un dict con los campos reconocidos, o None y el error si no se pudo leer.
+    """
+    if fmt == "ndjson":
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, None, f"JSON inválido: {e.msg}"
+                continue
+            if not isinstance(data, dict):
+                yield line_number, None, "Se esperaba un objeto JSON por línea"
+                continue
+            yield line_number, {_field_name(k): v for k, v in data.items() if _field_name(k)}, None
+        return
+
+    lines = iter(lines)
+    header_line = next(lines, "")
+    # Las planillas en español suelen exportarse con ';'
+    delimiter = max(_CSV_DELIMITERS, key=header_line.count)
+    header = next(csv.reader([header_line], delimiter=delimiter), [])
+    fields = [_field_name(name) for name in header]
+    reader = csv.reader(lines, delimiter=delimiter)
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        # line_num cuenta desde la segunda línea física (el encabezado se leyó aparte)
+        yield reader.line_num + 1, {field: value for field, value in zip(fields, values) if field}, None
+
+
+def _clean(value) -> Optional[str]:
+    if value is None:
+        return None
+    text = " ".join(str(value).split())
+    return text or None
+
+
+def normalize_record(record: dict) -> dict:
+    """Fila lista para insertar. Lanza ValueError con el motivo si no es válida."""
+    first_name = _clean(record.get("first_name"))
+    last_name = _clean(record.get("last_name"))
+    if not first_name or not last_name:
+        raise ValueError("Nombre y apellido son obligatorios")
+
+    dni = digits_only(_clean(record.get("dni"))) or None
+    if dni is not None and not 6 <= len(dni) <= 11:
+        raise ValueError(f"DNI inválido: {record.get('dni')}")
+    phone_number = _clean(record.get("phone_number"))
+    if phone_number is not None and len(digits_only(phone_number)) < 6:
+        raise ValueError(f"Teléfono inválido: {record.get('phone_number')}")
+    email = _clean(record.get("email"))
+    if email is not None:
+        email = email.lower()
+        if "@" not in email or " " in email:
+            raise ValueError(f"Email inválido: {record.get('email')}")
+    subscribed = record.get("is_subscribed")
+    if not isinstance(subscribed, bool):
+        subscribed = fold_text(str(subscribed or "")) in _TRUE_VALUES
+
+    row = {
+        "first_name": first_name,
+        "last_name": last_name,
+        "dni": dni,
+        "phone_number": phone_number,
+        "email": email,
+        "is_subscribed": subscribed and email is not None,
+    }
+    # El INSERT masivo no pasa por los eventos del ORM: las claves se calculan acá
+    row.update(search_keys(first_name, last_name, dni, phone_number))
+    return row
+
+
+def _insert_statement(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Importación masiva no soportada en {dialect}")
+    return insert(Customer)
+
+
+class ImportReport:
+    def __init__(self, dry_run: bool):
+        self.dry_run = dry_run
+        self.total = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.errors = 0
+        self.rows: List[dict] = []
+
+    def add(self, line: int, status: str, reason: str, customer_id: Optional[int] = None) -> None:
+        if status == "duplicate":
+            self.duplicates += 1
+        else:
+            self.errors += 1
+        self.rows.append({"line": line, "status": status, "reason": reason, "customer_id": customer_id})
+
+    def as_dict(self) -> dict:
+        return {
+            "dry_run": self.dry_run,
+            "total": self.total,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+            "rows": sorted(self.rows, key=lambda row: row["line"]),
+        }
+
+
+class _Seen:
+    """DNI y teléfonos ya vistos en el archivo (para duplicados dentro del mismo archivo)."""
+
+    def __init__(self):
+        self.dni: Dict[str, int] = {}
+        self.phone: Dict[str, int] = {}
+
+    def duplicate_of(self, row: dict) -> Optional[str]:
+        if row["dni_digits"] and row["dni_digits"] in self.dni:
+            return f"DNI repetido en el archivo (línea {self.dni[row['dni_digits']]})"
+        if row["phone_digits"] and row["phone_digits"] in self.phone:
+            return f"Teléfono repetido en el archivo (línea {self.phone[row['phone_digits']]})"
+        return None
+
+    def add(self, line: int, row: dict) -> None:
+        if row["dni_digits"]:
+            self.dni[row["dni_digits"]] = line
+        if row["phone_digits"]:
+            self.phone[row["phone_digits"]] = line
+
+
+def _existing(db: Session, rows: List[dict]) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """Una consulta por bloque: clientes existentes con alguno de los DNI o teléfonos."""
+    dnis = {row["dni_digits"] for row in rows if row["dni_digits"]}
+    phones = {row["phone_digits"] for row in rows if row["phone_digits"]}
+    conditions = []
+    if dnis:
+        conditions.append(Customer.dni_digits.in_(dnis))
+    if phones:
+        conditions.append(Customer.phone_digits.in_(phones))
+    by_dni: Dict[str, int] = {}
+    by_phone: Dict[str, int] = {}
+    if not conditions:
+        return by_dni, by_phone
+    result = db.execute(select(Customer.id, Customer.dni_digits, Customer.phone_digits).where(or_(*conditions)))
+    for customer_id, dni_digits, phone_digits in result:
+        if dni_digits in dnis:
+            by_dni.setdefault(dni_digits, customer_id)
+        if phone_digits in phones:
+            by_phone.setdefault(phone_digits, customer_id)
+    return by_dni, by_phone
+
+
+def _import_chunk(db: Session, chunk: List[Tuple[int, dict]]) -> Tuple[int, List[tuple]]:
+    """Inserta las filas nuevas del bloque. Retorna (insertadas, [(línea, estado, motivo, id)])."""
+    by_dni, by_phone = _existing(db, [row for _line, row in chunk])
+    notes = []
+    new_rows = []
+    for line, row in chunk:
+        if row["dni_digits"] in by_dni:
+            notes.append((line, "duplicate", "Ya existe un cliente con ese DNI", by_dni[row["dni_digits"]]))
+        elif row["phone_digits"] in by_phone:
+            notes.append((line, "duplicate", "Ya existe un cliente con ese teléfono", by_phone[row["phone_digits"]]))
+        else:
+            new_rows.append((line, row))
+
+    inserted = 0
+    stmt = _insert_statement(db)
+    with_dni = [(line, row) for line, row in new_rows if row["dni"]]
+    without_dni = [row for _line, row in new_rows if not row["dni"]]
+    if with_dni:
+        # Un DNI cargado por otro usuario mientras tanto se omite en lugar de fallar
+        result = db.execute(
+            stmt.on_conflict_do_nothing(index_elements=[Customer.dni]).returning(Customer.dni),
+            [row for _line, row in with_dni],
+        )
+        inserted_dnis = set(result.scalars())
+        inserted += len(inserted_dnis)
+        for line, row in with_dni:
+            if row["dni"] not in inserted_dnis:
+                notes.append((line, "duplicate", "Ya existe un cliente con ese DNI (alta concurrente)", None))
+    if without_dni:
+        db.execute(stmt, without_dni)
+        inserted += len(without_dni)
+    return inserted, notes
+
+
+def import_customers(
+    db: Session,
+    lines: Iterable[str],
+    fmt: str = "csv",
+    dry_run: bool = False,
+    chunk_size: Optional[int] = None,
+) -> dict:
+    """
+    Importa clientes desde las líneas de un archivo CSV (con encabezado) o NDJSON.
+    Confirma cada bloque por separado; con dry_run valida y cuenta sin guardar nada.
+    Retorna el reporte: totales y, por cada fila no importada, línea, estado y motivo.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt} (use {' o '.join(FORMATS)})")
+    chunk_size = chunk_size or settings.CUSTOMER_IMPORT_CHUNK_SIZE
+    report = ImportReport(dry_run)
+    seen = _Seen()
+    chunk: List[Tuple[int, dict]] = []
+
+    def flush_chunk():
+        try:
+            inserted, notes = _import_chunk(db, chunk)
+            if dry_run:
+                db.rollback()
+            else:
+                customer_autocomplete.mark_customers_changed(db)
+                db.commit()
+            report.inserted += inserted
+            for note in notes:
+                report.add(*note)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"[Import] Bloque de clientes rechazado: {e}")
+            for line, _row in chunk:
+                report.add(line, "error", f"Error al guardar el bloque: {type(e).__name__}")
+        chunk.clear()
+
+    for line, record, error in iter_records(lines, fmt):
+        report.total += 1
+        if error:
+            report.add(line, "error", error)
+            continue
+        try:
+            row = normalize_record(record)
+        except ValueError as e:
+            report.add(line, "error", str(e))
+            continue
+        duplicate = seen.duplicate_of(row)
+        if duplicate:
+            report.add(line, "duplicate", duplicate)
+            continue
+        seen.add(line, row)
+        chunk.append((line, row))
+        if len(chunk) >= chunk_size:
+            flush_chunk()
+    if chunk:
+        flush_chunk()
+    return report.as_dict()
@@ -0,0 +1,207 @@
+# backend/app/services/order_stream.py
+
+"""
+Eventos en vivo de una orden para el portal de clientes (Server-Sent Events).
+
+El WebSocket del personal requiere JWT; el portal se suscribe sin login a
+/client-orders/{id}/events con un token por orden (HMAC del id con SECRET_KEY). El
+número de orden es secuencial, así que el token no viaja en la vista pública por id:
+solo en la búsqueda por DNI y en el enlace del QR del ticket. Eventos:
+  - status: cambió el estado de la orden;
+  - diagnosis: cambió el diagnóstico o las notas de reparación;
+  - photo: se agregó una foto (metadatos, como en /client-orders/{id}/photos);
+  - deleted: la orden se eliminó (el stream termina);
+  - resync: no se pueden reponer los eventos perdidos, el portal debe recargar la orden.
+
+Las mismas funciones de crud que disparan los eventos del WebSocket del personal
+registran el evento en la sesión; al confirmar se publica en el bus de invalidación
+(Redis), así llega a los suscriptores de todos los workers. Cada worker guarda los
+últimos ORDER_STREAM_BUFFER_SIZE eventos de cada orden para reanudar con Last-Event-ID.
+Una conexión inactiva solo espera en su cola en memoria: no consulta la base.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache, invalidation_bus
+from app.core.config import settings
+from app.core.security import SECRET_KEY
+
+ORDER_STREAM_NAMESPACE = "order_stream"
+# Marca en session.info: eventos a publicar cuando la sesión confirme
+_PENDING_KEY = "order_stream_events"
+# Reintento sugerido al navegador (EventSource) si se corta la conexión
+RETRY_MILLISECONDS = 5000
+
+
+class OrderEvent:
+    __slots__ = ("id", "order_id", "event", "data")
+
+    def __init__(self, id: int, order_id: int, event: str, data: dict):
+        self.id = id
+        self.order_id = order_id
+        self.event = event
+        self.data = data
+
+    def encode(self) -> str:
+        """Mensaje en formato text/event-stream."""
+        return f"id: {self.id}\nevent: {self.event}\ndata: {json.dumps(self.data, default=str)}\n\n"
+
+
+class _OrderBuffer:
+    """Últimos eventos de una orden, y el id del último descartado por falta de lugar."""
+
+    def __init__(self):
+        self.events: "deque[OrderEvent]" = deque(maxlen=settings.ORDER_STREAM_BUFFER_SIZE)
+        self.dropped_id = 0
+
+    def append(self, order_event: OrderEvent) -> None:
+        if len(self.events) == self.events.maxlen:
+            self.dropped_id = self.events[0].id
+        self.events.append(order_event)
+
+
+class Subscriber:
+    def __init__(self, order_id: int):
+        self.order_id = order_id
+        self.loop = asyncio.get_running_loop()
+        # Sin límite: una orden recibe pocos eventos y la conexión los consume enseguida
+        self.queue: "asyncio.Queue[OrderEvent]" = asyncio.Queue()
+
+
+_lock = threading.Lock()
+# order_id -> _OrderBuffer
+_buffers = TTLCache(maxsize=settings.ORDER_STREAM_BUFFERED_ORDERS, ttl=settings.ORDER_STREAM_BUFFER_TTL_SECONDS)
+_subscribers: Dict[int, Set[Subscriber]] = {}
+_last_id = 0
+
+
+def make_token(order_id: int) -> str:
+    """Token del stream de la orden: no se puede deducir sin SECRET_KEY."""
+    digest = hmac.new(SECRET_KEY.encode(), f"order-stream:{order_id}".encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:18]).decode()
+
+
+def verify_token(order_id: int, token: str) -> bool:
+    return hmac.compare_digest(make_token(order_id), token or "")
+
+
+def _now_id() -> int:
+    # Microsegundos: los ids crecen también entre workers (relojes sincronizados)
+    return time.time_ns() // 1000
+
+
+def _next_id() -> int:
+    global _last_id
+    with _lock:
+        _last_id = max(_now_id(), _last_id + 1)
+        return _last_id
+
+
+def connection_count() -> int:
+    return sum(len(subscribers) for subscribers in _subscribers.values())
+
+
+def _deliver(key) -> None:
+    """Manejador del bus: guarda el evento y lo entrega a las conexiones de la orden."""
+    if not key:
+        return
+    order_event = OrderEvent(key["id"], key["order_id"], key["event"], key["data"])
+    with _lock:
+        buffer = _buffers.get(order_event.order_id) or _OrderBuffer()
+        buffer.append(order_event)
+        _buffers.set(order_event.order_id, buffer)
+        subscribers = list(_subscribers.get(order_event.order_id, ()))
+    for subscriber in subscribers:
+        # El bus puede llamar desde otro hilo (commit en el threadpool, listener de Redis)
+        subscriber.loop.call_soon_threadsafe(subscriber.queue.put_nowait, order_event)
+
+
+invalidation_bus.register(ORDER_STREAM_NAMESPACE, _deliver)
+
+
+def subscribe(order_id: int, last_event_id: Optional[int]) -> Tuple[Subscriber, List[OrderEvent], bool]:
+    """
+    Registra una conexión. Retorna (suscriptor, eventos posteriores a last_event_id,
+    resync): resync es True si hay eventos que ya no se pueden reponer.
+    """
+    subscriber = Subscriber(order_id)
+    with _lock:
+        _subscribers.setdefault(order_id, set()).add(subscriber)
+        if last_event_id is None:
+            return subscriber, [], False
+        buffer = _buffers.get(order_id)
+        if buffer is None or last_event_id < buffer.dropped_id:
+            return subscriber, [], True
+        return subscriber, [e for e in buffer.events if e.id > last_event_id], False
+
+
+def unsubscribe(subscriber: Subscriber) -> None:
+    with _lock:
+        subscribers = _subscribers.get(subscriber.order_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del _subscribers[subscriber.order_id]
+
+
+async def stream(order_id: int, last_event_id: Optional[int]):
+    """Generador text/event-stream de una orden, con heartbeat como comentario SSE."""
+    subscriber, backlog, resync = subscribe(order_id, last_event_id)
+    try:
+        yield f"retry: {RETRY_MILLISECONDS}\n\n"
+        if resync:
+            yield OrderEvent(_now_id(), order_id, "resync", {"order_id": order_id}).encode()
+        last_sent = last_event_id or 0
+        for order_event in backlog:
+            yield order_event.encode()
+            last_sent = order_event.id
+        while True:
+            try:
+                order_event = await asyncio.wait_for(
+                    subscriber.queue.get(), timeout=settings.ORDER_STREAM_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if order_event.id <= last_sent:
+                continue
+            yield order_event.encode()
+            last_sent = order_event.id
+            if order_event.event == "deleted":
+                return
+    finally:
+        unsubscribe(subscriber)
+
+
+def record_event(db: Session, order_id: int, event_name: str, data: Dict[str, Any]) -> None:
+    """Publica el evento de la orden cuando la sesión confirme (nunca si hace rollback)."""
+    db.info.setdefault(_PENDING_KEY, []).append((order_id, event_name, data))
+
+
+def record_status(db: Session, order_id: int, status_id: int, status_name: Optional[str]) -> None:
+    record_event(db, order_id, "status", {"order_id": order_id, "status": {"id": status_id, "status_name": status_name}})
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    for order_id, event_name, data in pending or ():
+        key = {"id": _next_id(), "order_id": order_id, "event": event_name, "data": data}
+        invalidation_bus.publish(ORDER_STREAM_NAMESPACE, json.loads(json.dumps(key, default=str)))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session) -> None:
+    session.info.pop(_PENDING_KEY, None)
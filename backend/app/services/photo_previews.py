@@ -0,0 +1,96 @@
+# backend/app/services/photo_previews.py
+
+"""
+Miniaturas y vistas previas de las fotos de órdenes para el portal de clientes.
+
+Las fotos se guardan en la base como data URL en base64 (hasta ~1200x800). El portal ya
+no las recibe inline: lista metadatos y pide cada imagen por separado, en dos tamaños:
+  - thumbnail: lado mayor PHOTO_THUMBNAIL_MAX_SIDE, para la grilla;
+  - preview: lado mayor PHOTO_PREVIEW_MAX_SIDE, para la vista ampliada.
+La imagen de una foto no cambia nunca (solo la nota y las anotaciones), así que cada
+variante se sirve con caché `immutable` y se guarda ya renderizada en una caché LRU del
+proceso. Al borrar una foto se descarta de la caché en todos los workers.
+"""
+
+import base64
+import binascii
+import hashlib
+import io
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from app.core.cache import TTLCache, invalidation_bus
+from app.core.config import settings
+
+PHOTO_PREVIEW_NAMESPACE = "photo_preview"
+# Las URLs no cambian mientras exista la foto: el navegador no necesita revalidar
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# variante -> (lado mayor en px, calidad JPEG)
+VARIANTS = {
+    "thumbnail": (settings.PHOTO_THUMBNAIL_MAX_SIDE, 70),
+    "preview": (settings.PHOTO_PREVIEW_MAX_SIDE, 80),
+}
+
+# (order_id, photo_id, variante) -> (etag, bytes JPEG)
+preview_cache = TTLCache(maxsize=settings.PHOTO_PREVIEW_CACHE_SIZE, ttl=24 * 3600)
+
+
+def _apply_invalidation(photo_id) -> None:
+    if photo_id is None:
+        preview_cache.clear()
+        return
+    preview_cache.discard_where(lambda key: key[1] == photo_id)
+
+
+invalidation_bus.register(PHOTO_PREVIEW_NAMESPACE, _apply_invalidation)
+
+
+def forget(photo_id: int) -> None:
+    """Descarta las variantes de una foto borrada en todos los workers."""
+    invalidation_bus.publish(PHOTO_PREVIEW_NAMESPACE, photo_id)
+
+
+def external_url(stored: str) -> Optional[str]:
+    """URL de la imagen si la foto guardada es un enlace y no una imagen en base64."""
+    return stored if stored.startswith(("http://", "https://")) else None
+
+
+def decode_photo(stored: str) -> bytes:
+    """Bytes de la imagen guardada como data URL o base64. Lanza ValueError si no es válida."""
+    data = stored.split(",", 1)[1] if stored.startswith("data:") else stored
+    try:
+        return base64.b64decode(data, validate=False)
+    except (binascii.Error, ValueError):
+        raise ValueError("La foto guardada no es base64 válido")
+
+
+def render(image_data: bytes, max_side: int, quality: int) -> bytes:
+    """JPEG con el lado mayor acotado a `max_side` (no agranda imágenes chicas)."""
+    image = Image.open(io.BytesIO(image_data))
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def get_cached(order_id: int, photo_id: int, variant: str) -> Optional[Tuple[str, bytes]]:
+    return preview_cache.get((order_id, photo_id, variant))
+
+
+def build(order_id: int, photo_id: int, variant: str, stored: str) -> Tuple[str, bytes]:
+    """Renderiza la variante desde la foto guardada y la deja en caché. Retorna (ETag, JPEG)."""
+    max_side, quality = VARIANTS[variant]
+    image_data = decode_photo(stored)
+    try:
+        content = render(image_data, max_side, quality)
+    except OSError as e:
+        # Imagen corrupta o en un formato que Pillow no reconoce
+        raise ValueError(f"No se pudo procesar la foto: {e}")
+    entry = ('"' + hashlib.sha1(content).hexdigest()[:20] + '"', content)
+    preview_cache.set((order_id, photo_id, variant), entry)
+    return entry
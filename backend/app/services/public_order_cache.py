@@ -0,0 +1,119 @@
+# backend/app/services/public_order_cache.py
+
+"""
+Caché de respuestas de la vista pública de órdenes (portal de clientes y QR del ticket).
+
+/client-orders/client/{id} y /client-orders/client-search no requieren autenticación y
+los clientes los consultan una y otra vez mientras esperan su equipo. Cada worker guarda:
+  - order_id -> (ETag, JSON ya serializado de RepairOrderPublic);
+  - DNI -> order_id, para que la búsqueda por DNI tampoco consulte la base.
+Con If-None-Match igual al ETag se responde 304 sin cuerpo.
+
+Las funciones de crud que modifican una orden (o sus fotos, o el cliente) llaman a
+`mark_order_changed` / `mark_all_changed`; la invalidación se publica en el bus recién
+cuando la sesión confirma, así otro worker no vuelve a cachear la versión anterior. Los
+cambios de tablas de referencia (estados, sucursales) vacían la caché; el nombre del
+técnico se actualiza al vencer el TTL (PUBLIC_ORDER_CACHE_TTL_SECONDS).
+"""
+
+import hashlib
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache, invalidation_bus
+from app.core.config import settings
+from app.core.reference_cache import REFERENCE_NAMESPACE
+
+PUBLIC_ORDER_NAMESPACE = "public_order"
+# Marca en session.info: órdenes (o "todas") a invalidar cuando la sesión confirme
+_CHANGED_KEY = "public_order_changed"
+_ALL = "*"
+
+# order_id -> (etag, cuerpo JSON)
+order_cache = TTLCache(maxsize=settings.PUBLIC_ORDER_CACHE_SIZE, ttl=settings.PUBLIC_ORDER_CACHE_TTL_SECONDS)
+# DNI consultado -> order_id de su orden más reciente
+dni_cache = TTLCache(maxsize=settings.PUBLIC_ORDER_CACHE_SIZE, ttl=settings.PUBLIC_ORDER_CACHE_TTL_SECONDS)
+
+# Aumenta con cada invalidación: una consulta que empezó antes no guarda su resultado
+_generation = 0
+
+
+def _apply_invalidation(key) -> None:
+    global _generation
+    _generation += 1
+    if key is None:
+        order_cache.clear()
+        dni_cache.clear()
+        return
+    order_cache.pop(key["order_id"])
+    for dni in key.get("dnis") or ():
+        dni_cache.pop(dni)
+
+
+invalidation_bus.register(PUBLIC_ORDER_NAMESPACE, _apply_invalidation)
+invalidation_bus.register(REFERENCE_NAMESPACE, lambda table: _apply_invalidation(None))
+
+
+def generation() -> int:
+    return _generation
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+def get_order(order_id: int) -> Optional[Tuple[str, bytes]]:
+    return order_cache.get(order_id)
+
+
+def set_order(order_id: int, body: bytes, started_generation: int) -> Tuple[str, bytes]:
+    """Guarda la respuesta si no hubo invalidaciones desde que se leyó de la base."""
+    entry = (make_etag(body), body)
+    if started_generation == _generation:
+        order_cache.set(order_id, entry)
+    return entry
+
+
+def get_order_id_by_dni(dni: str) -> Optional[int]:
+    return dni_cache.get(dni)
+
+
+def set_order_id_by_dni(dni: str, order_id: int, started_generation: int) -> None:
+    if started_generation == _generation:
+        dni_cache.set(dni, order_id)
+
+
+def mark_order_changed(db: Session, order_id: int, dnis: Iterable[Optional[str]] = ()) -> None:
+    """
+    Invalida la orden (y las búsquedas por los DNI indicados) cuando la sesión confirme.
+    Se pasan los DNI cuando cambia qué orden le corresponde a un DNI: alta de una orden,
+    baja, o cambio del DNI del cliente.
+    """
+    changed = db.info.setdefault(_CHANGED_KEY, {})
+    if _ALL in changed:
+        return
+    changed.setdefault(order_id, set()).update(dni for dni in dnis if dni)
+
+
+def mark_all_changed(db: Session) -> None:
+    """Invalida toda la caché al confirmar (cambios de clientes que afectan varias órdenes)."""
+    db.info[_CHANGED_KEY] = {_ALL: set()}
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session) -> None:
+    changed = session.info.pop(_CHANGED_KEY, None)
+    if not changed:
+        return
+    if _ALL in changed:
+        invalidation_bus.publish(PUBLIC_ORDER_NAMESPACE)
+        return
+    for order_id, dnis in changed.items():
+        invalidation_bus.publish(PUBLIC_ORDER_NAMESPACE, {"order_id": order_id, "dnis": sorted(dnis)})
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session) -> None:
+    session.info.pop(_CHANGED_KEY, None)
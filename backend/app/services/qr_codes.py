@@ -0,0 +1,100 @@
+# backend/app/services/qr_codes.py
+
+"""
+Códigos QR de los tickets y del portal de clientes.
+
+El QR de una orden es siempre el mismo (el enlace al portal), pero cada ticket impreso y
+cada vista lo pedían de nuevo y se volvía a generar, rasterizar, escalar y codificar.
+Ahora cada imagen se genera una vez por worker y queda en una caché LRU por
+(datos, tamaño, formato), con ETag. Formatos:
+  - png: se escala la matriz de módulos (1 px por módulo) al tamaño pedido, sin suavizado;
+  - svg: un path con los módulos, sin rasterizar; nítido a cualquier tamaño de impresión.
+"""
+
+import base64
+import hashlib
+import io
+from typing import List, Tuple
+
+import qrcode
+from PIL import Image
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.services import order_stream
+
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+# El contenido de un QR no cambia para los mismos datos y tamaño
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# (datos, tamaño, formato) -> (etag, contenido, media type)
+qr_cache = TTLCache(maxsize=settings.QR_CACHE_SIZE, ttl=settings.QR_CACHE_TTL_SECONDS)
+
+
+def order_portal_url(order_id: int, base_url: str = "") -> str:
+    """
+    Enlace al portal de clientes que se codifica en el QR de la orden. Lleva el token de la
+    orden: quien tiene el ticket recibe las actualizaciones en vivo sin ingresar el DNI.
+    """
+    base = (base_url or settings.CLIENT_PORTAL_BASE_URL).rstrip("/")
+    return f"{base}/{order_id}?token={order_stream.make_token(order_id)}"
+
+
+def _matrix(data: str) -> List[List[bool]]:
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        border=0,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def render_png(matrix: List[List[bool]], size: int) -> bytes:
+    modules = len(matrix)
+    image = Image.new("1", (modules, modules), 1)
+    image.putdata([0 if dark else 1 for row in matrix for dark in row])
+    image = image.resize((size, size), Image.NEAREST)
+    output = io.BytesIO()
+    image.save(output, format="PNG", optimize=True)
+    return output.getvalue()
+
+
+def render_svg(matrix: List[List[bool]], size: int) -> bytes:
+    # Una línea del path por cada tramo horizontal de módulos oscuros
+    runs = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < len(row):
+            if row[x]:
+                start = x
+                while x < len(row) and row[x]:
+                    x += 1
+                runs.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+            else:
+                x += 1
+    modules = len(matrix)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+        f'viewBox="0 0 {modules} {modules}" shape-rendering="crispEdges">'
+        f'<rect width="{modules}" height="{modules}" fill="#fff"/>'
+        f'<path fill="#000" d="{"".join(runs)}"/></svg>'
+    ).encode()
+
+
+def get_qr(data: str, size: int, fmt: str = "png") -> Tuple[str, bytes, str]:
+    """(ETag, contenido, media type) del QR, desde la caché o generado en el momento."""
+    key = (data, size, fmt)
+    entry = qr_cache.get(key)
+    if entry is None:
+        matrix = _matrix(data)
+        content = render_svg(matrix, size) if fmt == "svg" else render_png(matrix, size)
+        entry = ('"' + hashlib.sha1(content).hexdigest()[:20] + '"', content, FORMATS[fmt])
+        qr_cache.set(key, entry)
+    return entry
+
+
+def as_data_url(entry: Tuple[str, bytes, str]) -> str:
+    _etag, content, media_type = entry
+    return f"data:{media_type};base64,{base64.b64encode(content).decode()}"
@@ -0,0 +1,405 @@
+# backend/app/services/ticket_renderer.py
+
+"""
+Tickets de orden (cliente y taller) generados en el backend.
+
+El diseño de cada ticket vive en la sucursal como cadenas JSON y HTML
+(`client_header_style`, `client_body_content`, `client_body_style` y sus equivalentes
+`workshop_*`), que se editan desde la configuración de tickets. Cada plantilla se
+"compila" una sola vez por sucursal y tipo de ticket:
+  - se parsean los estilos JSON y se arma el CSS;
+  - el cuerpo se parte en tramos de texto fijo y variables ([NUMERO_ORDEN], ...), tanto en
+    HTML como en texto plano (para impresoras térmicas).
+Imprimir un ticket solo reemplaza las variables con los datos de la orden.
+
+Las plantillas compiladas se descartan cuando cambia la sucursal: PUT
+/branches/{id}/ticket-config invalida la caché de referencia de sucursales y ese aviso
+(bus de invalidación) también vacía esta caché en todos los workers. Además cada
+plantilla guarda las cadenas de las que salió y se recompila si ya no coinciden.
+
+Formatos: html (documento para imprimir desde el navegador), text (texto plano en
+columnas) y escpos (bytes para impresoras térmicas ESC/POS, con el QR nativo de la
+impresora y corte de papel).
+"""
+
+import html
+import json
+import re
+import textwrap
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.cache import invalidation_bus
+from app.core.config import settings
+from app.core.reference_cache import REFERENCE_NAMESPACE
+from app.services import qr_codes
+
+KINDS = ("client", "workshop")
+FORMATS = {
+    "html": "text/html; charset=utf-8",
+    "text": "text/plain; charset=utf-8",
+    "escpos": "application/octet-stream",
+}
+DEFAULT_COMPANY_NAME = "TECNO MUNDO"
+
+
+def _date(value) -> str:
+    return f"{value.day}/{value.month}/{value.year}" if value else "N/A"
+
+
+def _money(value) -> str:
+    return f"${float(value or 0):.2f}"
+
+
+def _customer_name(order) -> str:
+    if not order.customer:
+        return "N/A"
+    return f"{order.customer.first_name or ''} {order.customer.last_name or ''}".strip()
+
+
+# Variables de las plantillas (las mismas que el editor de tickets del frontend)
+VARIABLES: Dict[str, Callable] = {
+    "NUMERO_ORDEN": lambda o: str(o.id).zfill(8),
+    "FECHA_ORDEN": lambda o: _date(o.created_at),
+    "FECHA_INGRESO": lambda o: _date(o.created_at),
+    "ESTADO_DISPOSITIVO": lambda o: o.status.status_name if o.status else "Pendiente",
+    "NOMBRE_CLIENTE": _customer_name,
+    "TELEFONO_CLIENTE": lambda o: (o.customer.phone_number if o.customer else None) or "N/A",
+    "DNI_CLIENTE": lambda o: (o.customer.dni if o.customer else None) or "N/A",
+    "TIPO_DISPOSITIVO": lambda o: o.device_type.type_name if o.device_type else "N/A",
+    "MODELO_DISPOSITIVO": lambda o: o.device_model or "N/A",
+    "NUMERO_SERIE": lambda o: o.serial_number or "N/A",
+    "ACCESORIOS": lambda o: o.accesories or "Ninguno",
+    "DESCRIPCION_PROBLEMA": lambda o: o.problem_description or "N/A",
+    "OBSERVACIONES": lambda o: o.observations or "Ninguna",
+    "CLAVE_PATRON": lambda o: o.password_or_pattern or "N/A",
+    "ADELANTO": lambda o: _money(o.deposit),
+    "COSTO_TOTAL": lambda o: _money(o.total_cost),
+    "SALDO": lambda o: _money((o.total_cost or 0) - (o.deposit or 0)),
+    "REPUESTO": lambda o: o.parts_used or "N/A",
+    "TECNICO_ASIGNADO": lambda o: o.technician.username if o.technician else "No asignado",
+    "DIAGNOSTICO_TECNICO": lambda o: o.technician_diagnosis or "Pendiente",
+    "NOTAS_TECNICO": lambda o: o.repair_notes or "N/A",
+    "NOMBRE_SUCURSAL": lambda o: o.branch.branch_name if o.branch else "N/A",
+    "NOMBRE_EMPRESA": lambda o: (o.branch.company_name if o.branch else None) or DEFAULT_COMPANY_NAME,
+    "DIRECCION_SUCURSAL": lambda o: (o.branch.address if o.branch else None) or "N/A",
+    "TELEFONO_SUCURSAL": lambda o: (o.branch.phone if o.branch else None) or "N/A",
+    "EMAIL_SUCURSAL": lambda o: (o.branch.email if o.branch else None) or "N/A",
+}
+_VARIABLE_RE = re.compile(r"\[(" + "|".join(VARIABLES) + r")\]")
+
+# Cuerpo por defecto cuando la sucursal no configuró uno (igual al de los tickets del frontend)
+DEFAULT_BODIES = {
+    "client": (
+        '<h3 class="title">Orden de ingreso</h3>'
+        '<p class="number">N° [NUMERO_ORDEN]</p>'
+        "<p><b>Fecha:</b> [FECHA_ORDEN]</p>"
+        "<p><b>Cliente:</b> [NOMBRE_CLIENTE]</p>"
+        "<p><b>Telefono:</b> [TELEFONO_CLIENTE]</p>"
+        "<p><b>Modelo:</b></p><p class=\"indent\">[TIPO_DISPOSITIVO] [MODELO_DISPOSITIVO]</p>"
+        "<p><b>Falla:</b></p><p class=\"indent\">[DESCRIPCION_PROBLEMA]</p>"
+        "<p><b>Adelanto:</b></p><p class=\"indent\">[ADELANTO]</p>"
+        "<p><b>Observaciones:</b></p><p class=\"indent\">[OBSERVACIONES]</p>"
+    ),
+    "workshop": (
+        '<h3 class="title">Orden de Taller</h3>'
+        '<p class="number">N° [NUMERO_ORDEN]</p>'
+        "<p><b>Dispositivo:</b></p><p class=\"indent\">[TIPO_DISPOSITIVO] - [MODELO_DISPOSITIVO]</p>"
+        "<p><b>Cliente:</b></p><p class=\"indent\">[NOMBRE_CLIENTE]</p>"
+    ),
+}
+
+# Fin de bloque HTML -> salto de línea en la versión de texto
+_BLOCK_END_RE = re.compile(r"<br\s*/?>|</(p|div|h[1-6]|li|tr)\s*>", re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def _parse_json(raw: Optional[str]) -> dict:
+    try:
+        parsed = json.loads(raw or "{}")
+    except ValueError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def _css_value(value, default: str) -> str:
+    # Los estilos vienen de la configuración: sin caracteres que cierren la regla CSS
+    text = str(value if value not in (None, "") else default)
+    return re.sub(r"[;{}<>\"]", "", text)
+
+
+def _split(template: str) -> List[Tuple[bool, str]]:
+    """Tramos (es_variable, texto) de la plantilla."""
+    parts = []
+    position = 0
+    for match in _VARIABLE_RE.finditer(template):
+        if match.start() > position:
+            parts.append((False, template[position:match.start()]))
+        parts.append((True, match.group(1)))
+        position = match.end()
+    if position < len(template):
+        parts.append((False, template[position:]))
+    return parts
+
+
+def _html_to_text(content: str) -> str:
+    text = _BLOCK_END_RE.sub("\n", content)
+    text = html.unescape(_TAG_RE.sub("", text))
+    return "\n".join(line.strip() for line in text.strip("\n").split("\n"))
+
+
+class CompiledTicket:
+    """Plantilla de un tipo de ticket de una sucursal, lista para reemplazar variables."""
+
+    def __init__(self, kind: str, header_style: Optional[str], body_content: Optional[str], body_style: Optional[str]):
+        self.kind = kind
+        self.header = _parse_json(header_style)
+        self.header.setdefault("showLogo", True)
+        parsed_body = _parse_json(body_style)
+        self.body = parsed_body.get("config") if isinstance(parsed_body.get("config"), dict) else parsed_body
+        styled_content = parsed_body.get("styledContent")
+        if isinstance(styled_content, str) and styled_content.strip():
+            content = styled_content
+        else:
+            content = body_content or ""
+        self.has_custom_body = bool(content.strip())
+        if self.has_custom_body:
+            # El editor guarda saltos de línea literales: en el ticket son <br/>
+            html_content = content.replace("\n", "<br/>")
+        else:
+            html_content = DEFAULT_BODIES[kind]
+        self.html_parts = _split(html_content)
+        self.text_parts = _split(_html_to_text(html_content))
+        self.css = self._build_css()
+
+    def _build_css(self) -> str:
+        header, body = self.header, self.body
+        css = [
+            "@page { size: 80mm auto; margin: 2mm; }",
+            "html, body { margin: 0; background: #fff; color: #000; }",
+            f".ticket {{ width: 76mm; padding: 4px; font-family: {_css_value(body.get('bodyFontFamily'), 'monospace')}; }}",
+            f"header {{ font-family: {_css_value(header.get('headerFontFamily'), 'monospace')}; "
+            f"font-size: {_css_value(header.get('headerFontSize'), '14px')}; "
+            f"text-align: {_css_value(header.get('headerAlignment'), 'center')}; margin-bottom: 8px; }}",
+            f".company {{ font-size: {_css_value(header.get('companyNameFontSize'), '24px')}; "
+            "font-weight: bold; letter-spacing: 0.1em; margin-bottom: 2px; }",
+            f".contact {{ font-size: {_css_value(header.get('contactInfoFontSize'), '12px')}; margin: 2px 0; }}",
+            "hr { border: 0; border-top: 1px dashed #000; margin: 8px 0; }",
+            f".body {{ font-size: {_css_value(body.get('bodyFontSize'), '12px')}; "
+            f"line-height: {_css_value(body.get('bodyLineHeight'), '1.4')}; "
+            f"text-align: {_css_value(body.get('bodyAlignment'), 'left')}; }}",
+            ".body p { margin: 0; } .body .indent { margin-left: 8px; }",
+            ".body .title { text-align: center; font-size: 14px; margin: 0 0 8px; }",
+            ".body .number { text-align: center; font-weight: bold; font-size: 16px; margin-bottom: 8px; }",
+            "footer { text-align: center; margin-top: 16px; }",
+            ".signature { height: 64px; border-bottom: 1px solid #000; width: 75%; margin: 0 auto; }",
+            f".qr-text {{ font-size: {_css_value(body.get('qrTextSizePx'), '11')}px; margin: 4px 0; }}",
+        ]
+        selected = {
+            "font-size": body.get("selectedTextFontSize"),
+            "font-weight": body.get("selectedTextFontWeight"),
+            "font-style": body.get("selectedTextFontStyle"),
+            "text-decoration": body.get("selectedTextDecoration"),
+            "text-align": body.get("selectedTextAlignment"),
+        }
+        rules = " ".join(f"{prop}: {_css_value(value, '')} !important;" for prop, value in selected.items() if value)
+        if rules:
+            css.append(f".selected-text {{ {rules} }}")
+        return "\n".join(css)
+
+    def qr_size(self) -> int:
+        try:
+            return max(64, min(int(float(self.body.get("qrSizePx") or 96)), 512))
+        except (TypeError, ValueError):
+            return 96
+
+
+_lock = threading.Lock()
+# (branch_id, tipo) -> (cadenas de origen, CompiledTicket)
+_templates: Dict[Tuple[Optional[int], str], Tuple[tuple, CompiledTicket]] = {}
+
+
+def _apply_invalidation(table: Optional[str]) -> None:
+    if table in (None, "branch"):
+        with _lock:
+            _templates.clear()
+
+
+invalidation_bus.register(REFERENCE_NAMESPACE, _apply_invalidation)
+
+
+def get_template(branch, kind: str) -> CompiledTicket:
+    """Plantilla compilada del ticket `kind` de la sucursal (compilada una vez y reutilizada)."""
+    prefix = f"{kind}_"
+    sources = tuple(
+        getattr(branch, prefix + field, None) if branch is not None else None
+        for field in ("header_style", "body_content", "body_style")
+    )
+    key = (branch.id if branch is not None else None, kind)
+    with _lock:
+        cached = _templates.get(key)
+    if cached is not None and cached[0] == sources:
+        return cached[1]
+    template = CompiledTicket(kind, *sources)
+    with _lock:
+        _templates[key] = (sources, template)
+    return template
+
+
+def _values(order) -> Dict[str, str]:
+    return {name: str(value(order)) for name, value in VARIABLES.items()}
+
+
+def _fill(parts: List[Tuple[bool, str]], values: Dict[str, str], escape: bool) -> str:
+    if escape:
+        return "".join(html.escape(values[text]).replace("\n", "<br/>") if is_var else text for is_var, text in parts)
+    return "".join(values[text] if is_var else text for is_var, text in parts)
+
+
+def _header_lines(template: CompiledTicket, branch) -> Tuple[Optional[str], List[str], Optional[str]]:
+    """(nombre de la empresa, líneas de contacto, nombre de la sucursal) según la cabecera."""
+    header = template.header
+    if template.kind == "workshop" and header.get("showHeader") is False:
+        return None, [], None
+    # El logo se dibuja en el frontend; en el backend se imprime el nombre de la empresa
+    company = None
+    if header.get("showLogo") or header.get("showCompanyName") is not False:
+        company = (branch.company_name if branch else None) or DEFAULT_COMPANY_NAME
+    contact = []
+    if branch is not None and header.get("showContactInfo") is not False:
+        for flag, value in (("showAddress", branch.address), ("showPhone", branch.phone), ("showEmail", branch.email)):
+            if header.get(flag) is not False and value:
+                contact.append(value)
+    branch_name = branch.branch_name if branch is not None and header.get("showBranchName") is not False else None
+    return company, contact, branch_name
+
+
+def _qr_texts(template: CompiledTicket) -> Tuple[str, str]:
+    body = template.body
+    bottom = body.get("qrBottomText") or "O ingrese N° de orden en tecnoapp.ar (Clientes)"
+    return body.get("qrTopText") or "Escaneá para ver tu orden", bottom
+
+
+def render_html(order, kind: str) -> str:
+    template = get_template(order.branch, kind)
+    values = _values(order)
+    company, contact, branch_name = _header_lines(template, order.branch)
+    parts = ["<header>"]
+    if company:
+        parts.append(f'<div class="company">{html.escape(company)}</div>')
+    parts += [f'<p class="contact">{html.escape(line)}</p>' for line in contact]
+    if branch_name:
+        parts.append(f'<p class="contact"><b>{html.escape(branch_name)}</b></p>')
+    parts.append("</header>")
+    if template.header.get("showDivider") is not False:
+        parts.append("<hr/>")
+    parts.append(f'<div class="body">{_fill(template.html_parts, values, escape=True)}</div>')
+
+    _etag, qr_svg, _media_type = qr_codes.get_qr(qr_codes.order_portal_url(order.id), template.qr_size(), "svg")
+    top_text, bottom_text = _qr_texts(template)
+    parts += [
+        '<footer><div class="signature"></div><p class="qr-text">Firma del Cliente</p>',
+        f'<p class="qr-text">{html.escape(top_text)}</p>',
+        qr_svg.decode(),
+        f'<p class="qr-text">{html.escape(bottom_text)}</p></footer>',
+    ]
+    title = f"Orden N° {values['NUMERO_ORDEN']}"
+    return (
+        f'<!DOCTYPE html><html lang="es"><head><meta charset="utf-8"><title>{title}</title>'
+        f"<style>{template.css}</style></head><body><div class=\"ticket\">{''.join(parts)}</div></body></html>"
+    )
+
+
+def _wrap(text: str, columns: int) -> List[str]:
+    lines = []
+    for line in text.split("\n"):
+        lines += textwrap.wrap(line, columns) or [""]
+    return lines
+
+
+def _text_sections(order, kind: str, columns: int):
+    """(plantilla, cabecera centrada, cuerpo, pie centrado) como listas de líneas."""
+    template = get_template(order.branch, kind)
+    company, contact, branch_name = _header_lines(template, order.branch)
+    header = [line for line in [company, *contact, branch_name] if line]
+    header = [wrapped for line in header for wrapped in _wrap(line, columns)]
+    if template.header.get("showDivider") is not False:
+        header.append("-" * columns)
+    body = _wrap(_fill(template.text_parts, _values(order), escape=False), columns)
+    return template, header, body
+
+
+def render_text(order, kind: str) -> str:
+    columns = settings.TICKET_TEXT_COLUMNS
+    template, header, body = _text_sections(order, kind, columns)
+    top_text, bottom_text = _qr_texts(template)
+    footer = ["", "", "_" * (columns * 3 // 4), "Firma del Cliente", "", top_text,
+              *_wrap(qr_codes.order_portal_url(order.id), columns), *_wrap(bottom_text, columns)]
+    lines = [line.center(columns).rstrip() for line in header] + body + [line.center(columns).rstrip() for line in footer]
+    return "\n".join(lines) + "\n"
+
+
+# Comandos ESC/POS
+_ESC_INIT = b"\x1b@"
+_ESC_CODEPAGE_PC858 = b"\x1bt\x13"  # Latinoamérica/Europa occidental, con ñ, tildes y €
+_ESC_ALIGN_LEFT = b"\x1ba\x00"
+_ESC_ALIGN_CENTER = b"\x1ba\x01"
+_ESC_BOLD_ON = b"\x1bE\x01"
+_ESC_BOLD_OFF = b"\x1bE\x00"
+_GS_DOUBLE_SIZE = b"\x1d!\x11"
+_GS_NORMAL_SIZE = b"\x1d!\x00"
+_GS_CUT = b"\x1dVB\x00"  # avanza y corta
+
+
+def _escpos_text(text: str) -> bytes:
+    return text.encode("cp858", errors="replace") + b"\n"
+
+
+def _escpos_qr(data: str, size_px: int) -> bytes:
+    """QR dibujado por la impresora (GS ( k): no se envía ninguna imagen."""
+    payload = data.encode("ascii", errors="replace")
+    module = max(3, min(size_px // 16, 8))
+    store_length = len(payload) + 3
+
+    def command(body: bytes) -> bytes:
+        return b"\x1d(k" + bytes([len(body) % 256, len(body) // 256]) + body
+
+    return (
+        command(b"\x31\x41\x32\x00")           # modelo 2
+        + command(b"\x31\x43" + bytes([module]))  # tamaño del módulo
+        + command(b"\x31\x45\x31")             # corrección de errores M
+        + b"\x1d(k" + bytes([store_length % 256, store_length // 256]) + b"\x31\x50\x30" + payload
+        + command(b"\x31\x51\x30")             # imprimir
+    )
+
+
+def render_escpos(order, kind: str) -> bytes:
+    columns = settings.TICKET_TEXT_COLUMNS
+    template, header, body = _text_sections(order, kind, columns)
+    top_text, bottom_text = _qr_texts(template)
+    out = bytearray(_ESC_INIT + _ESC_CODEPAGE_PC858 + _ESC_ALIGN_CENTER)
+    company, _contact, _branch_name = _header_lines(template, order.branch)
+    for index, line in enumerate(header):
+        if index == 0 and company and line == company[:columns]:
+            out += _ESC_BOLD_ON + _GS_DOUBLE_SIZE + _escpos_text(line) + _GS_NORMAL_SIZE + _ESC_BOLD_OFF
+        else:
+            out += _escpos_text(line)
+    out += _ESC_ALIGN_LEFT
+    for line in body:
+        out += _escpos_text(line)
+    out += _ESC_ALIGN_CENTER + b"\n\n" + _escpos_text("_" * (columns * 3 // 4)) + _escpos_text("Firma del Cliente")
+    out += b"\n" + _escpos_text(top_text)
+    out += _escpos_qr(qr_codes.order_portal_url(order.id), template.qr_size())
+    for line in _wrap(bottom_text, columns):
+        out += _escpos_text(line)
+    out += b"\n\n\n" + _GS_CUT
+    return bytes(out)
+
+
+def render(order, kind: str, fmt: str):
+    """Contenido del ticket y su media type."""
+    if fmt == "escpos":
+        return render_escpos(order, kind), FORMATS[fmt]
+    if fmt == "text":
+        return render_text(order, kind), FORMATS[fmt]
+    return render_html(order, kind), FORMATS[fmt]
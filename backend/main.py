@@ -5,21 +5,37 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.api.v1.api import api_router
 from app.db.base import init_db
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from uuid import uuid4
 from app.core.logger import structured_logger, ErrorCategory, ErrorSeverity
+from app.core.rate_limit import RateLimitMiddleware
+from app.db import query_stats
+from app.db.partitions import partition_maintenance_loop
+import asyncio
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # init_db() # Mantenemos esto comentado ya que tus tablas ya existen
+    # Migraciones pendientes solo si DB_AUTO_MIGRATE=true (ver backend/migrations)
+    await run_in_threadpool(init_db)
+    # Particiones mensuales futuras de system.record (ver app/db/partitions.py)
+    maintenance = None
+    if settings.RECORD_PARTITION_CHECK_HOURS > 0:
+        maintenance = asyncio.create_task(partition_maintenance_loop(settings.RECORD_PARTITION_CHECK_HOURS))
     yield
-    pass
+    if maintenance is not None:
+        maintenance.cancel()
 
 app = FastAPI(title="Servicio Técnico Pro API", lifespan=lifespan)
 
+# Límite de requests por IP en rutas públicas (ver app/core/rate_limit.py). Se agrega antes
+# que CORS para quedar dentro de él: los 429 llevan los headers CORS y el navegador los ve
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
 # --- CONFIGURACIÓN DE CORS: ahora toma orígenes desde settings ---
 origins = settings.ALLOWED_ORIGINS
 
@@ -29,6 +45,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"], # Permite todos los métodos
     allow_headers=["*"], # Permite todas las cabeceras
+    expose_headers=["X-Next-Cursor", "Retry-After"], # Cursor de paginación y espera ante un 429
 )
 
 class RequestIdMiddleware(BaseHTTPMiddleware):
@@ -39,6 +56,20 @@ class RequestIdMiddleware(BaseHTTPMiddleware):
         response.headers["X-Request-Id"] = request_id
         return response
 
+class QueryStatsMiddleware(BaseHTTPMiddleware):
+    """Cuenta las consultas SQL y su duración por request (headers Server-Timing y X-DB-Queries)."""
+
+    async def dispatch(self, request: Request, call_next):
+        with query_stats.track_queries() as stats:
+            response = await call_next(request)
+        route = request.scope.get("route")
+        query_stats.warn_repeated(stats, f"{request.method} {getattr(route, 'path', request.url.path)}")
+        response.headers.update(query_stats.response_headers(stats))
+        return response
+
+if settings.DB_QUERY_STATS_ENABLED:
+    app.add_middleware(QueryStatsMiddleware)
+
 app.add_middleware(RequestIdMiddleware)
 
 def _to_serializable(obj):
@@ -52,7 +83,7 @@ def _to_serializable(obj):
         return {k: _to_serializable(v) for k, v in obj.items()}
     return str(obj)
 
-def error_payload(code: str, message: str, request: Request, details: dict | None = None, status_code: int = 400):
+def error_payload(code: str, message: str, request: Request, details: dict | None = None, status_code: int = 400, headers: dict | None = None):
     payload = {
         "code": code,
         "message": message,
@@ -60,23 +91,31 @@ def error_payload(code: str, message: str, request: Request, details: dict | Non
         "request_id": getattr(request.state, "request_id", None),
         "detail": message
     }
-    return JSONResponse(status_code=status_code, content=payload)
+    return JSONResponse(status_code=status_code, content=payload, headers=headers)
+
+def _endpoint_label(request: Request) -> str:
+    """Método y plantilla de la ruta ("GET /api/v1/repair-orders/{order_id}"): agrupa los errores sin ids."""
+    route = request.scope.get("route")
+    return f"{request.method} {getattr(route, 'path', request.url.path)}"
+
+def _log_context(request: Request, extra: dict | None = None) -> dict:
+    return {"url": str(request.url), **(extra or {})}
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    structured_logger.log_error(exc, ErrorCategory.VALIDATION, ErrorSeverity.MEDIUM, {"errors": exc.errors()}, endpoint=str(request.url), request_id=getattr(request.state, "request_id", None))
+    structured_logger.log_error(exc, ErrorCategory.VALIDATION, ErrorSeverity.MEDIUM, _log_context(request, {"errors": exc.errors()}), endpoint=_endpoint_label(request), request_id=getattr(request.state, "request_id", None), status_code=422)
     return error_payload("validation_error", "Datos inválidos", request, {"errors": exc.errors()}, 422)
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     severity = ErrorSeverity.MEDIUM if exc.status_code < 500 else ErrorSeverity.HIGH
-    structured_logger.log_error(exc, ErrorCategory.API, severity, {"status_code": exc.status_code, "detail": exc.detail}, endpoint=str(request.url), request_id=getattr(request.state, "request_id", None))
+    structured_logger.log_error(exc, ErrorCategory.API, severity, _log_context(request, {"status_code": exc.status_code, "detail": exc.detail}), endpoint=_endpoint_label(request), request_id=getattr(request.state, "request_id", None), status_code=exc.status_code)
     message = exc.detail if isinstance(exc.detail, str) else "Error de solicitud"
-    return error_payload("http_error", message, request, {"status_code": exc.status_code}, exc.status_code)
+    return error_payload("http_error", message, request, {"status_code": exc.status_code}, exc.status_code, getattr(exc, "headers", None))
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
-    structured_logger.log_error(exc, ErrorCategory.SYSTEM, ErrorSeverity.CRITICAL, {}, endpoint=str(request.url), request_id=getattr(request.state, "request_id", None))
+    structured_logger.log_error(exc, ErrorCategory.SYSTEM, ErrorSeverity.CRITICAL, _log_context(request), endpoint=_endpoint_label(request), request_id=getattr(request.state, "request_id", None), status_code=500)
     return error_payload("internal_error", "Error interno del servidor", request, {}, 500)
 
 @app.get("/")
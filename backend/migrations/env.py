@@ -0,0 +1,96 @@
+# backend/migrations/env.py
+
+"""
+Entorno de Alembic: usa el motor de app.db.session y los metadatos de app.models.
+
+Las tablas viven en los esquemas 'system' y 'customer'; la tabla de versiones de
+Alembic se guarda en 'system'. En PostgreSQL se toma un advisory lock durante la
+migración para que varios workers/instancias arrancando a la vez no migren en paralelo.
+
+El advisory lock y los CREATE INDEX CONCURRENTLY necesitan una sesión estable: las
+migraciones deben correr contra la conexión directa (puerto 5432), no contra el pooler
+en modo transacción (6543).
+"""
+
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import event, text
+
+from app.db.base import Base
+from app.db.pool_metrics import without_statement_timeout
+from app.db.session import engine
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+MANAGED_SCHEMAS = {"system", "customer"}
+VERSION_TABLE_SCHEMA = "system"
+# Clave arbitraria del advisory lock de migraciones
+MIGRATION_LOCK_KEY = 7412031
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # Ignorar objetos fuera de los esquemas de la aplicación (auth, storage, ... de Supabase)
+    if type_ == "table":
+        return obj.schema in MANAGED_SCHEMAS
+    return True
+
+
+def _configure(**kwargs):
+    context.configure(
+        target_metadata=target_metadata,
+        include_schemas=True,
+        include_object=include_object,
+        version_table_schema=VERSION_TABLE_SCHEMA,
+        compare_type=True,
+        **kwargs,
+    )
+
+
+def run_migrations_offline() -> None:
+    """Genera el SQL sin conectarse (alembic upgrade head --sql)."""
+    _configure(url=engine.url.render_as_string(hide_password=False), literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _close_driver_transaction(conn, opts) -> None:
+    """
+    pg8000 abre una transacción en el servidor con cualquier consulta, incluida la que hace
+    autocommit_block para leer el nivel de aislamiento actual. Al pasar a AUTOCOMMIT esa
+    transacción seguiría abierta y CREATE INDEX CONCURRENTLY fallaría; se cierra antes.
+    """
+    if opts.get("isolation_level") == "AUTOCOMMIT":
+        conn.connection.dbapi_connection.commit()
+
+
+def run_migrations_online() -> None:
+    with engine.connect() as connection:
+        is_postgres = connection.dialect.name == "postgresql"
+        if is_postgres:
+            event.listen(connection, "set_connection_execution_options", _close_driver_transaction)
+            # Sin statement_timeout: crear índices o copiar tablas grandes puede tardar. El SET
+            # de sesión cubre lo que corre fuera de una transacción (CREATE INDEX CONCURRENTLY);
+            # dentro de cada transacción el hook de pool_metrics aplicaría su SET LOCAL, así
+            # que se marca la conexión para que ponga statement_timeout = 0.
+            without_statement_timeout(connection)
+            connection.execute(text("SET statement_timeout = 0"))
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            connection.commit()
+        try:
+            _configure(connection=connection)
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            if is_postgres:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                connection.commit()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,57 @@
+"""Índices compuestos para los filtros calientes
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+Primera revisión versionada. El esquema existente (creado a mano y con los scripts
+de backend/scripts/add_*.py) se toma como punto de partida; esta revisión solo agrega
+los índices que usan los listados de órdenes, notificaciones, suscripciones y el
+historial de registros. Se crean con CONCURRENTLY para no bloquear escrituras.
+"""
+
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (nombre, tabla, esquema, columnas)
+INDEXES = [
+    ("ix_repair_order_branch_created", "repair_order", "customer", ["branch_id", "created_at"]),
+    ("ix_repair_order_status_id", "repair_order", "customer", ["status_id"]),
+    ("ix_repair_order_customer_created", "repair_order", "customer", ["customer_id", "created_at"]),
+    ("ix_email_subscription_order_email", "email_subscription", "customer", ["order_id", "email"]),
+    ("ix_notifications_user_created", "notifications", "system", ["user_id", "created_at"]),
+    ("ix_record_order_created", "record", "system", ["order_id", "created_at"]),
+]
+
+
+def _postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, schema, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                schema=schema,
+                if_not_exists=True,
+                postgresql_concurrently=_postgres(),
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, schema, columns in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                schema=schema,
+                if_exists=True,
+                postgresql_concurrently=_postgres(),
+            )
@@ -0,0 +1,54 @@
+"""Índices del historial de registros por fecha
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+
+GET /records ordena por (created_at, id) y pagina con cursor. El índice sobre
+(created_at, id) sirve al listado general y a los filtros de rango de fechas; los
+compuestos por sucursal sirven a cada rama del UNION del filtro origen/destino, que así
+lee solo las primeras filas de cada índice en lugar de ordenar todo el historial.
+"""
+
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# (nombre, tabla, esquema, columnas)
+INDEXES = [
+    ("ix_record_created_id", "record", "system", ["created_at", "id"]),
+    ("ix_record_origin_branch_created", "record", "system", ["origin_branch_id", "created_at"]),
+    ("ix_record_target_branch_created", "record", "system", ["target_branch_id", "created_at"]),
+]
+
+
+def _postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, schema, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                schema=schema,
+                if_not_exists=True,
+                postgresql_concurrently=_postgres(),
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, schema, columns in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                schema=schema,
+                if_exists=True,
+                postgresql_concurrently=_postgres(),
+            )
@@ -0,0 +1,172 @@
+"""Particionado mensual de system.record
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+Convierte el historial de auditoría en una tabla particionada por rango mensual sobre
+created_at (ver app.db.partitions). PostgreSQL no convierte una tabla existente en
+particionada, así que la revisión:
+  1. renombra la tabla actual a record_legacy (bloqueo exclusivo durante toda la revisión),
+  2. crea system.record particionada con las mismas columnas, la partición por defecto y
+     un mes por cada mes con datos hasta MONTHS_AHEAD meses adelante (los siguientes los
+     crea app.db.partitions al arrancar la aplicación),
+  3. copia las filas, elimina la tabla vieja y recrea índices, claves foráneas y secuencia.
+
+La clave primaria pasa a ser (id, created_at): en una tabla particionada debe incluir la
+columna de partición. Los ids siguen saliendo de una única secuencia.
+
+Corre en una sola transacción y reescribe la tabla completa: conviene aplicarla en una
+ventana de poco tráfico. En otros motores no hace nada.
+
+Decide qué hacer según el estado de la base (si ya está particionada, sus claves foráneas,
+el rango de fechas), así que no se puede generar como SQL: falla en modo offline
+(alembic upgrade --sql). El SQL está en la revisión y no en app.db.partitions, para que
+cambios posteriores a ese módulo no alteren lo que hace esta revisión.
+"""
+
+from datetime import date
+
+from alembic import context, op
+from sqlalchemy import text
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# (nombre, columnas): los índices de Record en app/models/record.py
+INDEXES = [
+    ("ix_system_record_id", ["id"]),
+    ("ix_system_record_id_even_type", ["id_even_type"]),
+    ("ix_system_record_order_id", ["order_id"]),
+    ("ix_system_record_actor_user_id", ["actor_user_id"]),
+    ("ix_system_record_origin_branch_id", ["origin_branch_id"]),
+    ("ix_system_record_target_branch_id", ["target_branch_id"]),
+    ("ix_record_order_created", ["order_id", "created_at"]),
+    ("ix_record_created_id", ["created_at", "id"]),
+    ("ix_record_origin_branch_created", ["origin_branch_id", "created_at"]),
+    ("ix_record_target_branch_created", ["target_branch_id", "created_at"]),
+]
+
+
+# Meses creados por adelantado (el valor por defecto de RECORD_PARTITION_MONTHS_AHEAD)
+MONTHS_AHEAD = 3
+
+
+def _require_online() -> None:
+    if context.is_offline_mode():
+        raise RuntimeError(
+            "La revisión 0003 (particionado de system.record) consulta la base y requiere modo "
+            "online: aplicarla con 'alembic upgrade 0003' antes de generar SQL desde esa revisión."
+        )
+
+
+def _is_partitioned(bind) -> bool:
+    relkind = bind.execute(
+        text(
+            "SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE n.nspname = 'system' AND c.relname = 'record'"
+        )
+    ).scalar()
+    return relkind == "p"
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_partitions(first) -> None:
+    """Partición por defecto y una por mes desde `first` hasta MONTHS_AHEAD meses adelante."""
+    op.execute("CREATE TABLE system.record_default PARTITION OF system.record DEFAULT")
+    current = date.today().replace(day=1)
+    month = min(date(first.year, first.month, 1), current) if first else current
+    last = _add_months(current, MONTHS_AHEAD)
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE system.record_{month.year:04d}_{month.month:02d} PARTITION OF system.record "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+
+
+def _foreign_keys(bind, table: str):
+    return bind.execute(
+        text(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = CAST(:table AS regclass) AND contype = 'f' ORDER BY conname"
+        ),
+        {"table": table},
+    ).all()
+
+
+def _swap_table(bind, old_name: str, create_sql: str, primary_key: str, before_copy=None) -> None:
+    """
+    Renombra system.record a `old_name`, crea la nueva con `create_sql` y le pasa datos,
+    secuencia de ids, índices y claves foráneas. `before_copy(old_table)` prepara la tabla
+    nueva antes de copiar las filas. Común a upgrade y downgrade.
+    """
+    # La copia y los índices sobre el historial completo superan cualquier statement_timeout
+    # (env.py ya lo desactiva; se repite por si la revisión corre con otro entorno)
+    op.execute("SET LOCAL statement_timeout = 0")
+    op.execute("LOCK TABLE system.record IN ACCESS EXCLUSIVE MODE")
+    foreign_keys = _foreign_keys(bind, "system.record")
+    old_sequence = bind.execute(text("SELECT pg_get_serial_sequence('system.record', 'id')")).scalar()
+    old_table = f"system.{old_name}"
+
+    op.execute(f"ALTER TABLE system.record RENAME TO {old_name}")
+    if old_sequence:
+        op.execute(f"ALTER SEQUENCE {old_sequence} RENAME TO {old_name}_id_seq")
+    op.execute(create_sql.format(old=old_table))
+    op.execute("CREATE SEQUENCE system.record_id_seq")
+    op.execute("ALTER TABLE system.record ALTER COLUMN id SET DEFAULT nextval('system.record_id_seq')")
+    if before_copy is not None:
+        before_copy(old_table)
+
+    op.execute(f"INSERT INTO system.record SELECT * FROM {old_table}")
+    op.execute("SELECT setval('system.record_id_seq', COALESCE((SELECT max(id) FROM system.record), 0) + 1, false)")
+    op.execute(f"DROP TABLE {old_table}")
+    op.execute("ALTER SEQUENCE system.record_id_seq OWNED BY system.record.id")
+
+    op.execute(f"ALTER TABLE system.record ADD CONSTRAINT record_pkey PRIMARY KEY ({primary_key})")
+    for name, columns in INDEXES:
+        op.create_index(name, "record", columns, schema="system")
+    for name, definition in foreign_keys:
+        op.execute(f"ALTER TABLE system.record ADD CONSTRAINT {name} {definition}")
+
+
+def upgrade() -> None:
+    if op.get_context().dialect.name != "postgresql":
+        return
+    _require_online()
+    bind = op.get_bind()
+    if _is_partitioned(bind):
+        return
+
+    def create_partitions(old_table: str) -> None:
+        # created_at es la clave de partición: no puede ser nula
+        op.execute(f"UPDATE {old_table} SET created_at = now() WHERE created_at IS NULL")
+        op.execute("ALTER TABLE system.record ALTER COLUMN created_at SET NOT NULL")
+        first = bind.execute(text(f"SELECT min(created_at) FROM {old_table}")).scalar()
+        _create_partitions(first)
+
+    _swap_table(
+        bind,
+        "record_legacy",
+        "CREATE TABLE system.record (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)",
+        "id, created_at",
+        create_partitions,
+    )
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name != "postgresql":
+        return
+    _require_online()
+    bind = op.get_bind()
+    if not _is_partitioned(bind):
+        return
+    _swap_table(bind, "record_partitioned", "CREATE TABLE system.record (LIKE {old} INCLUDING DEFAULTS)", "id")
+    op.execute("ALTER TABLE system.record ALTER COLUMN created_at DROP NOT NULL")
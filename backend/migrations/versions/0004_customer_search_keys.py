@@ -0,0 +1,97 @@
+"""Claves normalizadas e índices de prefijo para el autocompletado de clientes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+
+Agrega a customer.customer las columnas dni_digits, phone_digits, name_key y
+name_key_rev (ver app.services.customer_autocomplete), las completa por lotes con la
+misma normalización que usa la aplicación y crea sus índices con text_pattern_ops, que
+permiten resolver `LIKE 'prefijo%'` con un índice sea cual sea la collation de la base.
+Los índices se crean con CONCURRENTLY para no bloquear las altas de clientes.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.services.customer_autocomplete import search_keys
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+SCHEMA = "customer"
+TABLE = "customer"
+COLUMNS = ["dni_digits", "phone_digits", "name_key", "name_key_rev"]
+# (nombre, columna): los índices de Customer en app/models/customer.py
+INDEXES = [
+    ("ix_customer_dni_digits", "dni_digits"),
+    ("ix_customer_phone_digits", "phone_digits"),
+    ("ix_customer_name_key", "name_key"),
+    ("ix_customer_name_key_rev", "name_key_rev"),
+]
+BATCH_SIZE = 1000
+
+
+def _postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def _backfill(bind) -> None:
+    select_batch = sa.text(
+        f"SELECT id, first_name, last_name, dni, phone_number FROM {SCHEMA}.{TABLE} "
+        "WHERE id > :after ORDER BY id LIMIT :limit"
+    )
+    update = sa.text(
+        f"UPDATE {SCHEMA}.{TABLE} SET dni_digits = :dni_digits, phone_digits = :phone_digits, "
+        "name_key = :name_key, name_key_rev = :name_key_rev WHERE id = :id"
+    )
+    after = 0
+    while True:
+        rows = bind.execute(select_batch, {"after": after, "limit": BATCH_SIZE}).all()
+        if not rows:
+            return
+        bind.execute(
+            update,
+            [
+                {"id": row.id, **search_keys(row.first_name, row.last_name, row.dni, row.phone_number)}
+                for row in rows
+            ],
+        )
+        after = rows[-1].id
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    existing = {column["name"] for column in sa.inspect(bind).get_columns(TABLE, schema=SCHEMA)}
+    for column in COLUMNS:
+        if column not in existing:
+            op.add_column(TABLE, sa.Column(column, sa.String(), nullable=True), schema=SCHEMA)
+    _backfill(bind)
+
+    with op.get_context().autocommit_block():
+        for name, column in INDEXES:
+            op.create_index(
+                name,
+                TABLE,
+                [column],
+                schema=SCHEMA,
+                if_not_exists=True,
+                postgresql_ops={column: "text_pattern_ops"},
+                postgresql_concurrently=_postgres(),
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _column in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=TABLE,
+                schema=SCHEMA,
+                if_exists=True,
+                postgresql_concurrently=_postgres(),
+            )
+    for column in reversed(COLUMNS):
+        op.drop_column(TABLE, column, schema=SCHEMA)
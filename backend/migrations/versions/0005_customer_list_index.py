@@ -0,0 +1,51 @@
+"""Índice del listado de clientes por apellido
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+
+GET /customers ordena por (last_name, id) y pagina con cursor sobre esas columnas. Con
+este índice cada página lee solo sus filas desde el cursor, en lugar de ordenar toda la
+tabla de clientes. Se crea con CONCURRENTLY para no bloquear escrituras.
+"""
+
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# (nombre, tabla, esquema, columnas)
+INDEXES = [
+    ("ix_customer_last_name_id", "customer", "customer", ["last_name", "id"]),
+]
+
+
+def _postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, schema, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                schema=schema,
+                if_not_exists=True,
+                postgresql_concurrently=_postgres(),
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, schema, columns in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                schema=schema,
+                if_exists=True,
+                postgresql_concurrently=_postgres(),
+            )
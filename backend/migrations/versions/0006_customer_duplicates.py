@@ -0,0 +1,58 @@
+"""Pares de clientes duplicados y checkpoint de procesos por lotes
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+
+Crea customer.customer_duplicate (pares propuestos por scripts/find_duplicate_customers.py,
+ver app.services.customer_duplicates) y system.job_checkpoint (último id procesado por
+cada proceso incremental). Si init_db ya creó las tablas, no se tocan.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def _exists(table: str, schema: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(table, schema=schema)
+
+
+def upgrade() -> None:
+    if not _exists("customer_duplicate", "customer"):
+        op.create_table(
+            "customer_duplicate",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("customer_id", sa.Integer(), sa.ForeignKey("customer.customer.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("duplicate_id", sa.Integer(), sa.ForeignKey("customer.customer.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("score", sa.Float(), nullable=False),
+            sa.Column("reasons", sa.String(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False, server_default="pending"),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+            sa.Column("resolved_at", sa.DateTime(), nullable=True),
+            sa.Column("resolved_by", sa.Integer(), sa.ForeignKey("system.user.id", ondelete="SET NULL"), nullable=True),
+            sa.UniqueConstraint("customer_id", "duplicate_id", name="uq_customer_duplicate_pair"),
+            schema="customer",
+        )
+        op.create_index("ix_customer_duplicate_id", "customer_duplicate", ["id"], schema="customer")
+        op.create_index("ix_customer_duplicate_customer_id", "customer_duplicate", ["customer_id"], schema="customer")
+        op.create_index("ix_customer_duplicate_duplicate_id", "customer_duplicate", ["duplicate_id"], schema="customer")
+        op.create_index("ix_customer_duplicate_status_score", "customer_duplicate", ["status", "score"], schema="customer")
+
+    if not _exists("job_checkpoint", "system"):
+        op.create_table(
+            "job_checkpoint",
+            sa.Column("name", sa.String(), primary_key=True),
+            sa.Column("last_id", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+            schema="system",
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("job_checkpoint", schema="system")
+    op.drop_table("customer_duplicate", schema="customer")
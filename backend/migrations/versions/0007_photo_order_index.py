@@ -0,0 +1,52 @@
+"""Índice de fotos por orden
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+
+El portal de clientes lista las fotos de una orden paginadas por id
+(GET /client-orders/{order_id}/photos con cursor). Sin índice sobre order_id cada página
+recorre toda la tabla de fotos, que es la más pesada de la base (imágenes en base64).
+Se crea con CONCURRENTLY para no bloquear la carga de fotos.
+"""
+
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# (nombre, tabla, esquema, columnas)
+INDEXES = [
+    ("ix_repair_order_photo_order_id_id", "repair_order_photo", "customer", ["order_id", "id"]),
+]
+
+
+def _postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, schema, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                schema=schema,
+                if_not_exists=True,
+                postgresql_concurrently=_postgres(),
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, schema, columns in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                schema=schema,
+                if_exists=True,
+                postgresql_concurrently=_postgres(),
+            )
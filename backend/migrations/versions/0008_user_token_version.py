@@ -0,0 +1,43 @@
+"""Columna token_version en system.user
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+
+La versión de los tokens se firma en el JWT ("ver") y se incrementa al cambiar rol,
+sucursal, estado o contraseña del usuario, revocando los tokens emitidos antes (ver
+app.core.auth_cache). Reemplaza al script backend/scripts/add_user_token_version_column.py:
+en PostgreSQL usa ADD COLUMN IF NOT EXISTS, así que no falla en bases donde ya se corrió.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+SCHEMA = "system"
+TABLE = "user"
+COLUMN = "token_version"
+
+
+def upgrade() -> None:
+    if op.get_context().dialect.name == "postgresql":
+        op.execute(
+            f'ALTER TABLE {SCHEMA}."{TABLE}" ADD COLUMN IF NOT EXISTS {COLUMN} INTEGER NOT NULL DEFAULT 0'
+        )
+        return
+    op.add_column(
+        TABLE,
+        sa.Column(COLUMN, sa.Integer(), nullable=False, server_default="0"),
+        schema=SCHEMA,
+    )
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name == "postgresql":
+        op.execute(f'ALTER TABLE {SCHEMA}."{TABLE}" DROP COLUMN IF EXISTS {COLUMN}')
+        return
+    op.drop_column(TABLE, COLUMN, schema=SCHEMA)
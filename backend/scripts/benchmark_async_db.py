@@ -0,0 +1,106 @@
+"""
+Benchmark: ruta síncrona (threadpool) vs ruta asíncrona para las consultas calientes.
+
+Ejecuta la misma carga (listado paginado de órdenes + detalle + notificaciones) con N
+peticiones concurrentes por los dos caminos que usa la API:
+  - sync:  funciones de crud síncronas en el threadpool de Starlette (como los `def` endpoints)
+  - async: funciones `*_async` sobre AsyncSessionLocal (como los `async def` endpoints)
+
+Uso:
+    python backend/scripts/benchmark_async_db.py --requests 200 --concurrency 50
+
+Requiere que las variables de entorno de la BD estén configuradas (ver backend/.env.example)
+y que exista al menos una orden. No modifica datos.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# Asegurar que el paquete 'app' sea resolvible al ejecutar como script
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+import app.db.base  # registra todos los modelos
+from app.crud import crud_notification, crud_repair_order
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.models.repair_order import RepairOrder
+from app.models.user import User
+
+
+def sync_workload(order_id: int, user_id: int, page_size: int):
+    with SessionLocal() as db:
+        user = db.get(User, user_id)
+        orders, _ = crud_repair_order.get_repair_orders(db, user=user, skip=0, limit=page_size)
+        for order in orders:
+            crud_repair_order.get_order_creator(db, order.id)
+        crud_repair_order.get_repair_order(db, order_id=order_id)
+        crud_notification.get_notifications_for_user(db, user_id=user_id)
+
+
+async def async_workload(order_id: int, user_id: int, page_size: int):
+    async with AsyncSessionLocal() as db:
+        orders, _ = await crud_repair_order.get_repair_orders_async(db, skip=0, limit=page_size)
+        await crud_repair_order.get_order_creators_async(db, [order.id for order in orders])
+        await crud_repair_order.get_repair_order_async(db, order_id=order_id)
+        await crud_notification.get_notifications_for_user_async(db, user_id=user_id)
+
+
+async def run_path(name, call, total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+    print(
+        f"{name:<6} {total} req en {elapsed:6.2f}s | {total / elapsed:7.1f} req/s | "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms | p95 {p95 * 1000:7.1f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="peticiones por camino")
+    parser.add_argument("--concurrency", type=int, default=50, help="peticiones simultáneas")
+    parser.add_argument("--page-size", type=int, default=20, help="tamaño de página del listado")
+    args = parser.parse_args()
+
+    if AsyncSessionLocal is None:
+        print("❌ El motor asíncrono no está disponible (¿falta instalar asyncpg?).")
+        return
+
+    with SessionLocal() as db:
+        order_id = db.scalar(select(RepairOrder.id).order_by(RepairOrder.id.desc()).limit(1))
+        user_id = db.scalar(select(User.id).order_by(User.id).limit(1))
+    if order_id is None or user_id is None:
+        print("❌ Se necesita al menos una orden y un usuario para el benchmark.")
+        return
+
+    # Calentamiento de ambos pools
+    await run_in_threadpool(sync_workload, order_id, user_id, args.page_size)
+    await async_workload(order_id, user_id, args.page_size)
+
+    print(f"Orden #{order_id}, usuario #{user_id}, concurrencia {args.concurrency}")
+    await run_path("sync", lambda: run_in_threadpool(sync_workload, order_id, user_id, args.page_size), args.requests, args.concurrency)
+    await run_path("async", lambda: async_workload(order_id, user_id, args.page_size), args.requests, args.concurrency)
+    print("✅ Benchmark completado.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
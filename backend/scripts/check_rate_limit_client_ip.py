@@ -0,0 +1,71 @@
+"""
+Verificación local del límite por IP (app.core.rate_limit) detrás del reverse proxy.
+
+El balde debe quedar asociado a la IP que agrega el proxy de confianza (la entrada de la
+derecha de X-Forwarded-For), no a la que escribe el cliente a la izquierda: rotar esa
+entrada no puede reiniciar el balde.
+
+Uso:
+    python backend/scripts/check_rate_limit_client_ip.py
+
+No requiere la base de datos real ni Redis: usa una app mínima con el middleware.
+"""
+
+import os
+import sys
+
+# Asegurar que el paquete 'app' sea resolvible al ejecutar como script
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+os.environ["TRUST_PROXY_HEADERS"] = "true"
+os.environ["TRUSTED_PROXY_HOPS"] = "1"
+os.environ["RATE_LIMIT_BACKEND"] = "memory"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.rate_limit import RateLimitMiddleware, rate_limiter
+
+PATH = "/api/v1/client-orders/client-search"
+
+
+def check(label: str, condition: bool):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        sys.exit(1)
+
+
+def main():
+    app = FastAPI()
+
+    @app.get(PATH)
+    def search():
+        return {}
+
+    app.add_middleware(RateLimitMiddleware)
+    client = TestClient(app)
+    rule = rate_limiter.rule_for(PATH)
+    burst = rule.burst
+
+    # Mismo cliente real (1.2.3.4, agregado por el proxy) rotando la entrada de la izquierda
+    statuses = [
+        client.get(PATH, headers={"X-Forwarded-For": f"9.9.9.{i}, 1.2.3.4"}).status_code
+        for i in range(burst + 3)
+    ]
+    check(f"la ráfaga de {burst} requests pasa", statuses[:burst] == [200] * burst)
+    check("rotar la IP falsa de X-Forwarded-For no reinicia el balde", set(statuses[burst:]) == {429})
+
+    response = client.get(PATH, headers={"X-Forwarded-For": "1.2.3.4"})
+    check("sin la IP falsa también sigue limitado", response.status_code == 429)
+    check("429 con Retry-After", int(response.headers.get("Retry-After", "0")) >= 1)
+
+    response = client.get(PATH, headers={"X-Forwarded-For": "1.2.3.4, 5.6.7.8"})
+    check("otro cliente real (5.6.7.8) tiene su propio balde", response.status_code == 200)
+
+    print("\nTodo OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Demostración local del enrutamiento primario/réplica (app.db.routing) con dos SQLite.
+
+Se crean dos bases independientes que hacen de primario y de réplica. La "réplica" no se
+sincroniza sola, así que cada lectura muestra de qué motor salió el dato.
+
+Uso:
+    python backend/scripts/demo_replica_routing.py
+
+No requiere la base de datos real ni variables de entorno.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Asegurar que el paquete 'app' sea resolvible al ejecutar como script
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from sqlalchemy import Column, Integer, String, create_engine, select
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from app.db.routing import ReplicaRouter, RoutingSession
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "item"
+    id = Column(Integer, primary_key=True)
+    origin = Column(String, nullable=False)
+
+
+def check(label: str, condition: bool):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        sys.exit(1)
+
+
+def run():
+    workdir = tempfile.mkdtemp(prefix="replica-demo-")
+    primary = create_engine(f"sqlite:///{os.path.join(workdir, 'primary.db')}")
+    replica = create_engine(f"sqlite:///{os.path.join(workdir, 'replica.db')}")
+    for engine, origin in ((primary, "primary"), (replica, "replica")):
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(Item.__table__.insert(), [{"id": 1, "origin": origin}])
+
+    max_lag = 0.5
+    router = ReplicaRouter(max_lag_seconds=max_lag)
+    Session = sessionmaker(class_=RoutingSession, bind=primary, replica_bind=replica, router=router)
+    replica_reads = {"prefer_replica": True}
+
+    # 1. Sesión de escritura (POST/PUT): siempre primario
+    with Session() as db:
+        check("Sesión de escritura lee del primario", db.get(Item, 1).origin == "primary")
+
+    # 2. Sesión de lectura (GET) sin escrituras recientes: réplica
+    with Session(info=replica_reads) as db:
+        check("Sesión GET lee de la réplica", db.scalar(select(Item.origin).where(Item.id == 1)) == "replica")
+
+    # 3. Una sesión GET que escribe queda fijada al primario (read-your-writes)
+    with Session(info=replica_reads) as db:
+        db.add(Item(id=2, origin="primary"))
+        db.commit()
+        check("Tras escribir, la sesión lee su propio dato del primario", db.get(Item, 2) is not None)
+        check("...y el resto de lecturas también van al primario", db.scalar(select(Item.origin).where(Item.id == 1)) == "primary")
+
+    # 4. Recarga inmediata tras el commit (BackgroundTasks): dentro del retraso tolerado
+    with Session(info=replica_reads) as db:
+        check("Recarga inmediata tras un commit usa el primario", db.scalar(select(Item.origin).where(Item.id == 1)) == "primary")
+
+    # 5. Pasado el retraso tolerado vuelve a usarse la réplica
+    time.sleep(max_lag + 0.1)
+    with Session(info=replica_reads) as db:
+        check("Pasado el retraso tolerado se vuelve a la réplica", db.scalar(select(Item.origin).where(Item.id == 1)) == "replica")
+
+    # 6. Réplica con retraso medido por encima de la tolerancia: primario
+    class StaleMonitor:
+        lag = max_lag * 10
+
+    router.monitor = StaleMonitor()
+    with Session(info=replica_reads) as db:
+        check("Réplica atrasada: las lecturas vuelven al primario", db.scalar(select(Item.origin).where(Item.id == 1)) == "primary")
+
+    print(f"✅ Demo completada: {router.stats()}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,157 @@
+"""
+Verifica con EXPLAIN que las consultas calientes usan los índices de las migraciones.
+
+Para cada consulta (construida con el mismo código que usan los endpoints cuando es
+posible) se ejecuta EXPLAIN (FORMAT JSON) y se comprueba que el plan recorre el índice
+esperado. Se desactiva enable_seqscan dentro de la transacción para que el resultado no
+dependa del tamaño de la tabla (en bases de desarrollo casi vacías el planner prefiere un
+seq scan aunque el índice exista).
+
+Uso:
+    python backend/scripts/explain_hot_queries.py
+
+Requiere PostgreSQL con las migraciones aplicadas (alembic upgrade head). Sale con
+código 1 si alguna consulta no usa su índice.
+"""
+
+import json
+import os
+import sys
+
+from sqlalchemy import select, text, tuple_
+
+# Asegurar que el paquete 'app' sea resolvible al ejecutar como script
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+import app.db.base  # registra todos los modelos
+from app.crud.crud_repair_order import _apply_order_filters
+from app.db.session import engine
+from app.models.customer import Customer
+from app.models.email_subscription import EmailSubscription
+from app.models.notification import Notification
+from app.models.record import Record
+from app.models.repair_order import RepairOrder
+from app.models.repair_order_photo import RepairOrderPhoto
+
+HOT_QUERIES = [
+    (
+        "get_repair_orders (filtro por sucursal, orden por fecha)",
+        _apply_order_filters(select(RepairOrder.id), branch_id=1)
+        .order_by(RepairOrder.created_at.desc())
+        .limit(20),
+        "ix_repair_order_branch_created",
+    ),
+    (
+        "get_repair_orders (filtro por estado)",
+        select(RepairOrder.id).where(RepairOrder.status_id == 1),
+        "ix_repair_order_status_id",
+    ),
+    (
+        "get_repair_orders_by_customer",
+        select(RepairOrder.id).where(RepairOrder.customer_id == 1).order_by(RepairOrder.created_at.desc()),
+        "ix_repair_order_customer_created",
+    ),
+    (
+        "crud_email_subscription.is_subscribed",
+        select(EmailSubscription.id).where(
+            EmailSubscription.order_id == 1, EmailSubscription.email == "cliente@example.com"
+        ),
+        "ix_email_subscription_order_email",
+    ),
+    (
+        "get_notifications_for_user",
+        select(Notification.id).where(Notification.user_id == 1).order_by(Notification.created_at.desc()).limit(20),
+        "ix_notifications_user_created",
+    ),
+    (
+        "historial de una orden (record por order_id y fecha)",
+        select(Record.id).where(Record.order_id == 1).order_by(Record.created_at.desc()),
+        "ix_record_order_created",
+    ),
+    (
+        "GET /records (rango de fechas, orden por created_at, id)",
+        select(Record.id).where(Record.created_at >= "2025-01-01").order_by(Record.created_at.desc(), Record.id.desc()).limit(100),
+        "ix_record_created_id",
+    ),
+    (
+        "GET /records?branch_id (rama origen del UNION)",
+        select(Record.id).where(Record.origin_branch_id == 1).order_by(Record.created_at.desc()).limit(100),
+        "ix_record_origin_branch_created",
+    ),
+    (
+        "GET /customers (página por cursor last_name, id)",
+        select(Customer.id)
+        .where(tuple_(Customer.last_name, Customer.id) > tuple_("Garcia", 1))
+        .order_by(Customer.last_name, Customer.id)
+        .limit(100),
+        "ix_customer_last_name_id",
+    ),
+    (
+        "GET /client-orders/{id}/photos (página por cursor de id)",
+        select(RepairOrderPhoto.id)
+        .where(RepairOrderPhoto.order_id == 1, RepairOrderPhoto.id < 1000)
+        .order_by(RepairOrderPhoto.id.desc())
+        .limit(20),
+        "ix_repair_order_photo_order_id_id",
+    ),
+]
+
+
+def _index_names(plan) -> set:
+    names = set()
+    if isinstance(plan, dict):
+        if "Index Name" in plan:
+            names.add(plan["Index Name"])
+        for value in plan.values():
+            names |= _index_names(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            names |= _index_names(item)
+    return names
+
+
+def _parent_indexes(conn, names: set) -> set:
+    """Índices particionados a los que pertenecen los índices de partición de `names`."""
+    if not names:
+        return set()
+    rows = conn.execute(
+        text(
+            "SELECT parent.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE child.relkind = 'i' AND child.relname = ANY(:names)"
+        ),
+        {"names": list(names)},
+    ).scalars()
+    return set(rows)
+
+
+def run() -> bool:
+    if engine.dialect.name != "postgresql":
+        print("❌ Este chequeo requiere PostgreSQL.")
+        return False
+    ok = True
+    with engine.connect() as conn:
+        for label, stmt, expected in HOT_QUERIES:
+            sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+            with conn.begin():
+                conn.execute(text("SET LOCAL enable_seqscan = off"))
+                plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                used = _index_names(plan)
+                # En system.record (particionada) el plan nombra el índice de cada partición
+                partition_indexes = used - {expected}
+                used |= _parent_indexes(conn, partition_indexes)
+            if expected in used:
+                print(f"✅ {label}: usa {expected}{' (por partición)' if partition_indexes else ''}")
+            else:
+                ok = False
+                print(f"❌ {label}: esperaba {expected}, el plan usa {sorted(used) or 'ningún índice'}")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run() else 1)
@@ -0,0 +1,64 @@
+"""
+Busca clientes duplicados (mismo DNI, teléfono o email, o nombres casi iguales) y los
+deja como pares pendientes de revisión en GET /customers/duplicates.
+
+Es incremental: cada ejecución solo compara los clientes dados de alta desde la anterior
+contra todos los existentes. Con --full se vuelve a recorrer toda la tabla (los pares ya
+propuestos o descartados no se repiten). La fusión se hace desde
+POST /customers/{id}/merge.
+
+Uso:
+    python backend/scripts/find_duplicate_customers.py
+    python backend/scripts/find_duplicate_customers.py --full --min-score 0.7
+    python backend/scripts/find_duplicate_customers.py --dry-run
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Asegurar que el paquete 'app' sea resolvible al ejecutar como script
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+import app.db.base  # registra todos los modelos
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services import customer_duplicates
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="recorre todos los clientes, no solo los nuevos")
+    parser.add_argument("--min-score", type=float, default=settings.CUSTOMER_DUPLICATE_MIN_SCORE)
+    parser.add_argument("--dry-run", action="store_true", help="cuenta los pares sin guardarlos")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    db = SessionLocal()
+    try:
+        result = customer_duplicates.find_duplicates(
+            db, full=args.full, min_score=args.min_score, dry_run=args.dry_run
+        )
+    except Exception as e:
+        db.rollback()
+        print(f"❌ {type(e).__name__}: {e}")
+        return 1
+    finally:
+        db.close()
+
+    if not result["scanned"]:
+        print("✅ No hay clientes nuevos desde la última ejecución")
+        return 0
+    action = "se propondrían" if args.dry_run else "nuevos pares propuestos"
+    print(
+        f"✅ {result['scanned']} clientes revisados (ids {result['since_id'] + 1}..{result['last_id']}); "
+        f"{result['found']} {action} en {time.monotonic() - started:.1f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
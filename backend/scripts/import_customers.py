@@ -0,0 +1,70 @@
+"""
+Importa clientes en lote desde un CSV o NDJSON (alta de una sucursal nueva).
+
+El CSV necesita encabezado; se reconocen nombre/first_name, apellido/last_name,
+dni/documento, telefono/celular/phone_number, email/correo e is_subscribed/suscripto,
+separados por coma, punto y coma o tabulación. En NDJSON cada línea es un objeto JSON con
+esos mismos campos. Las filas inválidas o ya existentes (mismo DNI o teléfono) no frenan
+la importación y se listan al final con su número de línea.
+
+Uso:
+    python backend/scripts/import_customers.py clientes.csv
+    python backend/scripts/import_customers.py clientes.ndjson --dry-run
+    python backend/scripts/import_customers.py clientes.csv --chunk-size 1000 --report reporte.json
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Asegurar que el paquete 'app' sea resolvible al ejecutar como script
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+import app.db.base  # registra todos los modelos
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services import customer_import
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="archivo .csv, .ndjson o .jsonl")
+    parser.add_argument("--format", choices=customer_import.FORMATS, help="por defecto según la extensión")
+    parser.add_argument("--chunk-size", type=int, default=settings.CUSTOMER_IMPORT_CHUNK_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="valida y cuenta sin guardar")
+    parser.add_argument("--report", help="guarda el reporte completo en este archivo JSON")
+    args = parser.parse_args()
+
+    fmt = args.format or customer_import.detect_format(args.path)
+    db = SessionLocal()
+    try:
+        with open(args.path, "r", encoding="utf-8-sig", errors="replace", newline="") as f:
+            report = customer_import.import_customers(
+                db, f, fmt=fmt, dry_run=args.dry_run, chunk_size=args.chunk_size
+            )
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        db.close()
+
+    for row in report["rows"]:
+        suffix = f" (cliente {row['customer_id']})" if row["customer_id"] else ""
+        print(f"  línea {row['line']}: {row['status']} - {row['reason']}{suffix}")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as out:
+            json.dump(report, out, ensure_ascii=False, indent=2)
+    action = "se importarían" if args.dry_run else "importados"
+    mark = "✅" if not report["errors"] else "❌"
+    print(
+        f"{mark} {report['inserted']} de {report['total']} {action}; "
+        f"{report['duplicates']} duplicados, {report['errors']} con errores"
+    )
+    return 0 if not report["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Mantenimiento de las particiones mensuales del historial de auditoría (system.record).
+
+Subcomandos:
+    list      particiones actuales con filas estimadas y tamaño
+    ensure    crea la partición por defecto y los meses que falten hasta
+              RECORD_PARTITION_MONTHS_AHEAD meses adelante (la aplicación ya lo hace sola)
+    archive   desacopla los meses viejos, los exporta a NDJSON comprimido y los elimina
+
+Uso:
+    python backend/scripts/manage_record_partitions.py list
+    python backend/scripts/manage_record_partitions.py ensure --months-ahead 6
+    python backend/scripts/manage_record_partitions.py archive --dry-run
+    python backend/scripts/manage_record_partitions.py archive --before 2025-01-01 --out /backups/record
+
+Sin --before, archive conserva los últimos RECORD_RETENTION_MONTHS meses. Los archivos
+quedan en RECORD_ARCHIVE_DIR (o --out) como record_YYYY_MM.ndjson.gz, una fila JSON por
+línea. Requiere PostgreSQL con la migración 0003 aplicada y conviene correrlo contra la
+conexión directa (puerto 5432).
+"""
+
+import argparse
+import os
+import sys
+from datetime import date
+
+# Asegurar que el paquete 'app' sea resolvible al ejecutar como script
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from app.core.config import settings
+from app.db import partitions
+from app.db.session import engine
+
+
+def _size(num_bytes: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if num_bytes < 1024 or unit == "GB":
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+
+
+def cmd_list(args) -> bool:
+    with engine.connect() as conn:
+        if not partitions.is_partitioned(conn):
+            print("❌ system.record no está particionada (aplicar la migración 0003)")
+            return False
+        rows = partitions.list_record_partitions(conn)
+    for p in rows:
+        print(f"  {p['name']:<20} ~{p['estimated_rows']:>10} filas  {_size(p['bytes']):>10}")
+    print(f"✅ {len(rows)} particiones")
+    return True
+
+
+def cmd_ensure(args) -> bool:
+    with engine.begin() as conn:
+        if not partitions.is_partitioned(conn):
+            print("❌ system.record no está particionada (aplicar la migración 0003)")
+            return False
+        created = partitions.ensure_record_partitions(conn, months_ahead=args.months_ahead)
+    print(f"✅ Particiones creadas: {', '.join(created)}" if created else "✅ No faltaba ninguna partición")
+    return True
+
+
+def cmd_archive(args) -> bool:
+    if args.before:
+        before = date.fromisoformat(args.before)
+    else:
+        before = partitions.add_months(partitions.month_start(date.today()), -args.keep_months)
+    out_dir = args.out or settings.RECORD_ARCHIVE_DIR
+    try:
+        results = partitions.archive_record_partitions(
+            engine, before, out_dir, drop=not args.keep_table, dry_run=args.dry_run
+        )
+    except Exception as e:
+        print(f"❌ Error archivando particiones: {e}")
+        return False
+
+    if not results:
+        print(f"✅ No hay particiones anteriores a {before.isoformat()}")
+    for r in results:
+        if args.dry_run:
+            print(f"  (dry-run) {r['name']}: ~{r['estimated_rows']} filas -> {r['file']}")
+        else:
+            state = "eliminada" if r["dropped"] else "desacoplada"
+            print(f"✅ {r['name']}: {r['rows']} filas -> {r['file']} (tabla {state})")
+    return True
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="lista las particiones")
+
+    ensure = sub.add_parser("ensure", help="crea las particiones futuras que falten")
+    ensure.add_argument("--months-ahead", type=int, default=settings.RECORD_PARTITION_MONTHS_AHEAD)
+
+    archive = sub.add_parser("archive", help="exporta y elimina las particiones viejas")
+    archive.add_argument("--before", help="archiva los meses anteriores a esta fecha (YYYY-MM-DD)")
+    archive.add_argument(
+        "--keep-months", type=int, default=settings.RECORD_RETENTION_MONTHS, help="meses en línea si no se indica --before"
+    )
+    archive.add_argument("--out", help="carpeta de salida (por defecto RECORD_ARCHIVE_DIR)")
+    archive.add_argument("--keep-table", action="store_true", help="conserva la tabla desacoplada en lugar de eliminarla")
+    archive.add_argument("--dry-run", action="store_true", help="solo muestra qué se archivaría")
+
+    args = parser.parse_args()
+    commands = {"list": cmd_list, "ensure": cmd_ensure, "archive": cmd_archive}
+    return 0 if commands[args.command](args) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
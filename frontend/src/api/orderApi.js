@@ -63,14 +63,17 @@ const mapClientOrderData = (order) => ({
   created_at: order.created_at,
   updated_at: order.updated_at,
   estimated_completion_date: order.estimated_completion_date,
-  delivery_date: order.delivery_date
+  delivery_date: order.delivery_date,
+  stream_token: order.stream_token || null
 });
 
-// Función para buscar orden por DNI o número de orden (pública)
-export const getOrderByClientQuery = async (query) => {
+// Función para buscar orden por DNI o número de orden (pública). `token` es el del enlace
+// del QR del ticket: con él (o buscando por DNI) la respuesta incluye stream_token
+export const getOrderByClientQuery = async (query, token = null) => {
   try {
+    const tokenParam = token ? `&token=${encodeURIComponent(token)}` : '';
     // Usar MCP PostgREST para consultar la base de datos
-    const response = await fetch(`${API_BASE_URL}/api/v1/client-orders/client-search?q=${encodeURIComponent(query)}`, {
+    const response = await fetch(`${API_BASE_URL}/api/v1/client-orders/client-search?q=${encodeURIComponent(query)}${tokenParam}`, {
       method: 'GET',
       headers: {
         'Content-Type': 'application/json'
@@ -180,23 +183,53 @@ export const getSubscriptionStatus = async (orderId, email) => {
   }
 };
 
-// Función para obtener fotos de una orden
+// Función para obtener fotos de una orden (solo metadatos, recorriendo todas las páginas)
 export const getOrderPhotos = async (orderId) => {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/v1/client-orders/${orderId}/photos`, {
-      method: 'GET',
-      headers: {
-        'Content-Type': 'application/json'
+    const photos = [];
+    let cursor = null;
+    do {
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const response = await fetch(`${API_BASE_URL}/api/v1/client-orders/${orderId}/photos${query}`, {
+        method: 'GET',
+        headers: {
+          'Content-Type': 'application/json'
+        }
+      });
+
+      if (!response.ok) {
+        throw new Error(`Error HTTP: ${response.status}`);
       }
-    });
 
-    if (!response.ok) {
-      throw new Error(`Error HTTP: ${response.status}`);
-    }
-
-    return await response.json();
+      photos.push(...(await response.json()));
+      cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    return photos;
   } catch (error) {
     console.error('Error al obtener fotos de la orden:', error);
     throw error;
   }
 };
+
+// URL absoluta de la miniatura o vista previa de una foto (thumbnail_url / preview_url)
+export const resolvePhotoUrl = (path) => (path ? `${API_BASE_URL}${path}` : '');
+
+// Eventos en vivo de una orden (Server-Sent Events). EventSource reconecta solo y envía
+// Last-Event-ID, así el backend repone los eventos perdidos. Retorna la función para cerrar.
+export const subscribeToOrderEvents = (orderId, token, handlers = {}) => {
+  if (!orderId || !token || typeof EventSource === 'undefined') return () => {};
+  const source = new EventSource(
+    `${API_BASE_URL}/api/v1/client-orders/${orderId}/events?token=${encodeURIComponent(token)}`
+  );
+  ['status', 'diagnosis', 'photo', 'resync', 'deleted'].forEach((type) => {
+    source.addEventListener(type, (event) => {
+      if (type === 'deleted') source.close();
+      try {
+        handlers[type]?.(JSON.parse(event.data));
+      } catch (error) {
+        console.error(`Error al procesar el evento ${type} de la orden:`, error);
+      }
+    });
+  });
+  return () => source.close();
+};
@@ -2,6 +2,7 @@ import React, { useState, useMemo } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { Camera, Upload, X, ZoomIn } from 'lucide-react';
 import { PhotoModalClient } from './PhotoModalClient.jsx';
+import { resolvePhotoUrl } from '../../api/orderApi.js';
 
 // Componente Pin replicado del OrderModal
 const Pin = ({ color }) => (
@@ -12,7 +13,7 @@ const Pin = ({ color }) => (
 
 // Componente PhotoItem para cliente (solo visualización)
 const PhotoItemClient = ({ photo, onSelect, position, pinColor }) => {
-  const { photo: imageData, note, id } = photo;
+  const { thumbnail_url, note, id } = photo;
 
   return (
     <motion.div
@@ -31,7 +32,7 @@ const PhotoItemClient = ({ photo, onSelect, position, pinColor }) => {
 
         <div className="p-1 sm:p-2">
           <img
-            src={imageData}
+            src={resolvePhotoUrl(thumbnail_url)}
             alt={note || 'Foto de diagnóstico'}
             className="w-full h-20 sm:h-24 md:h-28 object-cover rounded-md mb-1 sm:mb-2"
             loading="lazy"
@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { motion } from 'framer-motion';
 import { X, Eye } from 'lucide-react';
 import ZoomableImage from '../orders/OrderModal/PhotoBoard/ZoomableImage/ZoomableImage';
+import { resolvePhotoUrl } from '../../api/orderApi.js';
 
 export const PhotoModalClient = ({
   selectedPhoto,
@@ -56,7 +57,7 @@ export const PhotoModalClient = ({
 
       {/* ZoomableImage del OrderModal - MODO SOLO LECTURA */}
       <ZoomableImage
-        src={selectedPhoto.photo}
+        src={resolvePhotoUrl(selectedPhoto.preview_url)}
         alt={selectedPhoto.note || 'Foto de diagnóstico'}
         className="w-full h-96 rounded-lg mb-6 bg-gray-50"
         markers={markers}
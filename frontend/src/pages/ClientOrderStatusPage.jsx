@@ -1,7 +1,7 @@
 // frontend/src/pages/ClientOrderStatusPage.jsx
 
 import React, { useState, useEffect } from 'react';
-import { useParams, useNavigate } from 'react-router-dom';
+import { useParams, useNavigate, useSearchParams } from 'react-router-dom';
 import { motion, AnimatePresence } from 'framer-motion';
 import {
   ArrowLeft,
@@ -31,10 +31,13 @@ import BrandLogo from '../components/shared/BrandLogo';
 import ErrorBoundary from '../components/common/ErrorBoundary';
 
 // API
-import { getOrderByClientQuery, getOrderDetails, getOrderPhotos } from '../api/orderApi';
+import { getOrderByClientQuery, getOrderDetails, getOrderPhotos, subscribeToOrderEvents } from '../api/orderApi';
 
 const ClientOrderStatusPage = () => {
   const { orderId } = useParams();
+  // Token del enlace del QR del ticket (habilita las actualizaciones en vivo)
+  const [searchParams] = useSearchParams();
+  const linkToken = searchParams.get('token');
   const navigate = useNavigate();
 
   const [orderData, setOrderData] = useState(null);
@@ -81,7 +84,7 @@ const ClientOrderStatusPage = () => {
     setError('');
 
     try {
-      const data = await getOrderByClientQuery(searchIdentifier.trim());
+      const data = await getOrderByClientQuery(searchIdentifier.trim(), linkToken);
       setOrderData(data);
 
       // Obtener fotos si existen
@@ -117,6 +120,34 @@ const ClientOrderStatusPage = () => {
     }
   }, [orderId]);
 
+  // Actualizaciones en vivo de la orden (estado, diagnóstico y fotos nuevas)
+  useEffect(() => {
+    if (!orderData?.id || !orderData?.stream_token) return undefined;
+    const currentId = orderData.id;
+    return subscribeToOrderEvents(currentId, orderData.stream_token, {
+      status: ({ status }) => setOrderData(prev => ({ ...prev, status })),
+      diagnosis: ({ technician_diagnosis }) => setOrderData(prev => ({
+        ...prev,
+        technician_diagnosis: technician_diagnosis || ''
+      })),
+      photo: (photo) => setOrderData(prev => ({
+        ...prev,
+        photos: [photo, ...(prev?.photos || []).filter(p => p.id !== photo.id)]
+      })),
+      // Se perdieron eventos: recargar la orden completa
+      resync: async () => {
+        try {
+          const data = await getOrderDetails(currentId);
+          const photos = await getOrderPhotos(currentId);
+          // La vista por id no trae stream_token: se conserva el de la búsqueda
+          setOrderData(prev => ({ ...data, stream_token: prev?.stream_token || null, photos: photos || [] }));
+        } catch (err) {
+          console.warn('No se pudo recargar la orden:', err);
+        }
+      }
+    });
+  }, [orderData?.id, orderData?.stream_token]);
+
   // Estado para suscripción
   const [isSubscribed, setIsSubscribed] = useState(false);
   const [searchValue, setSearchValue] = useState('');
@@ -129,7 +160,7 @@ const ClientOrderStatusPage = () => {
     try {
       // Obtener detalles por ID (evita errores si la búsqueda original fue por DNI)
       const data = await getOrderDetails(orderData.id);
-      setOrderData(data);
+      setOrderData(prev => ({ ...data, stream_token: prev?.stream_token || null }));
       // Refrescar fotos
       try {
         const photos = await getOrderPhotos(data.id);